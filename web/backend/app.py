@@ -4,13 +4,18 @@ Universidad Politécnica de Victoria
 Backend Flask con Cython para procesamiento de horarios
 """
 
-from flask import Flask, render_template, request, jsonify, send_file, send_from_directory
+from flask import Flask, Response, g, render_template, request, jsonify, send_file, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import os
 import json
+import time
+import threading
+from copy import deepcopy
 from datetime import datetime
 import logging
+from collections.abc import Mapping
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
@@ -23,6 +28,19 @@ app = Flask(__name__,
             template_folder='../frontend/pages')
 CORS(app)
 
+
+class ProveedorJSON(DefaultJSONProvider):
+    """Serializa también las vistas de solo lectura del horario compacto"""
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, Mapping):
+            return dict(o)
+        return DefaultJSONProvider.default(o)
+
+
+app.json = ProveedorJSON(app)
+
 # Configuración
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), '../uploads')
@@ -31,19 +49,6 @@ app.config['SECRET_KEY'] = 'upv-horarios-iti-2025'
 
 ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'json'}
 
-# Almacenamiento en memoria de datos procesados
-datos_horarios = {
-    'raw_data': None,
-    'cursos': [],
-    'profesores': [],
-    'grupos': [],
-    'aulas': [],
-    'horario_generado': None,
-    'grafo_conflictos': None,
-    'validacion': None,
-    'timestamp': None
-}
-
 def allowed_file(filename):
     """Verifica si el archivo tiene una extensión permitida"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -51,18 +56,187 @@ def allowed_file(filename):
 # Importar servicios
 from services.parser_service_new import ParserServiceNew
 from services.scheduler_service_new import SchedulerServiceNew
+from services.solvers import MODOS, solvers_disponibles
+from services.trabajo_service import TrabajoService, PENDIENTE, EJECUTANDO
+from services.grafo_conflictos import expandir_hiperaristas, contar_enlaces
+from services.export_service import EXTENSIONES, comprimir_gzip
+from services.instantanea import Instantanea, PublicadorInstantaneas
+from services.almacen_sqlite import AlmacenSQLite, fabrica_consultas
+from services.instantanea_compartida import AlmacenCompartido, PublicadorCompartido
+from services.registro_horarios import RegistroHorarios
 
 # Inicializar servicios básicos
 parser = ParserServiceNew()
 scheduler = SchedulerServiceNew()
 
-# query y exporter se crearán bajo demanda cuando se necesiten
+# Estado publicado: datos, horario, grafo, validación e índices de consulta en
+# una instantánea inmutable. Cada petición lee ``estado.actual`` una sola vez y
+# los cambios publican una instantánea nueva (services/instantanea.py).
+# Hay un publicador por programa y periodo (?programa=ITI&periodo=2018-1 en
+# cualquier ruta de /api; por defecto HORARIOS_PROGRAMA y HORARIOS_PERIODO) y
+# los menos usados se desalojan de memoria por encima de HORARIOS_MEMORIA_MB
+# (services/registro_horarios.py).
+# Con varios procesos (p. ej. gunicorn -w N) HORARIOS_DIR_COMPARTIDO apunta a un
+# directorio común: un solo proceso carga y genera, y todos leen el mismo
+# horario mapeado en memoria (services/instantanea_compartida.py). El estado de
+# los trabajos también se escribe ahí (trabajos/), así que cualquier proceso
+# responde /api/trabajos/<id> aunque la generación corra en otro.
+# HORARIOS_DB es la base SQLite donde se persiste cada estado publicado para
+# retomarlo al reiniciar o tras desalojarlo (vacía: sin persistencia); en un
+# solo proceso las consultas se responden además desde sus índices
+# (services/almacen_sqlite.py).
+DIR_COMPARTIDO = os.environ.get('HORARIOS_DIR_COMPARTIDO')
+RUTA_DB = os.environ.get('HORARIOS_DB', os.path.join(os.path.dirname(__file__), 'data', 'horarios.db'))
+CLAVE_POR_DEFECTO = (os.environ.get('HORARIOS_PROGRAMA', 'ITI'), os.environ.get('HORARIOS_PERIODO', 'actual'))
+MEMORIA_MB = float(os.environ.get('HORARIOS_MEMORIA_MB', 256))
+# HORARIOS_ARRANQUE=diferido (por defecto) sirve peticiones en cuanto se importa
+# la aplicación y carga los datos por defecto en un hilo; 'sincrono' los carga
+# antes de terminar de importar. /api/estado indica cuándo está lista.
+ARRANQUE_DIFERIDO = os.environ.get('HORARIOS_ARRANQUE', 'diferido') != 'sincrono'
+arranque = {'inicio': time.perf_counter(), 'listo': threading.Event(), 'segundos': None}
+
+trabajos = TrabajoService(directorio=os.path.join(DIR_COMPARTIDO, 'trabajos') if DIR_COMPARTIDO else None)
+
+def ruta_estado(base, programa, periodo, extension=''):
+    """Ruta de los datos persistidos de un programa y periodo (la base para el de por defecto)"""
+    if (programa, periodo) == CLAVE_POR_DEFECTO:
+        return base
+    raiz = base[:-len(extension)] if extension and base.endswith(extension) else base
+    return f"{raiz}-{programa}_{periodo}{extension}"
+
+def crear_estado(programa, periodo):
+    """Publicador de un programa y periodo, restaurado de disco si ya tenía estado"""
+    almacen_db = AlmacenSQLite(ruta_estado(RUTA_DB, programa, periodo, '.db')) if RUTA_DB else None
+    if DIR_COMPARTIDO:
+        estado = PublicadorCompartido(AlmacenCompartido(ruta_estado(DIR_COMPARTIDO, programa, periodo)))
+    elif almacen_db is not None:
+        estado = PublicadorInstantaneas(Instantanea(fabrica_consultas=fabrica_consultas(almacen_db)))
+    else:
+        estado = PublicadorInstantaneas()
+    if almacen_db is not None:
+        estado.al_publicar = almacen_db.guardar_estado
+    
+    def cargar():
+        if almacen_db is not None and restaurar_estado(estado, almacen_db):
+            return
+        if (programa, periodo) == CLAVE_POR_DEFECTO:
+            cargar_datos_iniciales(estado)
+    
+    if (programa, periodo) != CLAVE_POR_DEFECTO or arranque['listo'].is_set():
+        # Una sola vez aunque haya varios procesos
+        estado.inicializar(cargar)
+    elif ARRANQUE_DIFERIDO:
+        threading.Thread(target=inicializar_arranque, args=(estado, cargar),
+                         name='arranque', daemon=True).start()
+    else:
+        inicializar_arranque(estado, cargar)
+    return estado
+
+def inicializar_arranque(estado, cargar):
+    """Carga inicial de los datos por defecto; al terminar la aplicación queda lista"""
+    try:
+        estado.inicializar(cargar)
+    except Exception as e:
+        logger.error(f"❌ Error en la carga inicial: {str(e)}", exc_info=True)
+    finally:
+        arranque['segundos'] = round(time.perf_counter() - arranque['inicio'], 3)
+        arranque['listo'].set()
+        logger.info(f"🚀 Aplicación lista en {arranque['segundos']} s")
+
+def estado_guardado(programa, periodo):
+    """Si un programa y periodo tienen estado en disco para restaurar"""
+    if DIR_COMPARTIDO and os.path.exists(ruta_estado(DIR_COMPARTIDO, programa, periodo)):
+        return True
+    return bool(RUTA_DB) and os.path.exists(ruta_estado(RUTA_DB, programa, periodo, '.db'))
+
+def generacion_en_curso(estado):
+    """Si el publicador espera el resultado de una generación (no se desaloja)"""
+    trabajo_id = estado.actual['trabajo_generacion']
+    progreso = trabajos.estado(trabajo_id) if trabajo_id else None
+    return progreso is not None and progreso['estado'] in (PENDIENTE, EJECUTANDO)
+
+registro = RegistroHorarios(
+    crear_estado, CLAVE_POR_DEFECTO,
+    memoria_max=int(MEMORIA_MB * 1024 * 1024) if MEMORIA_MB > 0 else None,
+    persistente=bool(RUTA_DB or DIR_COMPARTIDO),
+    ocupado=generacion_en_curso,
+    existe=estado_guardado
+)
+
+def publicar_resultado(estado, datos, resultado, origen, condicion):
+    """
+    Publica los datos (ya con sus horarios) junto con el resultado de una generación
+    
+    Devuelve False y descarta el resultado si ``condicion`` indica que los
+    datos de entrada cambiaron mientras se generaba.
+    """
+    publicada = estado.publicar_datos(
+        datos, condicion, origen=origen,
+        horario_generado=resultado['horario'],
+        grafo_conflictos=resultado['grafo'],
+        validacion=resultado['validacion']
+    )
+    if publicada is None:
+        logger.warning("⚠️  Los datos cambiaron durante la generación: resultado descartado")
+        return False
+    logger.info(f"✅ Horarios generados: {resultado['estadisticas']}")
+    return True
+
+def encolar_generacion(estado, datos, ejecuciones=1, limite_segundos=None, semilla=None, solver=None):
+    """Encola la generación de horarios de una instantánea y devuelve el id del trabajo"""
+    # El scheduler escribe los horarios en los cursos: trabaja sobre una copia
+    # para no tocar los de la instantánea publicada
+    copia = deepcopy(datos['raw_data'])
+    origen = datos['origen_datos']
+    
+    def generar(progreso, detener):
+        return scheduler.generar_horarios(
+            copia,
+            ejecuciones=ejecuciones,
+            limite_segundos=limite_segundos,
+            progreso=progreso,
+            detener=detener,
+            semilla=semilla,
+            solver=solver
+        )
+    
+    def al_terminar(resultado):
+        publicar_resultado(estado, copia, resultado, origen,
+                           condicion=lambda actual: actual['origen_datos'] is origen)
+    
+    trabajo_id = trabajos.enviar(generar, al_terminar=al_terminar,
+                                 descripcion='Generación de horarios')
+    estado.publicar(trabajo_generacion=trabajo_id)
+    return trabajo_id
+
+def sin_datos(actual):
+    """
+    Condición de la carga inicial: con el arranque diferido se puede subir
+    un archivo antes de que termine, y no se debe sobrescribir
+    """
+    return actual['raw_data'] is None
+
+def restaurar_estado(estado, almacen_db):
+    """Publica el estado guardado en la base; False si no había ninguno"""
+    guardado = almacen_db.cargar()
+    if guardado is None:
+        return False
+    # Estado de la ejecución anterior: ni se procesa el Excel ni se resuelve
+    publicada = estado.publicar_datos(
+        guardado['raw_data'], sin_datos,
+        horario_generado=guardado['horario_generado'],
+        grafo_conflictos=guardado['grafo_conflictos'],
+        validacion=guardado['validacion']
+    )
+    if publicada is None:
+        logger.info("ℹ️  Ya se cargaron datos durante el arranque: estado guardado omitido")
+    else:
+        logger.info(f"✅ Datos y horarios restaurados de {almacen_db.ruta}")
+    return True
 
 # Cargar datos automáticamente desde CSVs al iniciar
-def cargar_datos_iniciales():
+def cargar_datos_iniciales(estado):
     """Carga automáticamente los CSVs al iniciar la aplicación"""
-    global datos_horarios
-    
     logger.info("🔄 Intentando cargar Excel por defecto...")
     
     # Intentar cargar el Excel por defecto
@@ -71,32 +245,44 @@ def cargar_datos_iniciales():
     if os.path.exists(excel_path):
         try:
             datos_excel = parser.procesar_excel(excel_path)
-            datos_horarios['raw_data'] = datos_excel
-            datos_horarios['cursos'] = datos_excel.get('cursos', [])
-            datos_horarios['profesores'] = datos_excel.get('profesores', [])
-            datos_horarios['grupos'] = datos_excel.get('grupos', [])
-            datos_horarios['aulas'] = datos_excel.get('aulas', [])
-            datos_horarios['timestamp'] = datetime.now().isoformat()
+            datos = estado.publicar_datos(datos_excel, sin_datos)
+            if datos is None:
+                logger.info("ℹ️  Ya se cargaron datos durante el arranque: Excel por defecto omitido")
+                return
             
             logger.info(f"✅ Datos cargados: {datos_excel.get('metadata', {})}")
             
-            # Generar horarios automáticamente
-            try:
-                logger.info("🔄 Generando horarios con BACKTRACKING...")
-                resultado = scheduler.generar_horarios(datos_excel)
-                datos_horarios['horario_generado'] = resultado['horario']
-                datos_horarios['grafo_conflictos'] = resultado['grafo']
-                datos_horarios['validacion'] = resultado['validacion']
-                logger.info(f"✅ Horarios generados: {resultado['estadisticas']}")
-            except Exception as e:
-                logger.warning(f"⚠️  No se pudieron generar horarios: {str(e)}")
+            # Generar horarios automáticamente en segundo plano
+            logger.info("🔄 Generando horarios con BACKTRACKING...")
+            encolar_generacion(estado, datos)
         except Exception as e:
             logger.error(f"❌ Error cargando Excel: {str(e)}")
     else:
         logger.info("ℹ️  No hay Excel por defecto. Esperando carga manual de archivo.")
 
-# Cargar datos al iniciar
-cargar_datos_iniciales()
+# Cargar los datos del programa y periodo por defecto al iniciar (en segundo
+# plano con el arranque diferido)
+registro.obtener()
+
+@app.before_request
+def seleccionar_horarios():
+    """Elige el publicador del programa y periodo pedidos para las rutas de /api"""
+    if not request.path.startswith('/api/'):
+        return None
+    opciones = request.get_json(silent=True) if request.is_json else None
+    opciones = opciones if isinstance(opciones, dict) else {}
+    try:
+        # Solo subir un archivo da de alta un programa y periodo nuevos
+        g.estado_horarios = registro.obtener(
+            request.values.get('programa') or opciones.get('programa'),
+            request.values.get('periodo') or opciones.get('periodo'),
+            crear=request.endpoint == 'upload_file'
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except KeyError as e:
+        return jsonify({'error': e.args[0]}), 404
+    return None
 
 # ========== RUTAS PRINCIPALES ==========
 
@@ -129,7 +315,12 @@ def reporte():
 
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
-    """Subir y procesar archivo de horarios"""
+    """
+    Subir y procesar archivo de horarios
+    
+    Si ya hay un horario generado, solo se reprograma lo que cambió respecto
+    a los datos previos (``SchedulerServiceNew.reprogramar_carga``).
+    """
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'No se proporcionó archivo'}), 400
@@ -159,24 +350,32 @@ def upload_file():
         else:
             resultado = parser.procesar_json(filepath)
         
-        # Guardar en memoria
-        datos_horarios['raw_data'] = resultado
-        datos_horarios['cursos'] = resultado.get('cursos', [])
-        datos_horarios['profesores'] = resultado.get('profesores', [])
-        datos_horarios['grupos'] = resultado.get('grupos', [])
-        datos_horarios['aulas'] = resultado.get('aulas', [])
-        datos_horarios['timestamp'] = datetime.now().isoformat()
-        
+        previo = g.estado_horarios.actual
+        reprogramado = None
+        if previo['raw_data'] and previo['horario_generado'] is not None:
+            # Ya hay horario: reprogramar solo lo que cambió respecto a los datos previos
+            reprogramado = scheduler.reprogramar_carga(previo['raw_data'], resultado)
+            if not publicar_resultado(g.estado_horarios, resultado, reprogramado, resultado,
+                                      condicion=lambda actual: actual['raw_data'] is previo['raw_data']):
+                return jsonify({'error': 'El horario cambió mientras se procesaba; intente de nuevo'}), 409
+        else:
+            # Publicar en memoria; el horario anterior es de los datos previos y
+            # se descarta en la misma instantánea
+            g.estado_horarios.publicar_datos(
+                resultado, horario_generado=None, grafo_conflictos=None, validacion=None
+            )
+
         return jsonify({
             'success': True,
             'mensaje': 'Archivo procesado correctamente',
             'resumen': {
-                'cursos': len(datos_horarios['cursos']),
-                'profesores': len(datos_horarios['profesores']),
-                'grupos': len(datos_horarios['grupos']),
-                'aulas': len(datos_horarios['aulas'])
+                'cursos': len(resultado.get('cursos', [])),
+                'profesores': len(resultado.get('profesores', [])),
+                'grupos': len(resultado.get('grupos', [])),
+                'aulas': len(resultado.get('aulas', []))
             },
-            'grupos': datos_horarios['grupos']
+            'grupos': resultado.get('grupos', []),
+            'estadisticas': reprogramado['estadisticas'] if reprogramado else None
         })
         
     except Exception as e:
@@ -187,42 +386,127 @@ def upload_file():
 def generar_horarios():
     """Generar horarios usando algoritmo de backtracking"""
     try:
-        if not datos_horarios['raw_data']:
+        datos = g.estado_horarios.actual
+        if not datos['raw_data']:
             return jsonify({'error': 'Primero debe cargar un archivo'}), 400
         
-        # Generar horarios con BACKTRACKING
-        resultado = scheduler.generar_horarios(datos_horarios['raw_data'])
-        
-        # Guardar resultado
-        datos_horarios['horario_generado'] = resultado['horario']
-        datos_horarios['grafo_conflictos'] = resultado['grafo']
-        datos_horarios['validacion'] = resultado['validacion']
+        # Opciones: {'ejecuciones': N, 'limite_segundos': T} activa el modo portafolio;
+        # {'semilla': S} repite una generación anterior; {'solver': 'cpsat' | 'auto'}
+        # usa el modelo exacto para demostrar si existe un horario completo
+        opciones = request.get_json(silent=True) or {}
+        ejecuciones = int(opciones.get('ejecuciones', 1))
+        limite_segundos = opciones.get('limite_segundos')
+        limite_segundos = float(limite_segundos) if limite_segundos else None
+        semilla = opciones.get('semilla')
+        semilla = int(semilla) if semilla is not None else None
+        solver = opciones.get('solver')
+        if solver is not None and solver not in MODOS:
+            return jsonify({'error': f'Motor desconocido: {solver}', 'opciones': MODOS}), 400
+        if solver == 'cpsat' and solver not in solvers_disponibles():
+            return jsonify({'error': 'El motor cpsat requiere OR-Tools (pip install ortools)'}), 400
+        
+        # Generar horarios con BACKTRACKING en segundo plano
+        trabajo_id = encolar_generacion(g.estado_horarios, datos, ejecuciones, limite_segundos, semilla, solver)
         
         return jsonify({
             'success': True,
-            'mensaje': 'Horarios generados con BACKTRACKING',
-            'estadisticas': resultado['estadisticas']
-        })
+            'mensaje': 'Generación de horarios encolada',
+            'trabajo_id': trabajo_id,
+            'estado': trabajos.estado(trabajo_id)['estado']
+        }), 202
         
     except Exception as e:
         logger.error(f"Error al generar horarios: {str(e)}", exc_info=True)
         return jsonify({'error': f'Error al generar: {str(e)}'}), 500
 
+@app.route('/api/horarios/incremental', methods=['POST'])
+def reprogramar_horarios():
+    """Aplicar cambios sobre el horario generado sin regenerarlo completo"""
+    try:
+        datos = g.estado_horarios.actual
+        if not datos['raw_data'] or not datos['horario_generado']:
+            return jsonify({'error': 'Primero debe generar los horarios'}), 400
+
+        # Cambios: agregar_cursos, eliminar_cursos, cambiar_profesor, retirar_aulas, agregar_aulas
+        # (y opcionalmente 'semilla')
+        cambios = request.get_json(silent=True) or {}
+        semilla = cambios.pop('semilla', None)
+        if not cambios:
+            return jsonify({'error': 'No se indicaron cambios'}), 400
+
+        # generar_incremental actualiza los datos en sitio: sobre una copia
+        raw_data = deepcopy(datos['raw_data'])
+        resultado = scheduler.generar_incremental(
+            raw_data, cambios, semilla=int(semilla) if semilla is not None else None
+        )
+        if not publicar_resultado(g.estado_horarios, raw_data, resultado, raw_data,
+                                  condicion=lambda actual: actual['raw_data'] is datos['raw_data']):
+            return jsonify({'error': 'El horario cambió mientras se reprogramaba; intente de nuevo'}), 409
+
+        return jsonify({
+            'success': True,
+            'estadisticas': resultado['estadisticas'],
+            'validacion': resultado['validacion']
+        })
+
+    except Exception as e:
+        logger.error(f"Error al reprogramar horarios: {str(e)}", exc_info=True)
+        return jsonify({'error': f'Error al reprogramar: {str(e)}'}), 500
+
+@app.route('/api/trabajos/<trabajo_id>', methods=['GET'])
+def obtener_trabajo(trabajo_id):
+    """Estado y progreso de un trabajo de generación"""
+    estado = trabajos.estado(trabajo_id)
+    if estado is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    return jsonify(estado)
+
+@app.route('/api/trabajos/<trabajo_id>/cancelar', methods=['POST'])
+def cancelar_trabajo(trabajo_id):
+    """Cancelar un trabajo pendiente o en ejecución"""
+    if trabajos.estado(trabajo_id) is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    if not trabajos.cancelar(trabajo_id):
+        return jsonify({'error': 'El trabajo ya terminó'}), 409
+    return jsonify({'success': True, 'estado': trabajos.estado(trabajo_id)['estado']})
+
+@app.route('/api/trabajos/<trabajo_id>/resultado', methods=['GET'])
+def obtener_resultado_trabajo(trabajo_id):
+    """Resultado final de un trabajo de generación"""
+    estado = trabajos.estado(trabajo_id)
+    if estado is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    if estado['estado'] == 'error':
+        return jsonify({'error': estado['error']}), 500
+    
+    resultado = trabajos.resultado(trabajo_id)
+    if resultado is None:
+        return jsonify({'error': 'El trabajo no ha terminado', 'estado': estado['estado']}), 409
+    
+    return jsonify({
+        'success': estado['estado'] == 'terminado',
+        'estado': estado['estado'],
+        'estadisticas': resultado['estadisticas'],
+        'validacion': resultado['validacion']
+    })
+
 @app.route('/api/grupos', methods=['GET'])
 def obtener_grupos():
     """Obtener lista de grupos disponibles"""
     try:
+        datos = g.estado_horarios.actual
+        
         # Si hay horarios generados, solo mostrar grupos con horarios
-        if datos_horarios.get('horario_generado'):
-            grupos_con_horarios = list(datos_horarios['horario_generado'].keys())
+        if datos.get('horario_generado'):
+            grupos_con_horarios = list(datos['horario_generado'].keys())
             return jsonify({
                 'grupos': sorted(grupos_con_horarios)
             })
         
         # Si hay grupos en memoria, usarlos
-        if datos_horarios.get('grupos'):
+        if datos.get('grupos'):
             return jsonify({
-                'grupos': datos_horarios['grupos']
+                'grupos': datos['grupos']
             })
         
         # Cargar grupos desde CSV como fallback
@@ -244,13 +528,11 @@ def obtener_grupos():
 def obtener_horario_grupo(grupo):
     """Obtener horario de un grupo específico"""
     try:
-        if not datos_horarios['horario_generado']:
+        datos = g.estado_horarios.actual
+        if not datos['horario_generado']:
             return jsonify({'error': 'No hay horarios generados'}), 400
         
-        from services.query_service import QueryService
-        query = QueryService(datos_horarios)
-        
-        horario = query.obtener_horario_grupo(grupo)
+        horario = datos.consultas.obtener_horario_grupo(grupo)
         return jsonify(horario)
         
     except Exception as e:
@@ -262,7 +544,7 @@ def obtener_profesores():
     """Obtener lista de profesores"""
     try:
         return jsonify({
-            'profesores': datos_horarios['profesores']
+            'profesores': g.estado_horarios.actual['profesores']
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -271,37 +553,88 @@ def obtener_profesores():
 def obtener_horario_profesor(nombre):
     """Obtener horario de un profesor específico"""
     try:
-        if not datos_horarios['horario_generado']:
+        datos = g.estado_horarios.actual
+        if not datos['horario_generado']:
             return jsonify({'error': 'No hay horarios generados'}), 400
         
-        from services.query_service import QueryService
-        query = QueryService(datos_horarios)
-        
-        horario = query.obtener_horario_profesor(nombre)
+        horario = datos.consultas.obtener_horario_profesor(nombre)
         return jsonify(horario)
         
     except Exception as e:
         logger.error(f"Error al obtener horario profesor: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/aula/<aula>', methods=['GET'])
+def obtener_horario_aula(aula):
+    """Obtener las clases asignadas a un aula"""
+    try:
+        datos = g.estado_horarios.actual
+        if not datos['horario_generado']:
+            return jsonify({'error': 'No hay horarios generados'}), 400
+        
+        return jsonify(datos.consultas.obtener_horario_aula(aula))
+        
+    except Exception as e:
+        logger.error(f"Error al obtener horario aula: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/curso/<nombre>', methods=['GET'])
+def obtener_horario_curso(nombre):
+    """Obtener las sesiones de una materia en todos sus grupos"""
+    try:
+        datos = g.estado_horarios.actual
+        if not datos['horario_generado']:
+            return jsonify({'error': 'No hay horarios generados'}), 400
+        
+        return jsonify(datos.consultas.obtener_horario_curso(nombre))
+        
+    except Exception as e:
+        logger.error(f"Error al obtener horario curso: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/franja/<dia>/<path:franja>', methods=['GET'])
+def obtener_clases_franja(dia, franja):
+    """Obtener todas las clases simultáneas en un día y franja"""
+    try:
+        datos = g.estado_horarios.actual
+        if not datos['horario_generado']:
+            return jsonify({'error': 'No hay horarios generados'}), 400
+        
+        return jsonify(datos.consultas.obtener_clases_franja(dia, franja))
+        
+    except Exception as e:
+        logger.error(f"Error al obtener clases de franja: {str(e)}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/grafo', methods=['GET'])
 def obtener_grafo():
     """Obtener datos del grafo de conflictos"""
     try:
         # Si hay grafo en memoria, usarlo
-        if datos_horarios.get('grafo_conflictos'):
-            grafo = datos_horarios['grafo_conflictos']
+        grafo = g.estado_horarios.actual.get('grafo_conflictos')
+        if grafo:
+            total_enlaces = contar_enlaces(grafo)
+            
+            # ?hiperaristas=1 devuelve los profesores como hiperaristas (payload compacto)
+            if request.args.get('hiperaristas') in ('1', 'true'):
+                enlaces = grafo.get('enlaces', [])
+            else:
+                enlaces = expandir_hiperaristas(grafo)
+            
             # Normalizar respuesta (enlaces -> conexiones para compatibilidad)
-            return jsonify({
+            respuesta = {
                 'nodos': grafo.get('nodos', []),
-                'conexiones': grafo.get('enlaces', []),
-                'enlaces': grafo.get('enlaces', []),  # Mantener ambos para compatibilidad
+                'conexiones': enlaces,
+                'enlaces': enlaces,  # Mantener ambos para compatibilidad
                 'estadisticas': {
                     'total_nodos': len(grafo.get('nodos', [])),
-                    'total_conexiones': len(grafo.get('enlaces', [])),
-                    'total_conflictos': len(grafo.get('enlaces', []))
+                    'total_conexiones': total_enlaces,
+                    'total_conflictos': total_enlaces
                 }
-            })
+            }
+            if request.args.get('hiperaristas') in ('1', 'true'):
+                respuesta['hiperaristas'] = grafo.get('hiperaristas', [])
+            return jsonify(respuesta)
         
         # Generar grafo básico desde CSV
         import pandas as pd
@@ -347,10 +680,11 @@ def obtener_grafo():
 def obtener_validacion():
     """Obtener reporte de validación"""
     try:
-        if not datos_horarios['validacion']:
+        validacion = g.estado_horarios.actual['validacion']
+        if not validacion:
             return jsonify({'error': 'No hay validación generada'}), 400
         
-        return jsonify(datos_horarios['validacion'])
+        return jsonify(validacion)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -359,40 +693,99 @@ def obtener_validacion():
 def exportar_horarios(formato):
     """Exportar horarios en diferentes formatos"""
     try:
-        if not datos_horarios['horario_generado']:
+        datos = g.estado_horarios.actual
+        if not datos['horario_generado']:
             return jsonify({'error': 'No hay horarios para exportar'}), 400
         
-        from services.export_service import ExportService
-        exporter = ExportService(datos_horarios)
-        
-        if formato == 'json':
-            filepath = exporter.exportar_json()
-        elif formato == 'excel':
-            filepath = exporter.exportar_excel()
-        elif formato == 'pdf':
-            filepath = exporter.exportar_pdf()
-        else:
+        if formato not in EXTENSIONES:
             return jsonify({'error': 'Formato no soportado'}), 400
         
-        return send_file(filepath, as_attachment=True)
+        # El ETag es la huella del contenido: si el cliente ya lo tiene, no se renderiza
+        exporter = datos.exportador
+        etag = exporter.huella(formato)
+        if request.if_none_match.contains(etag):
+            respuesta = app.response_class(status=304)
+            respuesta.set_etag(etag)
+            return respuesta
+        
+        filepath = exporter.exportar(formato)
+        respuesta = send_file(filepath, as_attachment=True, etag=etag,
+                              download_name=f"horarios.{EXTENSIONES[formato]}")
+        respuesta.headers['Cache-Control'] = 'no-cache'
+        return respuesta
         
     except Exception as e:
         logger.error(f"Error al exportar: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/exportar-stream/<formato>', methods=['GET'])
+def exportar_horarios_stream(formato):
+    """Exportar horarios como flujo JSON o NDJSON sin materializar el documento"""
+    datos = g.estado_horarios.actual
+    if not datos['horario_generado']:
+        return jsonify({'error': 'No hay horarios para exportar'}), 400
+    
+    # El flujo sigue leyendo esta instantánea aunque se publique otra mientras se envía
+    exporter = datos.exportador
+    if formato == 'json':
+        partes, mimetype = exporter.iterar_json(), 'application/json'
+    elif formato == 'ndjson':
+        partes, mimetype = exporter.iterar_ndjson(), 'application/x-ndjson'
+    else:
+        return jsonify({'error': 'Formato no soportado'}), 400
+    
+    # gzip si el cliente lo acepta o se pide con ?gzip=1
+    comprimir = request.args.get('gzip') == '1' or 'gzip' in request.accept_encodings
+    
+    # ETag distinto del archivo de /api/exportar y de la variante sin comprimir
+    etag = f"{exporter.huella(formato)}-stream{'-gzip' if comprimir else ''}"
+    if request.if_none_match.contains(etag):
+        respuesta = app.response_class(status=304)
+        respuesta.set_etag(etag)
+        return respuesta
+    
+    cuerpo = comprimir_gzip(partes) if comprimir else (parte.encode('utf-8') for parte in partes)
+    
+    respuesta = Response(cuerpo, mimetype=mimetype)
+    if comprimir:
+        respuesta.headers['Content-Encoding'] = 'gzip'
+        respuesta.headers['Vary'] = 'Accept-Encoding'
+    respuesta.headers['Content-Disposition'] = f'attachment; filename=horarios.{formato}'
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    respuesta.set_etag(etag)
+    return respuesta
+
 @app.route('/api/estado', methods=['GET'])
 def obtener_estado():
     """Obtener estado actual del sistema"""
+    datos = g.estado_horarios.actual
+    programa, periodo = registro.clave(request.args.get('programa'), request.args.get('periodo'))
+    return jsonify({
+        'listo': arranque['listo'].is_set(),
+        'arranque_segundos': arranque['segundos'],
+        'programa': programa,
+        'periodo': periodo,
+        'datos_cargados': datos['raw_data'] is not None,
+        'horarios_generados': datos['horario_generado'] is not None,
+        'grupos_disponibles': len(datos['grupos']),
+        'grupos': datos['grupos'],
+        'total_cursos': len(datos['cursos']),
+        'total_profesores': len(datos['profesores']),
+        'total_grupos': len(datos['grupos']),
+        'total_aulas': len(datos['aulas']),
+        'timestamp': datos['timestamp'],
+        'trabajo_generacion': datos['trabajo_generacion']
+    })
+
+@app.route('/api/registro', methods=['GET'])
+def obtener_registro():
+    """Programas y periodos en memoria y uso del presupuesto de memoria"""
     return jsonify({
-        'datos_cargados': datos_horarios['raw_data'] is not None,
-        'horarios_generados': datos_horarios['horario_generado'] is not None,
-        'grupos_disponibles': len(datos_horarios['grupos']),
-        'grupos': datos_horarios['grupos'],
-        'total_cursos': len(datos_horarios['cursos']),
-        'total_profesores': len(datos_horarios['profesores']),
-        'total_grupos': len(datos_horarios['grupos']),
-        'total_aulas': len(datos_horarios['aulas']),
-        'timestamp': datos_horarios['timestamp']
+        'por_defecto': {'programa': CLAVE_POR_DEFECTO[0], 'periodo': CLAVE_POR_DEFECTO[1]},
+        'en_memoria': registro.resumen(),
+        'bytes_en_memoria': registro.memoria(),
+        'presupuesto_bytes': registro.memoria_max,
+        'desalojos': registro.desalojos
     })
 
 # ========== ARCHIVOS ESTÁTICOS ==========
@@ -440,12 +833,20 @@ if __name__ == '__main__':
     print("  - GET  /profesor            Consulta por profesor")
     print("  - GET  /reporte             Reporte de validación")
     print("  - POST /api/upload          Subir archivo")
-    print("  - POST /api/generar-horarios Generar horarios")
+    print("  - POST /api/generar-horarios Generar horarios (trabajo)")
+    print("  - GET  /api/trabajos/<id>   Progreso de un trabajo")
     print("  - GET  /api/grupos          Lista de grupos")
     print("  - GET  /api/horario/<grupo> Horario por grupo")
+    print("  - GET  /api/profesor/<nombre> Horario por profesor")
+    print("  - GET  /api/aula/<aula>     Clases por aula")
+    print("  - GET  /api/curso/<nombre>  Sesiones por materia")
+    print("  - GET  /api/franja/<dia>/<franja> Clases simultáneas")
     print("  - GET  /api/grafo           Datos del grafo")
     print("  - GET  /api/validacion      Reporte de validación")
     print("  - GET  /api/exportar/<fmt>  Exportar horarios")
+    print("  - GET  /api/exportar-stream/<json|ndjson> Exportación en streaming")
+    print("  - GET  /api/registro        Programas y periodos cargados")
+    print("\n  Todas las rutas de /api aceptan ?programa=...&periodo=...")
     print("\n" + "=" * 60 + "\n")
     
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,3 @@
+"""
+Benchmarks reproducibles del generador de horarios
+"""
@@ -0,0 +1,178 @@
+"""
+Benchmark del arranque de la aplicación
+Importa ``app`` en un proceso nuevo por medición y registra cuánto tarda la
+importación, la primera respuesta de /api/estado y la carga inicial (hasta
+que /api/estado indica ``listo``), además de qué dependencias pesadas quedaron
+importadas. Casos:
+
+    sin_persistencia   HORARIOS_DB vacío: se procesa el Excel por defecto
+    excel              base nueva: se procesa el Excel y se guarda el estado
+    restaurar          base con el estado guardado por el caso anterior
+
+El Excel se lee de la caché del parser (data/cache) si ya se procesó antes.
+
+Uso (desde web/backend):
+    python -m benchmarks.bench_arranque
+    python -m benchmarks.bench_arranque --repeticiones 5 --salida base.json
+    python -m benchmarks.bench_arranque --comparar base.json
+    python -m benchmarks.bench_arranque --arranque sincrono
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import platform
+import argparse
+import subprocess
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable
+
+DIR_BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Dependencias que el arranque no debería importar si no las necesita
+PESADAS = ['pandas', 'openpyxl', 'reportlab', 'ortools']
+
+# Un caso se considera más lento si supera la referencia en este factor
+TOLERANCIA = 1.25
+
+# Se ejecuta en el proceso hijo; imprime las métricas como JSON en la última línea
+MEDICION = """
+import sys, time, json
+inicio = time.perf_counter()
+import app
+importado = time.perf_counter()
+cliente = app.app.test_client()
+cliente.get('/api/estado')
+respuesta = time.perf_counter()
+app.arranque['listo'].wait()
+listo = time.perf_counter()
+modulos = [m for m in {pesadas} if m in sys.modules]
+if {esperar_horario}:
+    while not cliente.get('/api/estado').get_json()['horarios_generados']:
+        time.sleep(0.05)
+print(json.dumps({{
+    'importar': importado - inicio,
+    'primera_respuesta': respuesta - inicio,
+    'listo': listo - inicio,
+    'modulos_pesados': modulos
+}}))
+"""
+
+
+def medir_proceso(entorno: Dict[str, str], esperar_horario: bool = False) -> Dict[str, Any]:
+    """Arranca la aplicación en un proceso nuevo y devuelve sus tiempos"""
+    codigo = MEDICION.format(pesadas=PESADAS, esperar_horario=esperar_horario)
+    salida = subprocess.run(
+        [sys.executable, '-c', codigo], cwd=DIR_BACKEND, env=dict(os.environ, **entorno),
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def medir(entorno: Dict[str, str], repeticiones: int, antes: Optional[Callable[[], None]] = None,
+          preparar: bool = False) -> Dict[str, Any]:
+    """
+    Mejor tiempo de ``repeticiones`` arranques (los módulos, del último)
+
+    Args:
+        antes: Se llama antes de cada arranque (p. ej. para vaciar la base)
+        preparar: En el último arranque esperar también a que se genere el
+            horario, para que quede guardado
+    """
+    mediciones = []
+    for i in range(repeticiones):
+        if antes is not None:
+            antes()
+        mediciones.append(medir_proceso(entorno, esperar_horario=preparar and i == repeticiones - 1))
+    metricas = {
+        clave: round(min(m[clave] for m in mediciones), 4)
+        for clave in ('importar', 'primera_respuesta', 'listo')
+    }
+    metricas['modulos_pesados'] = mediciones[-1]['modulos_pesados']
+    return metricas
+
+
+def ejecutar(repeticiones: int = 3, arranque: str = 'diferido') -> Dict[str, Any]:
+    """Corre todos los casos y devuelve el informe completo"""
+    directorio = tempfile.mkdtemp(prefix='bench_arranque_')
+    base = os.path.join(directorio, 'horarios.db')
+    comun = {'HORARIOS_ARRANQUE': arranque, 'HORARIOS_DIR_COMPARTIDO': ''}
+
+    def vaciar():
+        for archivo in os.listdir(directorio):
+            os.remove(os.path.join(directorio, archivo))
+
+    try:
+        casos = {
+            'sin_persistencia': medir(dict(comun, HORARIOS_DB=''), repeticiones),
+            # Cada arranque parte de una base vacía; el último deja guardado
+            # el estado (con el horario ya generado) para 'restaurar'
+            'excel': medir(dict(comun, HORARIOS_DB=base), repeticiones, antes=vaciar, preparar=True),
+            'restaurar': medir(dict(comun, HORARIOS_DB=base), repeticiones)
+        }
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    for nombre, caso in casos.items():
+        print(f"{nombre:>16}: importar {caso['importar']:.3f} s  "
+              f"primera respuesta {caso['primera_respuesta']:.3f} s  "
+              f"listo {caso['listo']:.3f} s  "
+              f"[{', '.join(caso['modulos_pesados']) or 'sin dependencias pesadas'}]")
+
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'arranque': arranque,
+        'repeticiones': repeticiones,
+        'casos': casos
+    }
+
+
+def comparar(actual: Dict[str, Any], referencia: Dict[str, Any],
+             tolerancia: float = TOLERANCIA) -> List[str]:
+    """Casos que tardan más en servir o en quedar listos que en la referencia"""
+    regresiones = []
+    for nombre, caso in actual['casos'].items():
+        previo = referencia.get('casos', {}).get(nombre)
+        if previo is None:
+            continue
+        for clave in ('primera_respuesta', 'listo'):
+            if caso[clave] > previo[clave] * tolerancia:
+                regresiones.append(f"{nombre}: {clave} {previo[clave]:.3f} s → {caso[clave]:.3f} s")
+        nuevas = set(caso['modulos_pesados']) - set(previo['modulos_pesados'])
+        if nuevas:
+            regresiones.append(f"{nombre}: ahora importa {', '.join(sorted(nuevas))} al arrancar")
+    return regresiones
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark del arranque de la aplicación')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--arranque', default='diferido', choices=['diferido', 'sincrono'],
+                        help='Modo de arranque (HORARIOS_ARRANQUE)')
+    parser.add_argument('--salida', help='Guardar el informe JSON en este archivo')
+    parser.add_argument('--comparar', help='Informe JSON de referencia')
+    args = parser.parse_args(argv)
+
+    informe = ejecutar(args.repeticiones, args.arranque)
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        print(f"Informe guardado en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            regresiones = comparar(informe, json.load(f))
+        for regresion in regresiones:
+            print(f"⚠️  Regresión {regresion}")
+        return 1 if regresiones else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
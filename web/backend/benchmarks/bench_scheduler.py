@@ -0,0 +1,219 @@
+"""
+Benchmark de SchedulerServiceNew
+Ejecuta el generador con semilla fija sobre el libro incluido en el repositorio,
+sobre copias escaladas (10×, 100× grupos) y, opcionalmente, sobre instancias
+sintéticas (``benchmarks.generador``), y registra tiempo, sesiones colocadas
+y memoria pico de cada caso.
+
+Uso (desde web/backend):
+    python -m benchmarks.bench_scheduler
+    python -m benchmarks.bench_scheduler --escalas 1 10 --salida base.json
+    python -m benchmarks.bench_scheduler --comparar base.json
+    python -m benchmarks.bench_scheduler --escalas 1 --sinteticos 200 1000
+    python -m benchmarks.bench_scheduler --escalas 1 10 --solver cpsat
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import logging
+import argparse
+import platform
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services.parser_service_new import ParserServiceNew
+from services.scheduler_service_new import SchedulerServiceNew
+from benchmarks.generador import generar_instancia
+
+EXCEL_POR_DEFECTO = os.path.join(os.path.dirname(__file__), '../../../Horarios EneAbr18 (1).xlsx')
+
+SEMILLA_POR_DEFECTO = 12345
+
+# Un caso se considera más lento si supera la referencia en este factor
+TOLERANCIA = 1.25
+
+
+def escalar(datos: Dict[str, Any], factor: int) -> Dict[str, Any]:
+    """
+    Réplica de ``datos`` con ``factor`` copias de cada grupo
+
+    Cada copia tiene sus propios profesores y aulas, así que la instancia
+    escalada es tan factible como la original pero con ``factor`` veces más
+    variables y restricciones.
+    """
+    if factor == 1:
+        return copy.deepcopy(datos)
+
+    def sufijo(valor, k):
+        return f"{valor} #{k}" if k and valor else valor
+
+    cursos, aulas_info = [], []
+    for k in range(factor):
+        for curso in datos['cursos']:
+            cursos.append(dict(
+                curso,
+                id=f"{curso['id']}#{k}",
+                grupo=sufijo(curso['grupo'], k),
+                profesor=sufijo(curso['profesor'], k),
+                horarios=[]
+            ))
+        for aula in datos.get('aulas_info') or []:
+            aulas_info.append(dict(aula, codigo=sufijo(aula['codigo'], k)))
+
+    disponibilidad = {
+        sufijo(profesor, k): intervalos
+        for k in range(factor)
+        for profesor, intervalos in (datos.get('disponibilidad') or {}).items()
+    }
+    return {
+        'cursos': cursos,
+        'grupos': [sufijo(grupo, k) for k in range(factor) for grupo in datos['grupos']],
+        'aulas': [sufijo(aula, k) for k in range(factor) for aula in datos['aulas']],
+        'aulas_info': aulas_info,
+        'disponibilidad': disponibilidad,
+        'profesores': []
+    }
+
+
+def medir(datos: Dict[str, Any], semilla: int, repeticiones: int = 1,
+          memoria: bool = True, solver: str = 'csp') -> Dict[str, Any]:
+    """
+    Genera el horario y devuelve las métricas del caso
+
+    El tiempo es el mejor de ``repeticiones`` ejecuciones sin
+    ``tracemalloc`` (que ralentiza la búsqueda); la memoria pico se mide en
+    una ejecución aparte con la misma semilla.
+    """
+    scheduler = SchedulerServiceNew()
+
+    segundos = float('inf')
+    for _ in range(repeticiones):
+        entrada = copy.deepcopy(datos)
+        inicio = time.perf_counter()
+        resultado = scheduler.generar_horarios(entrada, ejecuciones=1, semilla=semilla, solver=solver)
+        segundos = min(segundos, time.perf_counter() - inicio)
+    est = resultado['estadisticas']
+
+    metricas = {
+        'grupos': len(datos['grupos']),
+        'segundos': round(segundos, 4),
+        'sesiones_asignadas': est['sesiones_asignadas'],
+        'total_sesiones': est['total_sesiones'],
+        'nodos_explorados': est['nodos_explorados'],
+        'retrocesos': est['retrocesos'],
+        'semilla': est['semilla']
+    }
+    if 'estado_exacto' in est:
+        metricas['estado_exacto'] = est['estado_exacto']
+        metricas['gap'] = est['gap']
+
+    if memoria:
+        entrada = copy.deepcopy(datos)
+        tracemalloc.start()
+        scheduler.generar_horarios(entrada, ejecuciones=1, semilla=semilla, solver=solver)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        metricas['memoria_pico_mb'] = round(pico / 2 ** 20, 2)
+
+    return metricas
+
+
+def instancia_sintetica(grupos: int, semilla: int) -> Dict[str, Any]:
+    """
+    Instancia sintética con las proporciones del libro original: unos tres
+    profesores por grupo y aulas de sobra para las ~14 sesiones de cada grupo
+    """
+    return generar_instancia(
+        carreras=max(1, grupos // 50), grupos=grupos, profesores=3 * grupos,
+        aulas=max(18, grupos // 2), densidad=0.5, semilla=semilla
+    )
+
+
+def ejecutar(excel: str, escalas: List[int], semilla: int, repeticiones: int = 1,
+             memoria: bool = True, sinteticos: Optional[List[int]] = None,
+             solver: str = 'csp') -> Dict[str, Any]:
+    """Corre todos los casos y devuelve el informe completo"""
+    entradas = []
+    if escalas:
+        base = ParserServiceNew(usar_cache=False).procesar_excel(excel)
+        entradas += [(f"libro_x{factor}", lambda f=factor: escalar(base, f)) for factor in escalas]
+    entradas += [(f"sintetico_{grupos}", lambda g=grupos: instancia_sintetica(g, semilla))
+                 for grupos in sinteticos or []]
+
+    casos = {}
+    for nombre, construir in entradas:
+        caso = casos[nombre] = medir(construir(), semilla, repeticiones, memoria, solver)
+        print(f"{nombre:>16}: {caso['segundos']:8.3f} s  "
+              f"{caso['sesiones_asignadas']}/{caso['total_sesiones']} sesiones  "
+              f"{caso.get('memoria_pico_mb', '-')} MB")
+
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'semilla': semilla,
+        'solver': solver,
+        'casos': casos
+    }
+
+
+def comparar(actual: Dict[str, Any], referencia: Dict[str, Any],
+             tolerancia: float = TOLERANCIA) -> List[str]:
+    """Casos más lentos o con menos sesiones colocadas que en la referencia"""
+    regresiones = []
+    for nombre, caso in actual['casos'].items():
+        previo = referencia.get('casos', {}).get(nombre)
+        if previo is None:
+            continue
+        if caso['segundos'] > previo['segundos'] * tolerancia:
+            regresiones.append(f"{nombre}: {previo['segundos']:.3f} s → {caso['segundos']:.3f} s")
+        if caso['sesiones_asignadas'] < previo['sesiones_asignadas']:
+            regresiones.append(
+                f"{nombre}: {previo['sesiones_asignadas']} → {caso['sesiones_asignadas']} sesiones asignadas"
+            )
+    return regresiones
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark de SchedulerServiceNew')
+    parser.add_argument('--excel', default=EXCEL_POR_DEFECTO, help='Libro de horarios de entrada')
+    parser.add_argument('--escalas', type=int, nargs='*', default=[1, 10, 100],
+                        help='Factores de réplica de grupos')
+    parser.add_argument('--sinteticos', type=int, nargs='*', default=[],
+                        help='Grupos de cada instancia sintética')
+    parser.add_argument('--semilla', type=int, default=SEMILLA_POR_DEFECTO)
+    parser.add_argument('--solver', default='csp', help='Motor: csp, cpsat o auto')
+    parser.add_argument('--repeticiones', type=int, default=1)
+    parser.add_argument('--sin-memoria', action='store_true', help='No medir memoria pico')
+    parser.add_argument('--salida', help='Guardar el informe JSON en este archivo')
+    parser.add_argument('--comparar', help='Informe JSON de referencia')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    informe = ejecutar(args.excel, args.escalas, args.semilla, args.repeticiones,
+                       memoria=not args.sin_memoria, sinteticos=args.sinteticos,
+                       solver=args.solver)
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        print(f"Informe guardado en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            regresiones = comparar(informe, json.load(f))
+        for regresion in regresiones:
+            print(f"⚠️  Regresión {regresion}")
+        return 1 if regresiones else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,390 @@
+"""
+Generador de instancias sintéticas
+Produce instancias del tamaño de una universidad completa en los mismos
+formatos que lee el sistema: el libro Excel con la hoja 'Matriz ITI' que
+procesa ParserServiceNew, el JSON de ParserService.procesar_json y los
+archivos aulas.csv y Disponibilidad.csv de la carpeta de datos.
+
+Uso (desde web/backend):
+    python -m benchmarks.generador /tmp/instancia --carreras 10 --grupos 400 \\
+        --profesores 900 --aulas 120 --densidad 0.4
+
+La carpeta resultante se carga con
+    ParserServiceNew(data_dir=carpeta).procesar_excel(carpeta + '/horarios.xlsx')
+"""
+
+import os
+import sys
+import csv
+import json
+import heapq
+import random
+import argparse
+from typing import Dict, List, Any, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services.solver_csp import sesiones_por_curso
+from services.disponibilidad import mascaras_disponibilidad, rango_minutos
+from services.scheduler_service_new import SchedulerServiceNew
+
+CARRERAS = ['ITI', 'IM', 'ISA', 'IET', 'ITM', 'LAG', 'PYM', 'IMA', 'IFI', 'ICI']
+
+CUATRIMESTRES = ['Primer', 'Segundo', 'Tercer', 'Cuarto', 'Quinto', 'Sexto',
+                 'Séptimo', 'Octavo', 'Noveno']
+ROMANOS = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX']
+TURNOS = ['Matutino', 'Vespertino']
+
+MATERIAS = [
+    'Algoritmos', 'Programación', 'Estructuras de Datos', 'Bases de Datos', 'Redes',
+    'Sistemas Operativos', 'Cálculo', 'Álgebra Lineal', 'Física', 'Probabilidad',
+    'Estadística', 'Ingeniería de Software', 'Arquitectura de Computadoras',
+    'Electrónica', 'Control', 'Termodinámica', 'Mecánica', 'Química', 'Administración',
+    'Contabilidad', 'Mercadotecnia', 'Finanzas', 'Economía', 'Graficación',
+    'Inteligencia Artificial', 'Seguridad Informática', 'Programación WEB',
+    'Minería de Datos', 'Robótica', 'Manufactura', 'Materiales', 'Circuitos'
+]
+
+NOMBRES = ['Ana', 'Luis', 'María', 'José', 'Carmen', 'Jorge', 'Laura', 'Carlos', 'Sofía',
+           'Miguel', 'Elena', 'Ricardo', 'Patricia', 'Fernando', 'Rosa', 'Alberto',
+           'Diana', 'Hugo', 'Karla', 'Raúl', 'Adriana', 'Arturo', 'Marina', 'Israel',
+           'Alma', 'Mario', 'Lucía', 'Héctor', 'Gabriela', 'Manuel']
+APELLIDOS = ['Garza', 'Treviño', 'Hernández', 'López', 'Martínez', 'González', 'Pérez',
+             'Rodríguez', 'Sánchez', 'Ramírez', 'Flores', 'Cruz', 'Reyes', 'Morales',
+             'Ortiz', 'Castillo', 'Vázquez', 'Jiménez', 'Ruiz', 'Mendoza', 'Aguilar',
+             'Salinas', 'Cienfuegos', 'Ornelas', 'Pulido', 'Camargo', 'Robledo',
+             'Maganda', 'Polanco', 'Requena']
+TITULOS = ['Dr.', 'Dra.', 'M.C.', 'M.I.', 'M.S.I.', 'Ing.', 'Lic.']
+
+# Módulos de 55 minutos de la hoja de disponibilidad (None: fila de receso)
+MODULOS = ['7:00-7:55', '7:55-8:50', '8:50-9:45', '9:45-10:40', None,
+           '11:10-12:05', '12:05-13:00', '13:00-13:55', None,
+           '14:00-14:55', '14:55-15:50', '15:50-16:45', '16:45-17:40', None,
+           '18:00-18:55', '18:55-19:50', '19:50-20:45']
+DIAS_HOJA = ['L', 'M', 'Mi', 'J', 'V']
+
+# Profesores por banda horizontal en Disponibilidad.csv (como la hoja original)
+PROFESORES_POR_BANDA = 19
+
+
+def _codigos_carrera(n: int) -> List[str]:
+    """Códigos alfabéticos de carrera (los de la UPV primero)"""
+    codigos = CARRERAS[:n]
+    i = 0
+    while len(codigos) < n:
+        codigo, k = '', i
+        while True:
+            codigo = chr(ord('A') + k % 26) + codigo
+            k = k // 26 - 1
+            if k < 0:
+                break
+        if f"C{codigo}" not in codigos:
+            codigos.append(f"C{codigo}")
+        i += 1
+    return codigos
+
+
+def _repartir(total: int, partes: int) -> List[int]:
+    """Divide ``total`` en ``partes`` enteros lo más parejos posible"""
+    base, resto = divmod(total, partes)
+    return [base + (1 if i < resto else 0) for i in range(partes)]
+
+
+def generar_instancia(carreras: int = 1, grupos: int = 11, profesores: int = 30,
+                      aulas: int = 18, densidad: float = 0.5, semilla: int = 0,
+                      laboratorios: float = 0.2, materias_por_cuatrimestre: int = 6) -> Dict[str, Any]:
+    """
+    Genera una instancia aleatoria pero reproducible
+
+    Cada carrera reparte sus grupos en secciones (cuatrimestre × turno); cada
+    sección lleva el plan de su cuatrimestre y cada materia de la sección la
+    imparte un solo profesor para todos sus grupos, como en la Matriz ITI.
+    Las materias se reparten al profesor con menos carga. La disponibilidad
+    marca cada módulo con probabilidad ``densidad`` y, si no alcanza, se
+    completa hasta cubrir la carga del profesor.
+
+    Args:
+        carreras: Número de carreras
+        grupos: Total de grupos (se reparten entre las carreras)
+        profesores: Número de profesores
+        aulas: Número de aulas
+        densidad: Fracción de módulos de 55 min en que un profesor está disponible
+        semilla: Semilla del generador
+        laboratorios: Fracción de aulas que son laboratorios
+        materias_por_cuatrimestre: Materias del plan de cada cuatrimestre
+
+    Returns:
+        Diccionario en el formato de ``ParserServiceNew.procesar_excel`` más
+        la clave 'secciones' con la estructura de la hoja
+    """
+    rng = random.Random(semilla)
+    scheduler = SchedulerServiceNew()
+
+    # Profesores con nombres únicos (nombre + dos apellidos)
+    combinaciones = set()
+    nombres_prof = []
+    while len(nombres_prof) < profesores:
+        nombre = (rng.choice(NOMBRES), rng.choice(APELLIDOS), rng.choice(APELLIDOS))
+        if nombre not in combinaciones:
+            combinaciones.add(nombre)
+            nombres_prof.append(f"{rng.choice(TITULOS)} {' '.join(nombre)}")
+    carga = [(0, rng.random(), i) for i in range(profesores)]
+    heapq.heapify(carga)
+    sesiones_prof = [0] * profesores
+
+    # Secciones y filas de la matriz
+    secciones = []
+    for carrera, grupos_carrera in zip(_codigos_carrera(carreras), _repartir(grupos, carreras)):
+        if not grupos_carrera:
+            continue
+        num_secciones = min(len(CUATRIMESTRES) * len(TURNOS), grupos_carrera)
+        planes = {}
+        for s, tamano in enumerate(_repartir(grupos_carrera, num_secciones)):
+            cuatri, turno = divmod(s, len(TURNOS))
+            if cuatri not in planes:
+                planes[cuatri] = [
+                    (f"{materia} {ROMANOS[cuatri]}", rng.choice([3, 4, 5, 6]))
+                    for materia in rng.sample(MATERIAS, materias_por_cuatrimestre)
+                ]
+            etiquetas = [f"{carrera} {cuatri + 1}-{turno * 3 + k + 1}" for k in range(tamano)]
+            if tamano == 1:
+                nombres_grupo = [f"{carrera}-{cuatri + 1}{TURNOS[turno][0]}"]
+            else:
+                nombres_grupo = [f"{carrera}-{cuatri + 1}{TURNOS[turno][0]}{k + 1}" for k in range(tamano)]
+
+            filas = []
+            for materia, horas in planes[cuatri]:
+                _, desempate, prof = heapq.heappop(carga)
+                sesiones_prof[prof] += tamano * sesiones_por_curso({'horas_semana': horas})
+                heapq.heappush(carga, (sesiones_prof[prof], desempate, prof))
+                filas.append({'materia': materia, 'horas': horas, 'profesor': prof})
+
+            secciones.append({
+                'carrera': carrera,
+                'cuatrimestre': cuatri,
+                'encabezado': f"{TURNOS[turno]} ({', '.join(etiquetas)})",
+                'grupos': nombres_grupo,
+                'filas': filas
+            })
+
+    # Cursos y profesores tal como los devuelve el parser
+    lista_prof = [
+        {'id': f"PROF_{i + 1}", 'nombre': nombre, 'horas_asignadas': 0, 'cursos': []}
+        for i, nombre in enumerate(nombres_prof)
+    ]
+    cursos = []
+    for seccion in secciones:
+        for fila in seccion['filas']:
+            prof = lista_prof[fila['profesor']]
+            prof['horas_asignadas'] += fila['horas'] * len(seccion['grupos'])
+            for grupo in seccion['grupos']:
+                curso_id = f"CURSO_{len(cursos) + 1}"
+                prof['cursos'].append(curso_id)
+                cursos.append({
+                    'id': curso_id,
+                    'nombre': fila['materia'],
+                    'grupo': grupo,
+                    'horas_semana': fila['horas'],
+                    'profesor': prof['nombre'],
+                    'aula': None,
+                    'horarios': []
+                })
+    for prof in lista_prof:
+        prof['horas_asignadas'] = float(prof['horas_asignadas'])
+
+    # Aulas
+    num_labs = int(round(aulas * laboratorios))
+    aulas_info = [
+        {'codigo': f"Aula-{i + 1}", 'nombre': f"Aula {i + 1}",
+         'capacidad': rng.choice([30, 35, 40]), 'tipo': 'Teoría'}
+        for i in range(aulas - num_labs)
+    ] + [
+        {'codigo': f"Lab-{i + 1}", 'nombre': f"Laboratorio {i + 1}",
+         'capacidad': rng.choice([25, 30]), 'tipo': 'Laboratorio'}
+        for i in range(num_labs)
+    ]
+
+    # Disponibilidad: módulos al azar y, si no cubren la carga, más módulos
+    modulos = [(dia, rango_minutos(m)) for dia in scheduler.dias for m in MODULOS if m]
+    disponibilidad = {}
+    for i, nombre in enumerate(nombres_prof):
+        if not sesiones_prof[i]:
+            continue
+        marcados = [rng.random() < densidad for _ in modulos]
+        libres = [k for k, marcado in enumerate(marcados) if not marcado]
+        rng.shuffle(libres)
+        while True:
+            intervalos: Dict[str, List] = {}
+            for (dia, rango), marcado in zip(modulos, marcados):
+                if marcado:
+                    intervalos.setdefault(dia, []).append(rango)
+            mascara = mascaras_disponibilidad({nombre: intervalos}, scheduler.dias, scheduler.franjas)[nombre]
+            if bin(mascara).count('1') >= sesiones_prof[i] or not libres:
+                break
+            marcados[libres.pop()] = True
+        disponibilidad[nombre] = intervalos
+
+    grupos_lista = sorted({curso['grupo'] for curso in cursos})
+    return {
+        'cursos': cursos,
+        'profesores': lista_prof,
+        'grupos': grupos_lista,
+        'aulas': [aula['codigo'] for aula in aulas_info],
+        'aulas_info': aulas_info,
+        'disponibilidad': disponibilidad,
+        'metadata': {
+            'total_cursos': len(cursos),
+            'total_profesores': len(lista_prof),
+            'total_grupos': len(grupos_lista),
+            'total_aulas': len(aulas_info)
+        },
+        'secciones': secciones
+    }
+
+
+def escribir_excel(instancia: Dict[str, Any], ruta: str):
+    """Escribe la hoja 'Matriz ITI' en el formato que lee ParserServiceNew"""
+    from openpyxl import Workbook
+
+    profesores = instancia['profesores']
+    columna = {i: 5 + i for i in range(len(profesores))}
+    ancho = 5 + len(profesores)
+
+    def fila_vacia():
+        return [None] * ancho
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet('Matriz ITI')
+    hoja.append(fila_vacia())
+    hoja.append([None, 'grupos', 'Horas x materia', 'Horas x Semana\n', 'Resta']
+                + [prof['nombre'] for prof in profesores])
+    hoja.append(['Horas Asignadas', None, None, None, None]
+                + [prof['horas_asignadas'] for prof in profesores])
+
+    total_grupos = total_horas = 0
+    anterior = None
+    for seccion in instancia['secciones']:
+        clave = (seccion['carrera'], seccion['cuatrimestre'])
+        if clave != anterior:
+            hoja.append([f"{CUATRIMESTRES[seccion['cuatrimestre']]} Cuatrimestre"])
+            anterior = clave
+        hoja.append([seccion['encabezado']])
+        # Inglés va en cada sección sin grupos propios, como en el libro original
+        hoja.append([f"Inglés {ROMANOS[seccion['cuatrimestre']]}", 0, 5, 0, 0])
+
+        num_grupos = len(seccion['grupos'])
+        for fila in seccion['filas']:
+            valores = fila_vacia()
+            horas = fila['horas'] * num_grupos
+            valores[:5] = [fila['materia'], num_grupos, fila['horas'], horas, 0]
+            valores[columna[fila['profesor']]] = horas
+            hoja.append(valores)
+            total_grupos += num_grupos
+            total_horas += horas
+
+    hoja.append(fila_vacia())
+    hoja.append(['Totales', total_grupos, None, total_horas])
+    libro.save(ruta)
+
+
+def escribir_json(instancia: Dict[str, Any], ruta: str):
+    """Escribe el JSON que acepta ParserService.procesar_json"""
+    datos = {clave: valor for clave, valor in instancia.items() if clave != 'secciones'}
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False)
+
+
+def escribir_aulas_csv(instancia: Dict[str, Any], ruta: str):
+    """Escribe aulas.csv con el mismo encabezado que data/aulas.csv"""
+    with open(ruta, 'w', encoding='utf-8', newline='') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(['id', 'codigo', 'nombre', 'capacidad', 'tipo'])
+        for i, aula in enumerate(instancia['aulas_info'], 1):
+            escritor.writerow([i, aula['codigo'], aula['nombre'], aula['capacidad'], aula['tipo']])
+
+
+def escribir_disponibilidad_csv(instancia: Dict[str, Any], ruta: str):
+    """
+    Escribe Disponibilidad.csv con la rejilla L/M/Mi/J/V de la hoja original
+
+    Los profesores aparecen sin grado, como en la hoja ('Ana Garza López'),
+    y las celdas disponibles llevan una marca.
+    """
+    disponibilidad = instancia['disponibilidad']
+    nombres = list(disponibilidad)
+    dia_de = dict(zip(DIAS_HOJA, SchedulerServiceNew().dias))
+
+    filas = []
+    for inicio in range(0, len(nombres), PROFESORES_POR_BANDA):
+        banda = nombres[inicio:inicio + PROFESORES_POR_BANDA]
+        encabezado, dias = [''], ['']
+        for nombre in banda:
+            encabezado += [nombre.split(' ', 1)[1]] + [''] * 5
+            dias += DIAS_HOJA + ['']
+        filas += [encabezado, dias]
+        for modulo in MODULOS:
+            fila = [modulo or '']
+            rango = rango_minutos(modulo) if modulo else None
+            for nombre in banda:
+                for dia in DIAS_HOJA:
+                    marcado = rango is not None and rango in disponibilidad[nombre].get(dia_de[dia], [])
+                    fila.append('X' if marcado else '')
+                fila.append('')
+            filas.append(fila)
+        filas.append([''])
+
+    with open(ruta, 'w', encoding='utf-8', newline='') as f:
+        csv.writer(f).writerows(filas)
+
+
+def escribir_instancia(directorio: str, **parametros) -> Dict[str, str]:
+    """
+    Genera una instancia y la escribe en ``directorio``
+
+    Args:
+        directorio: Carpeta de salida (se crea si no existe)
+        **parametros: Argumentos de ``generar_instancia``
+
+    Returns:
+        Rutas de 'excel', 'json', 'aulas' y 'disponibilidad'
+    """
+    os.makedirs(directorio, exist_ok=True)
+    instancia = generar_instancia(**parametros)
+    rutas = {
+        'excel': os.path.join(directorio, 'horarios.xlsx'),
+        'json': os.path.join(directorio, 'horarios.json'),
+        'aulas': os.path.join(directorio, 'aulas.csv'),
+        'disponibilidad': os.path.join(directorio, 'Disponibilidad.csv')
+    }
+    escribir_excel(instancia, rutas['excel'])
+    escribir_json(instancia, rutas['json'])
+    escribir_aulas_csv(instancia, rutas['aulas'])
+    escribir_disponibilidad_csv(instancia, rutas['disponibilidad'])
+    return rutas
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Generador de instancias sintéticas de horarios')
+    parser.add_argument('directorio', help='Carpeta de salida')
+    parser.add_argument('--carreras', type=int, default=1)
+    parser.add_argument('--grupos', type=int, default=11)
+    parser.add_argument('--profesores', type=int, default=30)
+    parser.add_argument('--aulas', type=int, default=18)
+    parser.add_argument('--densidad', type=float, default=0.5,
+                        help='Fracción de módulos disponibles por profesor (0-1)')
+    parser.add_argument('--laboratorios', type=float, default=0.2)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rutas = escribir_instancia(
+        args.directorio, carreras=args.carreras, grupos=args.grupos,
+        profesores=args.profesores, aulas=args.aulas, densidad=args.densidad,
+        laboratorios=args.laboratorios, semilla=args.semilla
+    )
+    for tipo, ruta in rutas.items():
+        print(f"{tipo:>15}: {ruta}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,434 @@
+"""
+Persistencia del horario en SQLite
+Guarda el horario generado en tablas normalizadas (sesiones, grupos,
+profesores, aulas, cursos) con índices para las consultas de la API, y el
+resto del estado publicado (datos de entrada, grafo, validación) como JSON,
+de modo que al reiniciar basta con abrir la base en vez de procesar el
+Excel y volver a resolver.
+"""
+
+import json
+import sqlite3
+import logging
+import threading
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from .horario_compacto import HorarioCompacto, VistaHorario, DTYPE_SESION, SIN_SESION, a_json
+from .query_service import QueryService
+
+logger = logging.getLogger(__name__)
+
+# Horarios que se conservan: el vigente y el anterior, que todavía pueden
+# estar leyendo las peticiones que tomaron la instantánea previa
+CONSERVAR_HORARIOS = 2
+
+# Campos de la instantánea que se guardan como JSON en la tabla estado
+CAMPOS_JSON = ('raw_data', 'grafo_conflictos', 'validacion', 'timestamp')
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS horarios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    creado TEXT NOT NULL,
+    dias TEXT NOT NULL,
+    franjas TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS grupos (
+    horario_id INTEGER NOT NULL REFERENCES horarios(id),
+    id INTEGER NOT NULL,
+    nombre TEXT NOT NULL,
+    PRIMARY KEY (horario_id, id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cursos (
+    horario_id INTEGER NOT NULL REFERENCES horarios(id),
+    id INTEGER NOT NULL,
+    nombre TEXT,
+    PRIMARY KEY (horario_id, id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS profesores (
+    horario_id INTEGER NOT NULL REFERENCES horarios(id),
+    id INTEGER NOT NULL,
+    nombre TEXT,
+    PRIMARY KEY (horario_id, id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS aulas (
+    horario_id INTEGER NOT NULL REFERENCES horarios(id),
+    id INTEGER NOT NULL,
+    codigo TEXT,
+    PRIMARY KEY (horario_id, id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sesiones (
+    horario_id INTEGER NOT NULL,
+    fila INTEGER NOT NULL,
+    grupo_id INTEGER NOT NULL,
+    dia INTEGER NOT NULL,
+    franja INTEGER NOT NULL,
+    curso_id INTEGER NOT NULL,
+    profesor_id INTEGER NOT NULL,
+    aula_id INTEGER NOT NULL,
+    visible INTEGER NOT NULL,
+    PRIMARY KEY (horario_id, fila),
+    FOREIGN KEY (horario_id, grupo_id) REFERENCES grupos(horario_id, id),
+    FOREIGN KEY (horario_id, curso_id) REFERENCES cursos(horario_id, id),
+    FOREIGN KEY (horario_id, profesor_id) REFERENCES profesores(horario_id, id),
+    FOREIGN KEY (horario_id, aula_id) REFERENCES aulas(horario_id, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_grupos_nombre ON grupos (horario_id, nombre);
+CREATE INDEX IF NOT EXISTS idx_cursos_nombre ON cursos (horario_id, nombre);
+CREATE INDEX IF NOT EXISTS idx_profesores_nombre ON profesores (horario_id, nombre);
+CREATE INDEX IF NOT EXISTS idx_aulas_codigo ON aulas (horario_id, codigo);
+CREATE INDEX IF NOT EXISTS idx_sesiones_grupo ON sesiones (horario_id, grupo_id, dia, franja);
+CREATE INDEX IF NOT EXISTS idx_sesiones_profesor ON sesiones (horario_id, profesor_id);
+CREATE INDEX IF NOT EXISTS idx_sesiones_aula ON sesiones (horario_id, aula_id, dia, franja);
+CREATE INDEX IF NOT EXISTS idx_sesiones_curso ON sesiones (horario_id, curso_id);
+CREATE INDEX IF NOT EXISTS idx_sesiones_casilla ON sesiones (horario_id, dia, franja);
+CREATE TABLE IF NOT EXISTS estado (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+# Catálogos del horario compacto → (tabla, columna)
+CATALOGOS = {
+    'grupos': ('grupos', 'nombre'),
+    'cursos': ('cursos', 'nombre'),
+    'profesores': ('profesores', 'nombre'),
+    'aulas': ('aulas', 'codigo')
+}
+
+
+class AlmacenSQLite:
+    """
+    Base SQLite con el horario vigente y el estado publicado
+
+    Cada horario guardado recibe un id y sus catálogos y sesiones llevan ese
+    id, así que una instantánea consulta siempre su propio horario aunque
+    ya se haya guardado otro. Los ids de grupo, curso, profesor y aula son
+    los de los catálogos del ``HorarioCompacto``, y ``fila`` es su fila de
+    sesión, de modo que el horario se reconstruye tal cual; ``visible``
+    marca las sesiones que ocupan su celda (las que ve el horario).
+
+    La base usa WAL (los lectores no bloquean al escritor ni al revés) y
+    una conexión por hilo.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._local = threading.local()
+        # id del horario guardado para cada HorarioCompacto ya persistido
+        self._ids: Dict[int, tuple] = {}
+        # Objetos de la última instantánea persistida, para no reescribirlos
+        self._guardados: Dict[str, Any] = {}
+        with self._conexion() as conexion:
+            conexion.executescript(ESQUEMA)
+
+    def _conexion(self) -> sqlite3.Connection:
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=30)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+            conexion.execute('PRAGMA foreign_keys=ON')
+            self._local.conexion = conexion
+        return conexion
+
+    # ---------- Escritura ----------
+
+    def guardar_horario(self, horario: VistaHorario) -> int:
+        """
+        Guarda el horario (si no se guardó ya) y devuelve su id
+
+        Todas las filas se insertan con ``executemany`` en una sola
+        transacción; los horarios más viejos que ``CONSERVAR_HORARIOS`` se
+        borran en la misma.
+        """
+        compacto = horario.compacto
+        previo = self._ids.get(id(compacto))
+        if previo is not None and previo[0] is compacto:
+            return previo[1]
+
+        sesiones = compacto.sesiones
+        dia, franja = np.divmod(sesiones['casilla'].astype(np.int64), compacto.num_franjas)
+        filas = np.arange(len(sesiones))
+        # Si dos sesiones chocan en una celda el horario muestra solo la última
+        visible = compacto.celdas[sesiones['grupo'], sesiones['casilla']] == filas
+        columnas = [filas, sesiones['grupo'], dia, franja,
+                    sesiones['curso'], sesiones['profesor'], sesiones['aula'], visible]
+
+        conexion = self._conexion()
+        with conexion:
+            cursor = conexion.execute(
+                'INSERT INTO horarios (creado, dias, franjas) VALUES (?, ?, ?)',
+                (datetime.now().isoformat(), json.dumps(compacto.dias, ensure_ascii=False),
+                 json.dumps(compacto.franjas, ensure_ascii=False))
+            )
+            horario_id = cursor.lastrowid
+            for catalogo, (tabla, columna) in CATALOGOS.items():
+                valores = getattr(compacto, catalogo).valores
+                conexion.executemany(
+                    f'INSERT INTO {tabla} (horario_id, id, {columna}) VALUES (?, ?, ?)',
+                    ((horario_id, i, valor) for i, valor in enumerate(valores))
+                )
+            conexion.executemany(
+                'INSERT INTO sesiones (horario_id, fila, grupo_id, dia, franja, curso_id, profesor_id, aula_id, visible) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                ((horario_id, *fila) for fila in np.column_stack(columnas).tolist())
+            )
+            self._purgar(conexion, horario_id)
+
+        # Solo el último horario se recuerda: basta para no reescribirlo
+        self._ids = {id(compacto): (compacto, horario_id)}
+        logger.info(f"💾 Horario {horario_id} guardado en {self.ruta}: {len(sesiones)} sesiones")
+        return horario_id
+
+    @staticmethod
+    def _purgar(conexion: sqlite3.Connection, horario_id: int):
+        limite = horario_id - CONSERVAR_HORARIOS
+        conexion.execute('DELETE FROM sesiones WHERE horario_id <= ?', (limite,))
+        for tabla, _ in CATALOGOS.values():
+            conexion.execute(f'DELETE FROM {tabla} WHERE horario_id <= ?', (limite,))
+        conexion.execute('DELETE FROM horarios WHERE id <= ?', (limite,))
+
+    def guardar_estado(self, instantanea: Mapping):
+        """
+        Persiste una instantánea publicada
+
+        Solo se escriben los campos que cambiaron desde la última llamada.
+        El horario va a las tablas normalizadas y los demás campos a
+        ``estado`` como JSON.
+        """
+        cambios = {}
+        horario = instantanea.get('horario_generado')
+        if horario is not self._guardados.get('horario_generado'):
+            if isinstance(horario, VistaHorario):
+                cambios['horario_id'] = self.guardar_horario(horario)
+            else:
+                cambios['horario_id'] = None
+        for clave in CAMPOS_JSON:
+            if instantanea.get(clave) is not self._guardados.get(clave):
+                cambios[clave] = instantanea.get(clave)
+        if not cambios:
+            return
+
+        conexion = self._conexion()
+        with conexion:
+            conexion.executemany(
+                'INSERT OR REPLACE INTO estado (clave, valor) VALUES (?, ?)',
+                ((clave, json.dumps(valor, ensure_ascii=False, default=a_json)) for clave, valor in cambios.items())
+            )
+        for clave in ('horario_generado',) + CAMPOS_JSON:
+            self._guardados[clave] = instantanea.get(clave)
+
+    # ---------- Lectura ----------
+
+    def cargar(self) -> Optional[Dict[str, Any]]:
+        """
+        Estado guardado, listo para publicar
+
+        Returns:
+            {'raw_data', 'horario_generado', 'grafo_conflictos',
+            'validacion', 'timestamp'} o None si la base está vacía
+        """
+        filas = dict(self._conexion().execute('SELECT clave, valor FROM estado'))
+        if filas.get('raw_data') in (None, 'null'):
+            return None
+
+        campos = {clave: json.loads(filas[clave]) if clave in filas else None for clave in CAMPOS_JSON}
+        horario_id = json.loads(filas.get('horario_id', 'null'))
+        campos['horario_generado'] = self.cargar_horario(horario_id) if horario_id is not None else None
+
+        for clave, valor in campos.items():
+            self._guardados[clave] = valor
+        logger.info(f"📂 Estado cargado de {self.ruta}")
+        return campos
+
+    def cargar_horario(self, horario_id: int) -> VistaHorario:
+        """Reconstruye un horario guardado como ``HorarioCompacto``"""
+        conexion = self._conexion()
+        dias, franjas = conexion.execute(
+            'SELECT dias, franjas FROM horarios WHERE id = ?', (horario_id,)
+        ).fetchone()
+        dias, franjas = json.loads(dias), json.loads(franjas)
+
+        catalogos = {}
+        for catalogo, (tabla, columna) in CATALOGOS.items():
+            catalogos[catalogo] = [valor for (valor,) in conexion.execute(
+                f'SELECT {columna} FROM {tabla} WHERE horario_id = ? ORDER BY id', (horario_id,)
+            )]
+
+        filas = conexion.execute(
+            'SELECT grupo_id, dia * ? + franja, curso_id, profesor_id, aula_id '
+            'FROM sesiones WHERE horario_id = ? ORDER BY fila', (len(franjas), horario_id)
+        ).fetchall()
+        sesiones = np.array(filas, dtype=DTYPE_SESION) if filas else np.zeros(0, dtype=DTYPE_SESION)
+        celdas = np.full((len(catalogos['grupos']), len(dias) * len(franjas)), SIN_SESION, dtype=np.int32)
+        celdas[sesiones['grupo'], sesiones['casilla']] = np.arange(len(sesiones), dtype=np.int32)
+
+        compacto = HorarioCompacto.desde_arreglos(dias, franjas, catalogos, sesiones, celdas)
+        self._ids = {id(compacto): (compacto, horario_id)}
+        return compacto.vista()
+
+    def consultar(self, sql: str, parametros: tuple = ()) -> List[tuple]:
+        return self._conexion().execute(sql, parametros).fetchall()
+
+
+class ConsultasSQLite(QueryService):
+    """
+    ``QueryService`` que responde desde los índices de la base
+
+    Mismo formato de respuesta que las consultas en memoria, pero sin
+    construir índices por proceso: cada consulta es una búsqueda indexada
+    sobre el horario de la instantánea (``horario_id``).
+    """
+
+    _CLASES = (
+        'SELECT s.dia, s.franja, c.nombre, g.nombre, p.nombre, a.codigo '
+        'FROM sesiones s '
+        'JOIN cursos c ON c.horario_id = s.horario_id AND c.id = s.curso_id '
+        'JOIN grupos g ON g.horario_id = s.horario_id AND g.id = s.grupo_id '
+        'JOIN profesores p ON p.horario_id = s.horario_id AND p.id = s.profesor_id '
+        'JOIN aulas a ON a.horario_id = s.horario_id AND a.id = s.aula_id '
+        'WHERE s.horario_id = ? AND s.visible AND {filtro} '
+        'ORDER BY s.grupo_id, s.dia, s.franja'
+    )
+
+    def __init__(self, almacen: AlmacenSQLite, datos_horarios: Mapping):
+        super().__init__(datos_horarios)
+        self.almacen = almacen
+        compacto = datos_horarios['horario_generado'].compacto
+        self.horario_id = almacen.guardar_horario(datos_horarios['horario_generado'])
+        self.dias = compacto.dias
+        self.franjas = compacto.franjas
+        self._pos_dia = {dia: i for i, dia in enumerate(self.dias)}
+        self._pos_franja = {franja: i for i, franja in enumerate(self.franjas)}
+
+    def _indices(self):
+        """Solo la información de profesores vive en memoria"""
+        profesores = self.datos.get('profesores', [])
+        if profesores is not self._profesores_indexados:
+            info = {}
+            for prof in profesores:
+                info.setdefault(prof['nombre'], prof)
+            self.info_profesor = info
+            self._profesores_indexados = profesores
+
+    def _clases(self, filtro: str, parametros: tuple) -> List[Dict]:
+        return [
+            {
+                'dia': self.dias[dia],
+                'franja': self.franjas[franja],
+                'curso': curso,
+                'grupo': grupo,
+                'profesor': profesor,
+                'aula': aula
+            }
+            for dia, franja, curso, grupo, profesor, aula in self.almacen.consultar(
+                self._CLASES.format(filtro=filtro), (self.horario_id,) + parametros
+            )
+        ]
+
+    def _id(self, catalogo: str, valor: Any) -> Optional[int]:
+        tabla, columna = CATALOGOS[catalogo]
+        filas = self.almacen.consultar(
+            f'SELECT id FROM {tabla} WHERE horario_id = ? AND {columna} IS ?', (self.horario_id, valor)
+        )
+        return filas[0][0] if filas else None
+
+    def obtener_horario_grupo(self, grupo: str) -> Dict[str, Any]:
+        try:
+            grupo_id = self._id('grupos', grupo)
+            if grupo_id is None:
+                return {'error': f'Grupo {grupo} no encontrado'}
+
+            dias_formateados = {dia: [] for dia in self.dias}
+            for clase in self._clases('s.grupo_id = ?', (grupo_id,)):
+                dias_formateados[clase['dia']].append({
+                    'franja': clase['franja'],
+                    'curso': clase['curso'],
+                    'profesor': clase['profesor'],
+                    'aula': clase['aula']
+                })
+            for clases in dias_formateados.values():
+                clases.sort(key=lambda clase: clase['franja'])
+            return {'grupo': grupo, 'dias': dias_formateados}
+
+        except Exception as e:
+            logger.error(f"Error obteniendo horario de grupo: {str(e)}", exc_info=True)
+            return {'error': str(e)}
+
+    def obtener_horario_profesor(self, nombre_profesor: str) -> Dict[str, Any]:
+        try:
+            self._indices()
+            profesor_id = self._id('profesores', nombre_profesor)
+            clases = self._clases('s.profesor_id = ?', (profesor_id,)) if profesor_id is not None else []
+            clases_profesor = [{k: v for k, v in clase.items() if k != 'profesor'} for clase in clases]
+            return {
+                'profesor': nombre_profesor,
+                'info': self.info_profesor.get(nombre_profesor),
+                'clases': clases_profesor,
+                'horario_por_dia': self._por_dia(clases_profesor),
+                'total_clases': len(clases_profesor)
+            }
+        except Exception as e:
+            logger.error(f"Error obteniendo horario de profesor: {str(e)}", exc_info=True)
+            return {'error': str(e)}
+
+    def obtener_horario_aula(self, aula: str) -> Dict[str, Any]:
+        try:
+            aula_id = self._id('aulas', aula)
+            clases = self._clases('s.aula_id = ?', (aula_id,)) if aula_id is not None else []
+            return {
+                'aula': aula,
+                'clases': clases,
+                'horario_por_dia': self._por_dia(clases),
+                'total_clases': len(clases)
+            }
+        except Exception as e:
+            logger.error(f"Error obteniendo horario de aula: {str(e)}", exc_info=True)
+            return {'error': str(e)}
+
+    def obtener_horario_curso(self, nombre_curso: str) -> Dict[str, Any]:
+        try:
+            curso_id = self._id('cursos', nombre_curso)
+            clases = self._clases('s.curso_id = ?', (curso_id,)) if curso_id is not None else []
+            return {
+                'curso': nombre_curso,
+                'clases': clases,
+                'grupos': sorted({clase['grupo'] for clase in clases}),
+                'total_clases': len(clases)
+            }
+        except Exception as e:
+            logger.error(f"Error obteniendo horario de curso: {str(e)}", exc_info=True)
+            return {'error': str(e)}
+
+    def obtener_clases_franja(self, dia: str, franja: str) -> Dict[str, Any]:
+        try:
+            if dia in self._pos_dia and franja in self._pos_franja:
+                clases = self._clases('s.dia = ? AND s.franja = ?',
+                                      (self._pos_dia[dia], self._pos_franja[franja]))
+            else:
+                clases = []
+            return {
+                'dia': dia,
+                'franja': franja,
+                'clases': clases,
+                'total_clases': len(clases)
+            }
+        except Exception as e:
+            logger.error(f"Error obteniendo clases de franja: {str(e)}", exc_info=True)
+            return {'error': str(e)}
+
+
+def fabrica_consultas(almacen: AlmacenSQLite):
+    """
+    Fábrica para ``Instantanea``: consultas desde la base cuando el horario
+    es compacto y en memoria en otro caso (sin horario, horarios anidados)
+    """
+    def crear(instantanea: Mapping) -> QueryService:
+        if isinstance(instantanea.get('horario_generado'), VistaHorario):
+            return ConsultasSQLite(almacen, instantanea)
+        return QueryService(instantanea)
+    return crear
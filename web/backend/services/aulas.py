@@ -0,0 +1,131 @@
+"""
+Catálogo de aulas con capacidad y tipo
+Carga aulas.csv y elige, para cada sesión, el aula libre más pequeña que
+cumpla con la capacidad y el tipo que pide el curso (best-fit)
+"""
+
+import os
+import logging
+from bisect import bisect_left
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tipo que se asume para aulas sin información y que prefieren los cursos
+# que no piden un tipo concreto
+TIPO_POR_DEFECTO = 'Teoría'
+
+# Aulas que se generan si no existe aulas.csv
+AULAS_GENERADAS = 15
+
+
+def cargar_aulas(data_dir: str) -> List[Dict[str, Any]]:
+    """
+    Lee las aulas de ``data_dir/aulas.csv``
+
+    Returns:
+        Lista de {'codigo', 'nombre', 'capacidad', 'tipo'}; si el archivo no
+        existe, las aulas genéricas Aula-1 … Aula-15 sin capacidad conocida
+    """
+    ruta = os.path.join(data_dir, 'aulas.csv')
+    if not os.path.exists(ruta):
+        logger.info("ℹ️  Sin aulas.csv: se generan aulas genéricas")
+        return [
+            {'codigo': f"Aula-{i}", 'nombre': f"Aula {i}", 'capacidad': None, 'tipo': TIPO_POR_DEFECTO}
+            for i in range(1, AULAS_GENERADAS + 1)
+        ]
+
+    import pandas as pd
+
+    df = pd.read_csv(ruta, encoding='utf-8')
+    aulas = [
+        {
+            'codigo': str(codigo),
+            'nombre': str(nombre),
+            'capacidad': int(capacidad) if pd.notna(capacidad) else None,
+            'tipo': str(tipo) if pd.notna(tipo) else TIPO_POR_DEFECTO
+        }
+        for codigo, nombre, capacidad, tipo in zip(df['codigo'], df['nombre'], df['capacidad'], df['tipo'])
+    ]
+    logger.info(f"🏫 {len(aulas)} aulas cargadas de {ruta}")
+    return aulas
+
+
+class IndiceAulas:
+    """
+    Índice de aulas ordenado por capacidad para asignación best-fit
+
+    Los bits de las máscaras de aulas (las de ``IndiceOcupacion``) se
+    recorren en orden de capacidad: ``capacidades`` es la lista ordenada y
+    ``_desde[k]`` la máscara de las aulas con posición ``k`` o mayor en ese
+    orden. Encontrar el aula libre más pequeña con al menos ``n`` lugares es
+    un ``bisect`` sobre ``capacidades`` más quedarse con el primer bit libre
+    de ``_desde[k]``. Si los códigos ya vienen ordenados por capacidad (el
+    caso normal, ver ``codigos``), ese primer bit es el bit más bajo.
+
+    Los cursos pueden indicar 'alumnos' (capacidad mínima) y 'tipo_aula'
+    (p. ej. 'Laboratorio'); si piden un tipo solo se les asigna ese tipo.
+    Sin tipo prefieren ``TIPO_POR_DEFECTO`` y recurren a otros solo si no
+    queda ninguna libre, para no gastar laboratorios en clases de teoría.
+    """
+
+    def __init__(self, codigos: List[str], aulas_info: Optional[List[Dict]] = None,
+                 ordenar: bool = True):
+        """
+        Args:
+            codigos: Códigos de las aulas
+            aulas_info: Registros de ``cargar_aulas`` (opcional)
+            ordenar: Reordenar ``codigos`` por capacidad; con False se
+                respeta el orden dado (p. ej. el de un IndiceOcupacion ya creado)
+        """
+        info = {a['codigo']: a for a in aulas_info or []}
+        # Aulas sin capacidad conocida caben a cualquier grupo y van al final
+        capacidad = {
+            codigo: info[codigo]['capacidad'] if codigo in info and info[codigo]['capacidad'] is not None
+            else float('inf')
+            for codigo in codigos
+        }
+
+        self.codigos = sorted(codigos, key=lambda c: capacidad[c]) if ordenar else list(codigos)
+        self._por_capacidad = sorted(range(len(self.codigos)), key=lambda i: capacidad[self.codigos[i]])
+        self.capacidades = [capacidad[self.codigos[i]] for i in self._por_capacidad]
+        self.ordenado = self._por_capacidad == list(range(len(self.codigos)))
+
+        self._desde = [0] * (len(self.codigos) + 1)
+        for k in range(len(self.codigos) - 1, -1, -1):
+            self._desde[k] = self._desde[k + 1] | (1 << self._por_capacidad[k])
+
+        self._por_tipo: Dict[str, int] = {}
+        for i, codigo in enumerate(self.codigos):
+            tipo = info[codigo]['tipo'] if codigo in info else TIPO_POR_DEFECTO
+            self._por_tipo[tipo] = self._por_tipo.get(tipo, 0) | (1 << i)
+
+    def _menor(self, mascara: int, k: int) -> Optional[int]:
+        """Bit del aula de menor capacidad en ``mascara`` (todas con posición >= k)"""
+        if not mascara:
+            return None
+        if self.ordenado:
+            return (mascara & -mascara).bit_length() - 1
+        for bit in self._por_capacidad[k:]:
+            if mascara >> bit & 1:
+                return bit
+        return None
+
+    def elegir(self, libres: int, alumnos: int = 0, tipo: Optional[str] = None) -> Optional[int]:
+        """
+        Aula más pequeña adecuada entre las libres
+
+        Args:
+            libres: Máscara de aulas libres en la casilla
+            alumnos: Lugares que necesita el grupo
+            tipo: Tipo de aula requerido (None: preferir el tipo por defecto)
+
+        Returns:
+            Bit del aula elegida o None si ninguna sirve
+        """
+        k = bisect_left(self.capacidades, alumnos)
+        candidatas = libres & self._desde[k]
+        bit = self._menor(candidatas & self._por_tipo.get(tipo or TIPO_POR_DEFECTO, 0), k)
+        if bit is None and tipo is None:
+            bit = self._menor(candidatas, k)
+        return bit
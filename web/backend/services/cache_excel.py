@@ -0,0 +1,116 @@
+"""
+Caché en disco de libros Excel ya procesados
+Indexa el resultado del parser por el SHA-256 del archivo (y de los CSV que
+el parser lee junto con él) y la versión del parser, de modo que volver a
+cargar el mismo libro no pasa por openpyxl
+"""
+
+import os
+import pickle
+import hashlib
+import logging
+import tempfile
+from typing import Dict, List, Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CacheExcel:
+    """Caché de resultados del parser guardados con pickle"""
+
+    def __init__(self, directorio: str, version: str, max_entradas: int = 32):
+        """
+        Args:
+            directorio: Carpeta donde se guardan las entradas
+            version: Identificador del parser; al cambiarlo las entradas
+                anteriores dejan de usarse
+            max_entradas: Entradas que se conservan (se eliminan las más antiguas)
+        """
+        self.directorio = directorio
+        self.version = version
+        self.max_entradas = max_entradas
+
+    @staticmethod
+    def huella(filepath: str, dependencias: Optional[List[str]] = None) -> str:
+        """
+        SHA-256 del contenido del archivo y de sus dependencias
+
+        Args:
+            filepath: Archivo principal
+            dependencias: Otros archivos que influyen en el resultado (p. ej.
+                aulas.csv); uno que no existe cuenta distinto que uno vacío
+        """
+        sha = hashlib.sha256()
+        for ruta in [filepath] + list(dependencias or []):
+            if ruta != filepath:
+                sha.update(b'\0' + os.path.basename(ruta).encode('utf-8') + b'\0')
+                if not os.path.exists(ruta):
+                    sha.update(b'ausente')
+                    continue
+            with open(ruta, 'rb') as f:
+                for bloque in iter(lambda: f.read(1 << 20), b''):
+                    sha.update(bloque)
+        return sha.hexdigest()
+
+    def _ruta(self, huella: str) -> str:
+        return os.path.join(self.directorio, f"{self.version}-{huella}.pkl")
+
+    def leer(self, huella: str) -> Optional[Dict[str, Any]]:
+        """Resultado guardado para la huella o None si no existe o está dañado"""
+        ruta = self._ruta(huella)
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with open(ruta, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️  Entrada de caché ilegible {ruta}: {str(e)}")
+            return None
+
+    def guardar(self, huella: str, resultado: Dict[str, Any]):
+        """Guarda el resultado de forma atómica (archivo temporal + rename)"""
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            fd, temporal = tempfile.mkstemp(dir=self.directorio, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(resultado, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporal, self._ruta(huella))
+            self._purgar()
+        except Exception as e:
+            logger.warning(f"⚠️  No se pudo guardar en caché: {str(e)}")
+
+    def _purgar(self):
+        """Elimina las entradas más antiguas por encima de ``max_entradas``"""
+        entradas = [
+            os.path.join(self.directorio, nombre)
+            for nombre in os.listdir(self.directorio) if nombre.endswith('.pkl')
+        ]
+        if len(entradas) <= self.max_entradas:
+            return
+        entradas.sort(key=os.path.getmtime)
+        for ruta in entradas[:len(entradas) - self.max_entradas]:
+            os.remove(ruta)
+
+    def obtener(self, filepath: str, procesar: Callable[[str], Dict[str, Any]],
+                dependencias: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Resultado del parser para el archivo, desde la caché si existe
+
+        Args:
+            filepath: Ruta al libro Excel
+            procesar: Parser a ejecutar si no hay entrada en caché
+            dependencias: Archivos que ``procesar`` lee además del libro; si
+                cambia cualquiera de ellos la entrada deja de usarse
+
+        Returns:
+            Diccionario con datos procesados
+        """
+        huella = self.huella(filepath, dependencias)
+        resultado = self.leer(huella)
+        if resultado is not None:
+            logger.info(f"⚡ Excel en caché ({huella[:12]}): {resultado.get('metadata', {})}")
+            return resultado
+
+        resultado = procesar(filepath)
+        self.guardar(huella, resultado)
+        return resultado
@@ -0,0 +1,180 @@
+"""
+Disponibilidad de profesores
+Lee Disponibilidad.csv (una rejilla L/M/Mi/J/V de módulos de 55 minutos por
+profesor) y la convierte en máscaras de casillas alineadas con las franjas
+del scheduler
+"""
+
+import os
+import re
+import logging
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Encabezados de día de la hoja → nombres de día del scheduler
+DIAS_ABREVIADOS = {'L': 'Lunes', 'M': 'Martes', 'Mi': 'Miércoles', 'J': 'Jueves', 'V': 'Viernes'}
+
+# Prefijos de grado que no cuentan al comparar nombres
+TITULOS = {'dr', 'dra', 'ing', 'lic', 'mc', 'mi', 'msi', 'mti', 'mat', 'mca'}
+
+_RANGO = re.compile(r'(\d{1,2}):(\d{2})\s*[-–]\s*(\d{1,2}):(\d{2})')
+
+# {profesor: {dia: [(inicio, fin), ...]}} con minutos desde medianoche
+Intervalos = Dict[str, Dict[str, List[Tuple[int, int]]]]
+
+
+def rango_minutos(texto: str) -> Optional[Tuple[int, int]]:
+    """Convierte '7:00-8:30' (también con '–') en (420, 510)"""
+    m = _RANGO.search(str(texto))
+    if not m:
+        return None
+    h1, m1, h2, m2 = map(int, m.groups())
+    return h1 * 60 + m1, h2 * 60 + m2
+
+
+def _tokens_nombre(nombre: str) -> List[str]:
+    """Palabras de un nombre sin acentos, grados ni paréntesis"""
+    nombre = re.sub(r'\(.*?\)', ' ', nombre)
+    nombre = unicodedata.normalize('NFKD', nombre).encode('ascii', 'ignore').decode()
+    tokens = []
+    for palabra in nombre.lower().split():
+        palabra = palabra.replace('.', '')
+        if palabra and palabra not in TITULOS:
+            tokens.append(palabra)
+    return tokens
+
+
+def _coincide(corto: List[str], completo: List[str]) -> bool:
+    """
+    True si las palabras de ``corto`` aparecen en orden dentro de
+    ``completo``; una inicial ('m' frente a 'manuel') basta en cualquiera
+    de los dos lados, pero al menos una palabra debe coincidir completa
+    """
+    pos = 0
+    completas = 0
+    for palabra in corto:
+        while pos < len(completo):
+            otra = completo[pos]
+            pos += 1
+            if palabra == otra:
+                completas += len(palabra) > 1
+                break
+            if (len(palabra) == 1 and otra.startswith(palabra)) or (len(otra) == 1 and palabra.startswith(otra)):
+                break
+        else:
+            return False
+    return completas > 0
+
+
+def emparejar_nombres(nombres_hoja: List[str], profesores: List[str]) -> Dict[str, str]:
+    """
+    Relaciona los nombres abreviados de la hoja con los nombres completos
+    del Excel de horarios ('Juan M. Ornelas' → 'Ing. Juan Manuel Ornelas
+    Llerena'). Los nombres sin coincidencia o con varias se descartan.
+    """
+    completos = [(profesor, _tokens_nombre(profesor)) for profesor in profesores]
+    emparejados = {}
+    for nombre in nombres_hoja:
+        corto = _tokens_nombre(nombre)
+        candidatos = [profesor for profesor, tokens in completos if corto and _coincide(corto, tokens)]
+        if len(candidatos) == 1:
+            emparejados[nombre] = candidatos[0]
+    return emparejados
+
+
+def leer_disponibilidad(ruta: str) -> Intervalos:
+    """
+    Lee la rejilla de disponibilidad tal como está en la hoja
+
+    Cada bloque de profesor ocupa seis columnas: el nombre en la fila de
+    encabezado, los días L, M, Mi, J, V en la fila siguiente y, en las filas
+    con un rango horario en la primera columna, una celda no vacía en cada
+    módulo en que el profesor está disponible. Los bloques se repiten hacia
+    abajo para más profesores.
+
+    Returns:
+        {nombre_en_hoja: {dia: [(inicio, fin), ...]}}
+    """
+    import csv
+
+    with open(ruta, encoding='utf-8', newline='') as f:
+        filas = list(csv.reader(f))
+
+    disponibilidad: Intervalos = {}
+    columnas: Dict[int, Tuple[str, str]] = {}
+    for i, fila in enumerate(filas):
+        if 'L' in fila and 'V' in fila and i > 0:
+            # Fila de días: los nombres están en la fila anterior
+            encabezado = filas[i - 1]
+            columnas = {}
+            inicio = None
+            for j, celda in enumerate(fila):
+                if celda == 'L':
+                    inicio = j
+                if inicio is not None and celda in DIAS_ABREVIADOS:
+                    nombre = encabezado[inicio].strip() if inicio < len(encabezado) else ''
+                    if nombre and not nombre.startswith('Unnamed'):
+                        columnas[j] = (nombre, DIAS_ABREVIADOS[celda])
+                        disponibilidad.setdefault(nombre, {})
+            continue
+
+        rango = rango_minutos(fila[0]) if fila else None
+        if rango is None:
+            continue
+        for j, (nombre, dia) in columnas.items():
+            if j < len(fila) and fila[j].strip():
+                disponibilidad[nombre].setdefault(dia, []).append(rango)
+
+    return disponibilidad
+
+
+def cargar_disponibilidad(data_dir: str, profesores: List[str]) -> Intervalos:
+    """
+    Disponibilidad de ``data_dir/Disponibilidad.csv`` con los nombres de ``profesores``
+
+    Los profesores que no aparecen en la hoja (o no se pueden emparejar) no
+    tienen entrada y se consideran disponibles siempre.
+    """
+    ruta = os.path.join(data_dir, 'Disponibilidad.csv')
+    if not os.path.exists(ruta):
+        return {}
+
+    try:
+        hoja = leer_disponibilidad(ruta)
+    except Exception as e:
+        logger.warning(f"⚠️  No se pudo leer {ruta}: {str(e)}")
+        return {}
+
+    nombres = emparejar_nombres(list(hoja), profesores)
+    disponibilidad = {nombres[nombre]: hoja[nombre] for nombre in nombres if hoja[nombre]}
+    sin_emparejar = [nombre for nombre in hoja if nombre not in nombres]
+    logger.info(f"🗓️  Disponibilidad de {len(disponibilidad)} profesores"
+                + (f" ({len(sin_emparejar)} nombres sin emparejar)" if sin_emparejar else ""))
+    return disponibilidad
+
+
+def mascaras_disponibilidad(disponibilidad: Optional[Intervalos], dias: List[str],
+                            franjas: List[str]) -> Dict[str, int]:
+    """
+    Máscara de casillas (``dia * len(franjas) + franja``) por profesor
+
+    Una franja queda disponible si se solapa con algún módulo marcado ese
+    día; la rejilla de 55 minutos no coincide con las franjas de 90, así que
+    basta con que el profesor pueda estar en parte de ella.
+    """
+    rangos = [rango_minutos(franja) for franja in franjas]
+    pos_dia = {dia: i for i, dia in enumerate(dias)}
+    mascaras = {}
+    for profesor, por_dia in (disponibilidad or {}).items():
+        mascara = 0
+        for dia, intervalos in por_dia.items():
+            if dia not in pos_dia:
+                continue
+            base = pos_dia[dia] * len(franjas)
+            for f, (inicio, fin) in enumerate(rangos):
+                if any(a < fin and inicio < b for a, b in intervalos):
+                    mascara |= 1 << (base + f)
+        mascaras[profesor] = mascara
+    return mascaras
@@ -3,21 +3,207 @@ Servicio de exportación
 Exporta horarios a diferentes formatos (JSON, Excel, PDF)
 """
 
+import io
 import json
 import os
+import hashlib
+import zlib
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Iterable, Iterator
 import logging
 
+from .horario_compacto import a_json
+
 logger = logging.getLogger(__name__)
 
+DIAS = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes']
+
+# A partir de cuántos grupos compensa repartir el PDF entre procesos
+MIN_GRUPOS_PARALELO = 24
+
+# Extensión de archivo por formato de exportación
+EXTENSIONES = {'json': 'json', 'excel': 'xlsx', 'pdf': 'pdf'}
+
+# Tamaño máximo de la caché de exportaciones en disco
+MAX_BYTES_CACHE = 200 * 1024 * 1024
+
+
+def _tabla_grupo(horario: Dict[str, Dict]) -> List[List[str]]:
+    """Filas (franja + una celda por día) del horario de un grupo"""
+    franjas = sorted(set(
+        franja for dia_franjas in horario.values() 
+        for franja in dia_franjas.keys()
+    ))
+    
+    filas = []
+    for franja in franjas:
+        fila = [franja]
+        for dia in DIAS:
+            if dia in horario and franja in horario[dia]:
+                datos = horario[dia][franja]
+                fila.append(f"{datos['curso']}\n{datos['profesor']}\n{datos['aula']}")
+            else:
+                fila.append('')
+        filas.append(fila)
+    return filas
+
+
+def _elementos_pdf_grupo(grupo: str, horario: Dict[str, Dict], styles) -> List:
+    """Subtítulo y tabla de un grupo para el documento PDF"""
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle, Paragraph, Spacer
+    
+    # Encabezados y filas
+    data = [['Hora'] + DIAS] + _tabla_grupo(horario)
+    
+    table = Table(data)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.purple),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    
+    return [
+        Paragraph(f"<b>Grupo: {grupo}</b>", styles['Heading2']),
+        Spacer(1, 10),
+        table,
+        Spacer(1, 30)
+    ]
+
+
+def _renderizar_pdf(grupos: List[tuple], con_titulo: bool) -> bytes:
+    """Renderiza una parte del PDF (lista de (grupo, horario)) en memoria"""
+    from reportlab.lib.pagesizes import letter, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=landscape(letter))
+    styles = getSampleStyleSheet()
+    
+    elements = []
+    if con_titulo:
+        elements.append(Paragraph("<b>HORARIOS ITI - UPV</b>", styles['Title']))
+        elements.append(Spacer(1, 20))
+    for grupo, horario in grupos:
+        elements.extend(_elementos_pdf_grupo(grupo, horario, styles))
+    
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def _renderizar_pdf_parte(args: tuple) -> bytes:
+    return _renderizar_pdf(*args)
+
+
+def _a_json_o_texto(objeto: Any) -> Any:
+    try:
+        return a_json(objeto)
+    except TypeError:
+        return str(objeto)
+
+
+def comprimir_gzip(partes: Iterable[str], nivel: int = 6) -> Iterator[bytes]:
+    """Comprime al vuelo un flujo de texto en formato gzip"""
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    for parte in partes:
+        bloque = compresor.compress(parte.encode('utf-8'))
+        if bloque:
+            yield bloque
+    yield compresor.flush()
+
+
 class ExportService:
     """Servicio para exportar horarios"""
     
-    def __init__(self, datos_horarios: Dict):
+    def __init__(self, datos_horarios: Dict, procesos: Optional[int] = None,
+                 max_bytes_cache: int = MAX_BYTES_CACHE):
         self.datos = datos_horarios
+        self.procesos = procesos or os.cpu_count() or 1
+        self.max_bytes_cache = max_bytes_cache
         self.export_folder = os.path.join(os.path.dirname(__file__), '../../exports')
         os.makedirs(self.export_folder, exist_ok=True)
+        # (formato) -> (objetos hasheados, huella) para no re-serializar el horario
+        self._huellas: Dict[str, tuple] = {}
+    
+    def huella(self, formato: str) -> str:
+        """
+        SHA-256 del contenido que exporta un formato
+        
+        Excel y PDF dependen solo de ``horario_generado``; JSON incluye además
+        cursos, profesores y grupos. Se recalcula solo si cambió alguno de
+        esos objetos.
+        """
+        claves = ['horario_generado']
+        if formato == 'json':
+            claves += ['cursos', 'profesores', 'grupos']
+        objetos = tuple(self.datos.get(clave) for clave in claves)
+        
+        previa = self._huellas.get(formato)
+        if previa is not None and all(a is b for a, b in zip(previa[0], objetos)):
+            return previa[1]
+        
+        sha = hashlib.sha256(formato.encode())
+        for objeto in objetos:
+            sha.update(json.dumps(objeto, sort_keys=True, ensure_ascii=False, default=_a_json_o_texto).encode())
+        huella = sha.hexdigest()
+        self._huellas[formato] = (objetos, huella)
+        return huella
+    
+    def exportar(self, formato: str) -> str:
+        """
+        Ruta del archivo exportado, reutilizando el de la caché si existe
+        
+        Los archivos se nombran por la huella del contenido, así que un
+        horario sin cambios nunca se vuelve a renderizar.
+        
+        Args:
+            formato: 'json', 'excel' o 'pdf'
+            
+        Returns:
+            Ruta al archivo
+        """
+        if formato not in EXTENSIONES:
+            raise ValueError(f'Formato no soportado: {formato}')
+        
+        huella = self.huella(formato)
+        filepath = os.path.join(self.export_folder, f"horarios_{huella[:16]}.{EXTENSIONES[formato]}")
+        
+        if os.path.exists(filepath):
+            # Marcar como usado recientemente para el LRU
+            os.utime(filepath)
+            logger.info(f"Exportación en caché: {filepath}")
+            return filepath
+        
+        generado = getattr(self, f'exportar_{formato}')()
+        os.replace(generado, filepath)
+        self._purgar_cache(conservar=filepath)
+        return filepath
+    
+    def _purgar_cache(self, conservar: str):
+        """Elimina las exportaciones usadas hace más tiempo hasta caber en ``max_bytes_cache``"""
+        archivos = []
+        for nombre in os.listdir(self.export_folder):
+            ruta = os.path.join(self.export_folder, nombre)
+            if nombre.startswith('horarios_') and os.path.isfile(ruta):
+                info = os.stat(ruta)
+                archivos.append((info.st_mtime, info.st_size, ruta))
+        
+        total = sum(tam for _, tam, _ in archivos)
+        for _, tam, ruta in sorted(archivos):
+            if total <= self.max_bytes_cache:
+                break
+            if ruta == conservar:
+                continue
+            os.remove(ruta)
+            total -= tam
+            logger.info(f"Exportación eliminada de la caché: {ruta}")
         
     def exportar_json(self) -> str:
         """Exporta horarios a JSON"""
@@ -38,7 +224,7 @@ class ExportService:
             }
             
             with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(datos_exportar, f, indent=2, ensure_ascii=False)
+                json.dump(datos_exportar, f, indent=2, ensure_ascii=False, default=a_json)
             
             logger.info(f"JSON exportado: {filepath}")
             return filepath
@@ -47,39 +233,82 @@ class ExportService:
             logger.error(f"Error exportando JSON: {str(e)}", exc_info=True)
             raise
     
+    def iterar_json(self) -> Iterator[str]:
+        """
+        Genera el mismo documento que ``exportar_json`` en fragmentos
+        
+        Cada grupo, curso y profesor se serializa por separado, de modo que
+        la memoria no depende del tamaño del horario. El JSON es compacto
+        (sin sangría).
+        """
+        yield '{"horarios": {'
+        for i, (grupo, horario) in enumerate((self.datos.get('horario_generado') or {}).items()):
+            yield (',' if i else '') + json.dumps(grupo, ensure_ascii=False) + ': ' + \
+                json.dumps(horario, ensure_ascii=False, default=a_json)
+        
+        for clave in ['cursos', 'profesores', 'grupos']:
+            yield f'}}, "{clave}": [' if clave == 'cursos' else f'], "{clave}": ['
+            for i, elemento in enumerate(self.datos.get(clave, [])):
+                yield (', ' if i else '') + json.dumps(elemento, ensure_ascii=False)
+        
+        metadata = {'generado': datetime.now().isoformat(), 'version': '2.0'}
+        yield '], "metadata": ' + json.dumps(metadata) + '}\n'
+    
+    def iterar_ndjson(self) -> Iterator[str]:
+        """Genera una línea JSON por sesión del horario (NDJSON)"""
+        for grupo, horario in (self.datos.get('horario_generado') or {}).items():
+            lineas = []
+            for dia, franjas in horario.items():
+                for franja, datos in franjas.items():
+                    lineas.append(json.dumps({
+                        'grupo': grupo,
+                        'dia': dia,
+                        'franja': franja,
+                        'curso': datos['curso'],
+                        'profesor': datos['profesor'],
+                        'aula': datos['aula']
+                    }, ensure_ascii=False) + '\n')
+            # Un fragmento por grupo para no enviar miles de escrituras diminutas
+            if lineas:
+                yield ''.join(lineas)
+    
     def exportar_excel(self) -> str:
-        """Exporta horarios a Excel"""
+        """
+        Exporta horarios a Excel
+        
+        Usa el modo write-only de openpyxl: cada hoja se escribe en streaming
+        directamente al archivo, sin construir DataFrames ni mantener el
+        libro completo en memoria.
+        """
         try:
-            import pandas as pd
+            from openpyxl import Workbook
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.styles import Font, Alignment, Border, Side
             
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f'horarios_{timestamp}.xlsx'
             filepath = os.path.join(self.export_folder, filename)
             
-            # Crear un writer de Excel
-            with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-                # Exportar cada grupo en una hoja
-                for grupo, horario in self.datos.get('horario_generado', {}).items():
-                    # Crear DataFrame del horario
-                    dias = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes']
-                    franjas = sorted(set(
-                        franja for dia_franjas in horario.values() 
-                        for franja in dia_franjas.keys()
-                    ))
-                    
-                    df_data = []
-                    for franja in franjas:
-                        fila = {'Hora': franja}
-                        for dia in dias:
-                            if dia in horario and franja in horario[dia]:
-                                datos = horario[dia][franja]
-                                fila[dia] = f"{datos['curso']}\n{datos['profesor']}\n{datos['aula']}"
-                            else:
-                                fila[dia] = ''
-                        df_data.append(fila)
-                    
-                    df = pd.DataFrame(df_data)
-                    df.to_excel(writer, sheet_name=grupo, index=False)
+            libro = Workbook(write_only=True)
+            borde = Side(style='thin')
+            
+            # Exportar cada grupo en una hoja
+            for grupo, horario in self.datos.get('horario_generado', {}).items():
+                hoja = libro.create_sheet(title=grupo)
+                
+                encabezado = []
+                for titulo in ['Hora'] + DIAS:
+                    celda = WriteOnlyCell(hoja, value=titulo)
+                    celda.font = Font(bold=True)
+                    celda.alignment = Alignment(horizontal='center', vertical='top')
+                    celda.border = Border(left=borde, right=borde, top=borde, bottom=borde)
+                    encabezado.append(celda)
+                hoja.append(encabezado)
+                
+                for fila in _tabla_grupo(horario):
+                    hoja.append([valor or None for valor in fila])
+            
+            libro.save(filepath)
             
             logger.info(f"Excel exportado: {filepath}")
             return filepath
@@ -89,73 +318,48 @@ class ExportService:
             raise
     
     def exportar_pdf(self) -> str:
-        """Exporta horarios a PDF"""
+        """
+        Exporta horarios a PDF
+        
+        Con muchos grupos y varios núcleos, cada proceso renderiza un bloque
+        de grupos a un PDF en memoria y las partes se unen al final con
+        pypdf; si pypdf no está instalado se genera en un solo paso.
+        """
         try:
-            from reportlab.lib.pagesizes import letter, landscape
-            from reportlab.lib import colors
-            from reportlab.lib.styles import getSampleStyleSheet
-            from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-            
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f'horarios_{timestamp}.pdf'
             filepath = os.path.join(self.export_folder, filename)
             
-            doc = SimpleDocTemplate(filepath, pagesize=landscape(letter))
-            elements = []
-            styles = getSampleStyleSheet()
+            grupos = list(self.datos.get('horario_generado', {}).items())
+            procesos = min(self.procesos, len(grupos) // (MIN_GRUPOS_PARALELO // 2) or 1)
             
-            # Título
-            title = Paragraph("<b>HORARIOS ITI - UPV</b>", styles['Title'])
-            elements.append(title)
-            elements.append(Spacer(1, 20))
+            try:
+                from pypdf import PdfWriter
+            except ImportError:
+                logger.warning("⚠️  pypdf no está instalado: el PDF se genera en un solo proceso")
+                PdfWriter = None
             
-            # Crear tabla para cada grupo
-            for grupo, horario in self.datos.get('horario_generado', {}).items():
-                # Subtítulo del grupo
-                subtitle = Paragraph(f"<b>Grupo: {grupo}</b>", styles['Heading2'])
-                elements.append(subtitle)
-                elements.append(Spacer(1, 10))
-                
-                # Preparar datos de la tabla
-                dias = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes']
-                franjas = sorted(set(
-                    franja for dia_franjas in horario.values() 
-                    for franja in dia_franjas.keys()
-                ))
-                
-                # Encabezados
-                data = [['Hora'] + dias]
-                
-                # Filas
-                for franja in franjas:
-                    fila = [franja]
-                    for dia in dias:
-                        if dia in horario and franja in horario[dia]:
-                            datos = horario[dia][franja]
-                            celda = f"{datos['curso']}\n{datos['profesor']}\n{datos['aula']}"
-                            fila.append(celda)
-                        else:
-                            fila.append('')
-                    data.append(fila)
-                
-                # Crear tabla
-                table = Table(data)
-                table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.purple),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ]))
+            if procesos <= 1 or len(grupos) < MIN_GRUPOS_PARALELO or PdfWriter is None:
+                contenido = _renderizar_pdf(grupos, con_titulo=True)
+            else:
+                # Repartir los grupos en bloques contiguos, uno por proceso
+                grupos = [(grupo, {dia: dict(franjas) for dia, franjas in horario.items()})
+                          for grupo, horario in grupos]
+                tam = -(-len(grupos) // procesos)
+                partes = [(grupos[i:i + tam], i == 0) for i in range(0, len(grupos), tam)]
+                with ProcessPoolExecutor(max_workers=procesos) as pool:
+                    pdfs = list(pool.map(_renderizar_pdf_parte, partes))
                 
-                elements.append(table)
-                elements.append(Spacer(1, 30))
+                writer = PdfWriter()
+                for pdf in pdfs:
+                    writer.append(io.BytesIO(pdf))
+                salida = io.BytesIO()
+                writer.write(salida)
+                contenido = salida.getvalue()
+                logger.info(f"PDF renderizado en {len(partes)} partes paralelas")
             
-            # Generar PDF
-            doc.build(elements)
+            with open(filepath, 'wb') as f:
+                f.write(contenido)
             
             logger.info(f"PDF exportado: {filepath}")
             return filepath
@@ -0,0 +1,117 @@
+"""
+Construcción del grafo de conflictos por cubetas
+Agrupa los cursos por profesor y por (grupo, día, franja) para generar
+aristas solo entre miembros de la misma cubeta
+"""
+
+from typing import Dict, List, Any
+
+
+def construir_grafo(cursos: List[Dict], agrupar_profesores: bool = False,
+                    sin_profesor_conflicta: bool = False) -> Dict[str, Any]:
+    """
+    Construye el grafo de conflictos entre cursos
+
+    Dos cursos están en conflicto si comparten profesor o si son del mismo
+    grupo y coinciden en alguna franja. En lugar de comparar todos los pares,
+    cada curso se coloca en la cubeta de su profesor y en las de cada
+    (grupo, día, franja) que ocupa; solo los miembros de una misma cubeta
+    generan aristas.
+
+    Args:
+        cursos: Cursos con 'id', 'grupo', 'profesor' y 'horarios'
+        agrupar_profesores: Si es True, cada profesor con varios cursos se
+            devuelve como una hiperarista en 'hiperaristas' en vez de como
+            una clique de aristas 'profesor'
+        sin_profesor_conflicta: Trata los cursos sin profesor como si
+            compartieran profesor (comportamiento del servicio original)
+
+    Returns:
+        Diccionario con 'nodos', 'enlaces' y, si se agrupan profesores,
+        'hiperaristas'
+    """
+    nodos = []
+    por_profesor: Dict[Any, List[str]] = {}
+    por_casilla: Dict[tuple, List[Dict]] = {}
+
+    for curso in cursos:
+        nodos.append({
+            'id': curso['id'],
+            'nombre': curso['nombre'],
+            'grupo': curso['grupo'],
+            'profesor': curso['profesor'] or 'Sin asignar',
+            'horas': curso['horas_semana']
+        })
+
+        profesor = curso['profesor']
+        if profesor or sin_profesor_conflicta:
+            por_profesor.setdefault(profesor, []).append(curso['id'])
+
+        vistos = set()
+        for h in curso.get('horarios', []):
+            clave = (curso['grupo'], h['dia'], h['franja'])
+            if clave not in vistos:
+                vistos.add(clave)
+                por_casilla.setdefault(clave, []).append(curso)
+
+    enlaces = []
+    hiperaristas = []
+
+    # Conflictos por profesor: una clique (o hiperarista) por cubeta
+    for profesor, ids in por_profesor.items():
+        if len(ids) < 2:
+            continue
+        if agrupar_profesores:
+            hiperaristas.append({
+                'id': f"PROF:{profesor or 'Sin asignar'}",
+                'tipo': 'profesor',
+                'profesor': profesor or 'Sin asignar',
+                'nodos': ids
+            })
+            continue
+        for i, origen in enumerate(ids):
+            for destino in ids[i + 1:]:
+                enlaces.append({'source': origen, 'target': destino, 'tipo': 'profesor'})
+
+    # Conflictos por horario: cursos del mismo grupo en la misma casilla
+    pares = set()
+    for miembros in por_casilla.values():
+        for i, curso1 in enumerate(miembros):
+            for curso2 in miembros[i + 1:]:
+                par = (curso1['id'], curso2['id'])
+                if par in pares:
+                    continue
+                pares.add(par)
+                # Ya cubierto por la cubeta del profesor
+                if curso1['profesor'] == curso2['profesor'] and \
+                        (curso1['profesor'] or sin_profesor_conflicta):
+                    continue
+                enlaces.append({'source': par[0], 'target': par[1], 'tipo': 'horario'})
+
+    grafo = {
+        'nodos': nodos,
+        'enlaces': enlaces
+    }
+    if agrupar_profesores:
+        grafo['hiperaristas'] = hiperaristas
+    return grafo
+
+
+def expandir_hiperaristas(grafo: Dict[str, Any]) -> List[Dict]:
+    """Enlaces del grafo con las hiperaristas de profesor expandidas a cliques"""
+    enlaces = []
+    for hiperarista in grafo.get('hiperaristas', []):
+        ids = hiperarista['nodos']
+        for i, origen in enumerate(ids):
+            for destino in ids[i + 1:]:
+                enlaces.append({'source': origen, 'target': destino, 'tipo': hiperarista['tipo']})
+    return enlaces + grafo.get('enlaces', [])
+
+
+def contar_enlaces(grafo: Dict[str, Any]) -> int:
+    """Número de aristas del grafo expandido sin materializarlo"""
+    total = len(grafo.get('enlaces', []))
+    for hiperarista in grafo.get('hiperaristas', []):
+        k = len(hiperarista['nodos'])
+        total += k * (k - 1) // 2
+    return total
@@ -0,0 +1,233 @@
+"""
+Representación compacta del horario
+Guarda cada sesión como una fila de enteros en un arreglo estructurado de
+NumPy y ofrece vistas de solo lectura con la forma anidada clásica
+grupo → día → franja → {curso, profesor, aula}
+"""
+
+from collections.abc import Mapping
+from typing import Dict, List, Any, Optional, Iterator
+
+import numpy as np
+
+# Una fila por sesión; los textos se guardan internados en catálogos
+DTYPE_SESION = np.dtype([
+    ('grupo', 'i4'),
+    ('casilla', 'i2'),
+    ('curso', 'i4'),
+    ('profesor', 'i4'),
+    ('aula', 'i4')
+])
+
+SIN_SESION = -1
+
+
+class Catalogo:
+    """Interna valores (nombres de grupo, curso, profesor, aula) como enteros"""
+
+    def __init__(self, valores: Optional[List[Any]] = None):
+        self.valores: List[Any] = []
+        self._ids: Dict[Any, int] = {}
+        for valor in valores or []:
+            self.id(valor)
+
+    def id(self, valor: Any) -> int:
+        """Id del valor, agregándolo si es nuevo"""
+        ident = self._ids.get(valor)
+        if ident is None:
+            ident = self._ids[valor] = len(self.valores)
+            self.valores.append(valor)
+        return ident
+
+    def buscar(self, valor: Any) -> Optional[int]:
+        """Id del valor o None si no está en el catálogo"""
+        return self._ids.get(valor)
+
+    def __getitem__(self, ident: int) -> Any:
+        return self.valores[ident]
+
+    def __len__(self) -> int:
+        return len(self.valores)
+
+
+class HorarioCompacto:
+    """
+    Almacén del horario como arreglo de sesiones
+
+    ``sesiones`` tiene una fila por sesión (ver ``DTYPE_SESION``) y
+    ``celdas[grupo, casilla]`` guarda la fila que ocupa esa casilla o -1,
+    de modo que cualquier consulta por grupo, día y franja es un acceso
+    directo.
+    """
+
+    def __init__(self, dias: List[str], franjas: List[str], grupos: List[str]):
+        self.dias = list(dias)
+        self.franjas = list(franjas)
+        self.num_franjas = len(self.franjas)
+        self.num_casillas = len(self.dias) * self.num_franjas
+        self._pos_dia = {dia: i for i, dia in enumerate(self.dias)}
+        self._pos_franja = {franja: i for i, franja in enumerate(self.franjas)}
+
+        self.grupos = Catalogo(grupos)
+        self.cursos = Catalogo()
+        self.profesores = Catalogo()
+        self.aulas = Catalogo()
+
+        self.sesiones = np.zeros(0, dtype=DTYPE_SESION)
+        self.celdas = np.full((len(self.grupos), self.num_casillas), SIN_SESION, dtype=np.int32)
+
+    @classmethod
+    def desde_asignaciones(cls, dias: List[str], franjas: List[str], grupos: List[str],
+                           cursos: List[Dict], asignaciones: List[tuple]) -> 'HorarioCompacto':
+        """
+        Construye el almacén a partir de las asignaciones del solver
+
+        Args:
+            dias, franjas: Rejilla del horario
+            grupos: Grupos que deben aparecer aunque no tengan sesiones
+            cursos: Cursos a los que apuntan los índices de las asignaciones
+            asignaciones: Lista de (indice_curso, casilla, aula)
+        """
+        compacto = cls(dias, franjas, grupos)
+        sesiones = np.zeros(len(asignaciones), dtype=DTYPE_SESION)
+
+        for fila, (indice, casilla, aula) in enumerate(asignaciones):
+            curso = cursos[indice]
+            sesiones[fila] = (
+                compacto.grupos.id(curso['grupo']),
+                casilla,
+                compacto.cursos.id(curso['nombre']),
+                compacto.profesores.id(curso['profesor']),
+                compacto.aulas.id(aula)
+            )
+
+        compacto.sesiones = sesiones
+        compacto.celdas = np.full((len(compacto.grupos), compacto.num_casillas), SIN_SESION, dtype=np.int32)
+        # Si dos sesiones chocan en la misma celda prevalece la última, como en el dict
+        compacto.celdas[sesiones['grupo'], sesiones['casilla']] = np.arange(len(sesiones), dtype=np.int32)
+        return compacto
+
+    @classmethod
+    def desde_arreglos(cls, dias: List[str], franjas: List[str], catalogos: Dict[str, List[Any]],
+                       sesiones: np.ndarray, celdas: np.ndarray) -> 'HorarioCompacto':
+        """
+        Reconstruye el almacén sobre arreglos ya existentes, sin copiarlos
+
+        Args:
+            dias, franjas: Rejilla del horario
+            catalogos: Valores de 'grupos', 'cursos', 'profesores' y 'aulas'
+                en el orden de sus ids
+            sesiones: Filas con ``DTYPE_SESION``
+            celdas: Matriz grupos × casillas de filas de sesión
+        """
+        compacto = cls(dias, franjas, catalogos['grupos'])
+        compacto.cursos = Catalogo(catalogos['cursos'])
+        compacto.profesores = Catalogo(catalogos['profesores'])
+        compacto.aulas = Catalogo(catalogos['aulas'])
+        compacto.sesiones = sesiones
+        compacto.celdas = celdas
+        return compacto
+
+    # ---------- Acceso ----------
+
+    def sesion(self, fila: int) -> Dict[str, Any]:
+        """Datos de una sesión en el formato del horario anidado"""
+        s = self.sesiones[fila]
+        return {
+            'curso': self.cursos[s['curso']],
+            'profesor': self.profesores[s['profesor']],
+            'aula': self.aulas[s['aula']]
+        }
+
+    def filas_de(self, campo: str, valor: Any) -> np.ndarray:
+        """Filas de las sesiones cuyo ``campo`` ('grupo', 'curso', 'profesor' o 'aula') vale ``valor``"""
+        ident = getattr(self, campo if campo != 'profesor' else 'profesores').buscar(valor) \
+            if campo != 'grupo' else self.grupos.buscar(valor)
+        if ident is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(self.sesiones[campo] == ident)
+
+    def vista(self) -> 'VistaHorario':
+        """Vista de solo lectura grupo → día → franja → sesión"""
+        return VistaHorario(self)
+
+    def a_dict(self) -> Dict[str, Dict[str, Dict[str, Dict]]]:
+        """Materializa el horario anidado completo"""
+        return {grupo: {dia: dict(franjas) for dia, franjas in vista.items()}
+                for grupo, vista in self.vista().items()}
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes ocupados por los arreglos (sin contar los catálogos)"""
+        return self.sesiones.nbytes + self.celdas.nbytes
+
+
+class VistaHorario(Mapping):
+    """Grupos del horario compacto como un Mapping de solo lectura"""
+
+    def __init__(self, compacto: HorarioCompacto):
+        self.compacto = compacto
+
+    def __getitem__(self, grupo: str) -> 'VistaGrupo':
+        ident = self.compacto.grupos.buscar(grupo)
+        if ident is None:
+            raise KeyError(grupo)
+        return VistaGrupo(self.compacto, ident)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.compacto.grupos.valores)
+
+    def __len__(self) -> int:
+        return len(self.compacto.grupos)
+
+    def __repr__(self) -> str:
+        return f"VistaHorario({len(self)} grupos, {len(self.compacto.sesiones)} sesiones)"
+
+
+class VistaGrupo(Mapping):
+    """Días de un grupo; todos los días aparecen aunque no tengan clases"""
+
+    def __init__(self, compacto: HorarioCompacto, grupo: int):
+        self.compacto = compacto
+        self.grupo = grupo
+
+    def __getitem__(self, dia: str) -> 'VistaDia':
+        pos = self.compacto._pos_dia.get(dia)
+        if pos is None:
+            raise KeyError(dia)
+        return VistaDia(self.compacto, self.grupo, pos)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.compacto.dias)
+
+    def __len__(self) -> int:
+        return len(self.compacto.dias)
+
+
+class VistaDia(Mapping):
+    """Franjas ocupadas de un grupo en un día"""
+
+    def __init__(self, compacto: HorarioCompacto, grupo: int, dia: int):
+        self.compacto = compacto
+        inicio = dia * compacto.num_franjas
+        self._filas = compacto.celdas[grupo, inicio:inicio + compacto.num_franjas]
+
+    def __getitem__(self, franja: str) -> Dict[str, Any]:
+        pos = self.compacto._pos_franja.get(franja)
+        if pos is None or self._filas[pos] == SIN_SESION:
+            raise KeyError(franja)
+        return self.compacto.sesion(int(self._filas[pos]))
+
+    def __iter__(self) -> Iterator[str]:
+        for pos in np.flatnonzero(self._filas != SIN_SESION):
+            yield self.compacto.franjas[pos]
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._filas != SIN_SESION))
+
+
+def a_json(objeto: Any) -> Any:
+    """Función ``default`` para json: convierte las vistas en dicts"""
+    if isinstance(objeto, Mapping):
+        return dict(objeto)
+    raise TypeError(f"Object of type {type(objeto).__name__} is not JSON serializable")
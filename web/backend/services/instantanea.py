@@ -0,0 +1,176 @@
+"""
+Instantáneas inmutables del estado publicado
+Los datos de entrada, el horario, el grafo, la validación y los índices de
+consulta se publican juntos en un solo objeto que nunca se modifica; para
+cambiar algo se construye otro y se reemplaza la referencia de una vez
+"""
+
+import threading
+from collections.abc import Mapping
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Iterator, Callable
+
+from .query_service import QueryService
+from .export_service import ExportService
+
+# Claves del estado, con su valor inicial
+CAMPOS = {
+    'raw_data': None,
+    # Datos tal como se cargaron o editaron, antes de generarles horario: una
+    # generación solo se publica si el origen no cambió mientras corría
+    'origen_datos': None,
+    'cursos': [],
+    'profesores': [],
+    'grupos': [],
+    'aulas': [],
+    'horario_generado': None,
+    'grafo_conflictos': None,
+    'validacion': None,
+    'timestamp': None,
+    'trabajo_generacion': None
+}
+
+
+class Instantanea(Mapping):
+    """
+    Estado completo de la aplicación en un momento dado
+
+    Se lee como el antiguo diccionario ``datos_horarios`` (``inst['cursos']``,
+    ``inst.get('horario_generado')``) y además trae ``consultas`` y
+    ``exportador`` ya ligados a este mismo estado, de modo que un lector que
+    toma la instantánea al inicio de una petición ve siempre datos,
+    horario e índices coherentes entre sí aunque se publique otra mientras
+    responde. Nadie modifica los objetos de una instantánea publicada: los
+    escritores trabajan sobre copias y publican una nueva.
+
+    ``fabrica_consultas`` construye el servicio de consultas de cada
+    instantánea (``QueryService`` por defecto) y se hereda en ``reemplazar``.
+    """
+
+    def __init__(self, campos: Optional[Dict[str, Any]] = None,
+                 anterior: Optional['Instantanea'] = None,
+                 fabrica_consultas: Optional[Callable[['Instantanea'], QueryService]] = None):
+        valores = dict(CAMPOS)
+        valores.update(campos or {})
+        self._campos = MappingProxyType(valores)
+        self.fabrica_consultas = fabrica_consultas or (
+            anterior.fabrica_consultas if anterior is not None else QueryService
+        )
+
+        # Los índices y el exportador se reutilizan si no cambió lo que leen
+        if anterior is not None and self._mismos(anterior, ('horario_generado', 'profesores')):
+            self.consultas = anterior.consultas
+        else:
+            self.consultas = self.fabrica_consultas(self)
+            self.consultas.preparar()
+        if anterior is not None and self._mismos(anterior, ('horario_generado', 'cursos', 'profesores', 'grupos')):
+            self.exportador = anterior.exportador
+        else:
+            self.exportador = ExportService(self)
+
+    def _mismos(self, otra: 'Instantanea', claves: tuple) -> bool:
+        return all(self._campos[clave] is otra._campos[clave] for clave in claves)
+
+    def reemplazar(self, **cambios) -> 'Instantanea':
+        """Nueva instantánea con ``cambios``; el resto de los campos se comparte"""
+        desconocidas = set(cambios) - set(CAMPOS)
+        if desconocidas:
+            raise KeyError(f"Campos desconocidos: {', '.join(sorted(desconocidas))}")
+        return Instantanea(dict(self._campos, **cambios), anterior=self)
+
+    def __getitem__(self, clave: str) -> Any:
+        return self._campos[clave]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._campos)
+
+    def __len__(self) -> int:
+        return len(self._campos)
+
+
+class PublicadorInstantaneas:
+    """
+    Referencia a la instantánea vigente
+
+    Leer ``actual`` no toma ningún candado: la publicación es una sola
+    asignación de referencia, atómica para los demás hilos. Los escritores
+    sí se serializan entre ellos para que dos ``publicar`` simultáneos no
+    se pisen los cambios.
+    """
+
+    def __init__(self, inicial: Optional[Instantanea] = None,
+                 al_publicar: Optional[Callable[[Instantanea], None]] = None):
+        """
+        Args:
+            inicial: Instantánea de partida (vacía por defecto)
+            al_publicar: Se llama con cada instantánea nueva, todavía con el
+                candado de escritura tomado (p. ej. para persistirla)
+        """
+        self._actual = inicial or Instantanea()
+        self._escritura = threading.Lock()
+        self.al_publicar = al_publicar
+
+    @property
+    def actual(self) -> Instantanea:
+        return self._actual
+
+    def publicar(self, condicion: Optional[Callable[[Instantanea], bool]] = None,
+                 **cambios) -> Optional[Instantanea]:
+        """
+        Publica la instantánea vigente con ``cambios`` aplicados
+
+        Args:
+            condicion: Si se da, solo se publica cuando devuelve True para la
+                instantánea vigente (p. ej. que los datos de entrada sigan
+                siendo aquellos de los que partió un trabajo)
+
+        Returns:
+            La nueva instantánea o None si no se cumplió ``condicion``
+        """
+        with self._escritura:
+            return self._aplicar(condicion, cambios)
+
+    def _aplicar(self, condicion: Optional[Callable[[Instantanea], bool]],
+                 cambios: Dict[str, Any]) -> Optional[Instantanea]:
+        """Cuerpo de ``publicar``; se llama con el candado de escritura tomado"""
+        if condicion is not None and not condicion(self._actual):
+            return None
+        nueva = self._actual.reemplazar(**cambios)
+        self._actual = nueva
+        if self.al_publicar is not None:
+            self.al_publicar(nueva)
+        return nueva
+
+    def inicializar(self, cargar: Callable[[], Any]):
+        """
+        Ejecuta la carga inicial de datos
+
+        Aquí siempre; ``PublicadorCompartido`` la omite si otro proceso ya
+        publicó un estado.
+        """
+        cargar()
+
+    def publicar_datos(self, raw_data: Dict[str, Any],
+                       condicion: Optional[Callable[[Instantanea], bool]] = None,
+                       origen: Optional[Dict[str, Any]] = None,
+                       **cambios) -> Optional[Instantanea]:
+        """
+        Publica nuevos datos de entrada junto con sus listas derivadas
+
+        Args:
+            raw_data: Datos de entrada
+            condicion: Como en ``publicar``
+            origen: Datos de los que se derivó ``raw_data`` (por defecto él mismo)
+        """
+        return self.publicar(
+            condicion,
+            raw_data=raw_data,
+            origen_datos=origen if origen is not None else raw_data,
+            cursos=raw_data.get('cursos', []),
+            profesores=raw_data.get('profesores', []),
+            grupos=raw_data.get('grupos', []),
+            aulas=raw_data.get('aulas', []),
+            timestamp=datetime.now().isoformat(),
+            **cambios
+        )
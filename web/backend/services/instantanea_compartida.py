@@ -0,0 +1,268 @@
+"""
+Instantánea compartida entre procesos
+Guarda la instantánea publicada en un archivo binario que todos los procesos
+de la aplicación (p. ej. los workers de gunicorn) mapean en memoria de solo
+lectura, junto con un contador de generación que indica cuándo recargarla.
+
+Se activa con la variable de entorno HORARIOS_DIR_COMPARTIDO (directorio
+común a todos los workers). Requiere ``fcntl`` (POSIX).
+"""
+
+import os
+import json
+import mmap
+import glob
+import struct
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Iterator
+
+import numpy as np
+
+from .horario_compacto import HorarioCompacto, VistaHorario, DTYPE_SESION, a_json
+from .instantanea import Instantanea, PublicadorInstantaneas, CAMPOS
+
+logger = logging.getLogger(__name__)
+
+# Cabecera del archivo: marca, versión de formato, generación, número de
+# sesiones, grupos y casillas, y bytes del bloque JSON
+CABECERA = struct.Struct('<4sIQQQQQ')
+MARCA = b'HRC1'
+VERSION_FORMATO = 1
+
+# Contador de generación: un entero de 8 bytes al inicio del archivo
+CONTADOR = struct.Struct('<Q')
+
+# Listas que se derivan de raw_data al leer (ver ``publicar_datos``)
+DERIVADOS = ('cursos', 'profesores', 'grupos', 'aulas')
+
+# Reintentos si la generación cambia mientras se lee
+MAX_REINTENTOS = 5
+
+
+def _alinear(n: int, a: int = 8) -> int:
+    return -(-n // a) * a
+
+
+class AlmacenCompartido:
+    """
+    Directorio con la instantánea vigente en formato binario
+
+    Archivos:
+        generacion           contador de 8 bytes, mapeado por cada proceso
+        instantanea-N.bin    la instantánea de la generación N
+        escritura.lock       serializa a los procesos que publican
+        inicio.lock          elige al proceso que hace la carga inicial
+
+    Cada instantánea se escribe completa en un archivo nuevo y solo después
+    se incrementa el contador, así que un lector nunca ve un archivo a
+    medias. Formato de ``instantanea-N.bin``:
+
+        CABECERA | sesiones (DTYPE_SESION) | celdas (int32 grupos × casillas) | JSON
+
+    El horario (los dos arreglos) se mapea sin copiar; el JSON lleva los
+    catálogos del horario y el resto de los campos de la instantánea.
+    Se conservan las dos últimas generaciones; en Linux borrar un archivo
+    mapeado no afecta a quien ya lo tiene abierto.
+    """
+
+    def __init__(self, directorio: str):
+        import fcntl  # noqa: F401  (falla pronto fuera de POSIX)
+
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+
+        ruta = os.path.join(directorio, 'generacion')
+        fd = os.open(ruta, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < CONTADOR.size:
+                os.ftruncate(fd, CONTADOR.size)
+            self._contador = mmap.mmap(fd, CONTADOR.size)
+        finally:
+            os.close(fd)
+        self._bloqueos: Dict[str, int] = {}
+
+    def generacion(self) -> int:
+        """Generación publicada (0 si todavía no hay ninguna)"""
+        return CONTADOR.unpack_from(self._contador, 0)[0]
+
+    def _ruta(self, generacion: int) -> str:
+        return os.path.join(self.directorio, f"instantanea-{generacion:012d}.bin")
+
+    @contextmanager
+    def bloqueo(self, nombre: str = 'escritura') -> Iterator[None]:
+        """Candado exclusivo entre procesos sobre ``nombre``.lock"""
+        import fcntl
+
+        fd = self._bloqueos.get(nombre)
+        if fd is None:
+            fd = self._bloqueos[nombre] = os.open(
+                os.path.join(self.directorio, f"{nombre}.lock"), os.O_RDWR | os.O_CREAT, 0o644
+            )
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    # ---------- Escritura ----------
+
+    def escribir(self, instantanea: Instantanea) -> int:
+        """
+        Guarda ``instantanea`` como la siguiente generación
+
+        Debe llamarse con ``bloqueo()`` tomado.
+
+        Returns:
+            La generación publicada
+        """
+        horario = instantanea['horario_generado']
+        campos = {
+            clave: valor for clave, valor in instantanea.items()
+            if clave not in ('horario_generado', 'origen_datos')
+            and not (clave in DERIVADOS and instantanea['raw_data'] is not None)
+        }
+
+        if isinstance(horario, VistaHorario):
+            compacto = horario.compacto
+            sesiones = np.ascontiguousarray(compacto.sesiones, dtype=DTYPE_SESION)
+            celdas = np.ascontiguousarray(compacto.celdas, dtype=np.int32)
+            campos['horario_compacto'] = {
+                'dias': compacto.dias,
+                'franjas': compacto.franjas,
+                'catalogos': {
+                    'grupos': compacto.grupos.valores,
+                    'cursos': compacto.cursos.valores,
+                    'profesores': compacto.profesores.valores,
+                    'aulas': compacto.aulas.valores
+                }
+            }
+        else:
+            sesiones = np.zeros(0, dtype=DTYPE_SESION)
+            celdas = np.zeros((0, 0), dtype=np.int32)
+            campos['horario_generado'] = horario
+
+        texto = json.dumps(campos, ensure_ascii=False, default=a_json).encode('utf-8')
+        generacion = self.generacion() + 1
+        cabecera = CABECERA.pack(MARCA, VERSION_FORMATO, generacion, len(sesiones),
+                                 celdas.shape[0], celdas.shape[1] if celdas.ndim == 2 else 0, len(texto))
+
+        ruta = self._ruta(generacion)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, 'wb') as f:
+            for bloque in (cabecera, sesiones.tobytes(), celdas.tobytes()):
+                f.write(bloque)
+                f.write(b'\0' * (_alinear(len(bloque)) - len(bloque)))
+            f.write(texto)
+        os.replace(temporal, ruta)
+
+        # Publicar: los lectores ven el contador solo con el archivo completo
+        self._contador[:CONTADOR.size] = CONTADOR.pack(generacion)
+        self._purgar(generacion)
+        logger.info(f"📤 Instantánea compartida {generacion}: {len(sesiones)} sesiones, "
+                    f"{os.path.getsize(ruta)} bytes")
+        return generacion
+
+    def _purgar(self, generacion: int):
+        for ruta in glob.glob(os.path.join(self.directorio, 'instantanea-*.bin')):
+            try:
+                if int(os.path.basename(ruta)[12:24]) < generacion - 1:
+                    os.remove(ruta)
+            except (ValueError, OSError):
+                continue
+
+    # ---------- Lectura ----------
+
+    def leer(self) -> tuple:
+        """
+        Carga la generación vigente
+
+        Returns:
+            (generación, Instantanea); los arreglos del horario quedan
+            mapeados en memoria de solo lectura
+        """
+        for _ in range(MAX_REINTENTOS):
+            generacion = self.generacion()
+            try:
+                with open(self._ruta(generacion), 'rb') as f:
+                    memoria = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except FileNotFoundError:
+                continue  # Se publicó otra generación mientras tanto
+            return generacion, self._decodificar(memoria)
+        raise RuntimeError(f"No se pudo leer la instantánea compartida de {self.directorio}")
+
+    @staticmethod
+    def _decodificar(memoria: mmap.mmap) -> Instantanea:
+        marca, version, _, num_sesiones, num_grupos, num_casillas, largo_json = \
+            CABECERA.unpack_from(memoria, 0)
+        if marca != MARCA or version != VERSION_FORMATO:
+            raise ValueError(f"Instantánea compartida con formato desconocido: {marca!r} v{version}")
+
+        inicio = _alinear(CABECERA.size)
+        sesiones = np.frombuffer(memoria, dtype=DTYPE_SESION, count=num_sesiones, offset=inicio)
+        inicio += _alinear(sesiones.nbytes)
+        celdas = np.frombuffer(memoria, dtype=np.int32, count=num_grupos * num_casillas, offset=inicio)
+        inicio += _alinear(celdas.nbytes)
+        campos = json.loads(memoria[inicio:inicio + largo_json].decode('utf-8'))
+
+        formato = campos.pop('horario_compacto', None)
+        if formato is not None:
+            compacto = HorarioCompacto.desde_arreglos(
+                formato['dias'], formato['franjas'], formato['catalogos'],
+                sesiones, celdas.reshape(num_grupos, num_casillas)
+            )
+            campos['horario_generado'] = compacto.vista()
+
+        raw_data = campos.get('raw_data')
+        if raw_data is not None:
+            for clave in DERIVADOS:
+                campos[clave] = raw_data.get(clave, [])
+        campos['origen_datos'] = raw_data
+        return Instantanea({clave: campos.get(clave, CAMPOS[clave]) for clave in CAMPOS})
+
+
+class PublicadorCompartido(PublicadorInstantaneas):
+    """
+    Publicador cuya instantánea vigente es la del ``AlmacenCompartido``
+
+    Leer ``actual`` compara el contador de generación (una lectura de 8
+    bytes en memoria compartida) y solo recarga si otro proceso publicó.
+    Publicar toma además el candado entre procesos, se pone al día con lo
+    que hayan publicado los demás, aplica los cambios y escribe la nueva
+    generación.
+    """
+
+    def __init__(self, almacen: AlmacenCompartido):
+        super().__init__()
+        self.almacen = almacen
+        self._generacion = 0
+        self._sincronizar()
+
+    @property
+    def actual(self) -> Instantanea:
+        if self.almacen.generacion() != self._generacion:
+            with self._escritura:
+                self._sincronizar()
+        return self._actual
+
+    def _sincronizar(self):
+        if self.almacen.generacion() not in (0, self._generacion):
+            self._generacion, self._actual = self.almacen.leer()
+            logger.info(f"📥 Instantánea compartida {self._generacion} cargada")
+
+    def _aplicar(self, condicion, cambios):
+        with self.almacen.bloqueo():
+            self._sincronizar()
+            nueva = super()._aplicar(condicion, cambios)
+            if nueva is not None:
+                self._generacion = self.almacen.escribir(nueva)
+        return nueva
+
+    def inicializar(self, cargar: Callable[[], Any]):
+        """Solo el primer proceso carga los datos; los demás los leen del almacén"""
+        with self.almacen.bloqueo('inicio'):
+            if self.almacen.generacion():
+                logger.info("ℹ️  Datos ya publicados por otro proceso")
+                self._sincronizar()
+                return
+            cargar()
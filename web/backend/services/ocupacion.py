@@ -0,0 +1,129 @@
+"""
+Índice de ocupación por bitmasks
+Registra qué franjas (día × franja) están ocupadas por grupo, profesor y aula
+"""
+
+from typing import Dict, List, Optional, Iterator
+
+
+class IndiceOcupacion:
+    """
+    Índice compacto de ocupación sobre la rejilla días × franjas
+
+    Cada grupo y cada profesor tiene un entero cuyo bit ``i`` indica si la
+    casilla ``i`` (``dia * num_franjas + franja``) está ocupada. Para las aulas
+    se guarda, por casilla, un entero con un bit por aula ocupada, de modo que
+    encontrar la primera aula libre es una operación de bits. Las casillas en
+    que un profesor no está disponible (``restringir_profesor``) cuentan como
+    ocupadas para él, así que salen de los dominios antes de buscar.
+    """
+
+    def __init__(self, dias: List[str], franjas: List[str], aulas: List[str]):
+        self.dias = list(dias)
+        self.franjas = list(franjas)
+        self.aulas = list(aulas)
+        self.num_franjas = len(self.franjas)
+        self.num_casillas = len(self.dias) * self.num_franjas
+
+        self._pos_dia = {dia: i for i, dia in enumerate(self.dias)}
+        self._pos_franja = {franja: i for i, franja in enumerate(self.franjas)}
+        self._pos_aula = {aula: i for i, aula in enumerate(self.aulas)}
+
+        self.todas_casillas = (1 << self.num_casillas) - 1
+        self.todas_aulas = (1 << len(self.aulas)) - 1
+
+        self.grupos: Dict[str, int] = {}
+        self.profesores: Dict[str, int] = {}
+        # Casillas vetadas por la disponibilidad de cada profesor
+        self.no_disponible: Dict[str, int] = {}
+        self.aulas_por_casilla: List[int] = [0] * self.num_casillas
+        # Casillas sin ninguna aula libre
+        self.casillas_llenas = 0 if self.aulas else self.todas_casillas
+
+    # ---------- Conversión de coordenadas ----------
+
+    def casilla(self, dia: str, franja: str) -> int:
+        """Índice de casilla para un par (día, franja)"""
+        return self._pos_dia[dia] * self.num_franjas + self._pos_franja[franja]
+
+    def coordenadas(self, casilla: int) -> tuple:
+        """Par (día, franja) de un índice de casilla"""
+        return self.dias[casilla // self.num_franjas], self.franjas[casilla % self.num_franjas]
+
+    @staticmethod
+    def contar_bits(mascara: int) -> int:
+        """Número de bits encendidos de una máscara"""
+        return bin(mascara).count('1')
+
+    @staticmethod
+    def iterar_bits(mascara: int) -> Iterator[int]:
+        """Itera los índices de los bits encendidos de una máscara"""
+        while mascara:
+            bajo = mascara & -mascara
+            yield bajo.bit_length() - 1
+            mascara ^= bajo
+
+    # ---------- Consultas ----------
+
+    def ocupacion_grupo(self, grupo: str) -> int:
+        return self.grupos.get(grupo, 0)
+
+    def ocupacion_profesor(self, profesor: Optional[str]) -> int:
+        if not profesor:
+            return 0
+        return self.profesores.get(profesor, 0) | self.no_disponible.get(profesor, 0)
+
+    def casillas_libres(self, grupo: str, profesor: Optional[str]) -> int:
+        """Máscara de casillas donde ni el grupo ni el profesor tienen clase"""
+        ocupadas = self.ocupacion_grupo(grupo) | self.ocupacion_profesor(profesor)
+        return self.todas_casillas & ~ocupadas
+
+    def casillas_disponibles(self, grupo: str, profesor: Optional[str]) -> int:
+        """Casillas libres para grupo y profesor que además tienen aula libre"""
+        return self.casillas_libres(grupo, profesor) & ~self.casillas_llenas
+
+    def esta_libre(self, casilla: int, grupo: str, profesor: Optional[str]) -> bool:
+        """Verifica que grupo y profesor estén libres en la casilla"""
+        bit = 1 << casilla
+        return not ((self.ocupacion_grupo(grupo) | self.ocupacion_profesor(profesor)) & bit)
+
+    def aulas_libres(self, casilla: int) -> int:
+        """Máscara de aulas libres en la casilla"""
+        return self.todas_aulas & ~self.aulas_por_casilla[casilla]
+
+    def primera_aula_libre(self, casilla: int) -> Optional[str]:
+        """Primera aula libre en la casilla o None si están todas ocupadas"""
+        libres = self.aulas_libres(casilla)
+        if not libres:
+            return None
+        return self.aulas[(libres & -libres).bit_length() - 1]
+
+    def aula_libre(self, casilla: int, aula: str) -> bool:
+        return not (self.aulas_por_casilla[casilla] >> self._pos_aula[aula]) & 1
+
+    # ---------- Actualizaciones ----------
+
+    def restringir_profesor(self, profesor: str, disponibles: int):
+        """Limita al profesor a las casillas de la máscara ``disponibles``"""
+        self.no_disponible[profesor] = self.todas_casillas & ~disponibles
+
+    def ocupar(self, casilla: int, grupo: str, profesor: Optional[str], aula: Optional[str]):
+        """Marca la casilla como ocupada para grupo, profesor y aula"""
+        bit = 1 << casilla
+        self.grupos[grupo] = self.grupos.get(grupo, 0) | bit
+        if profesor:
+            self.profesores[profesor] = self.profesores.get(profesor, 0) | bit
+        if aula is not None:
+            self.aulas_por_casilla[casilla] |= 1 << self._pos_aula[aula]
+            if self.aulas_por_casilla[casilla] == self.todas_aulas:
+                self.casillas_llenas |= bit
+
+    def liberar(self, casilla: int, grupo: str, profesor: Optional[str], aula: Optional[str]):
+        """Deshace una llamada previa a ``ocupar``"""
+        bit = ~(1 << casilla)
+        self.grupos[grupo] = self.grupos.get(grupo, 0) & bit
+        if profesor:
+            self.profesores[profesor] = self.profesores.get(profesor, 0) & bit
+        if aula is not None:
+            self.aulas_por_casilla[casilla] &= ~(1 << self._pos_aula[aula])
+            self.casillas_llenas &= bit
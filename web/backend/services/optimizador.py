@@ -0,0 +1,371 @@
+"""
+Optimización local de restricciones blandas
+Recocido simulado sobre un horario ya factible: mueve e intercambia sesiones
+sin romper restricciones duras y reduce huecos de profesores, materias
+repetidas en un día, clases en la última franja y cambios de aula entre
+clases seguidas de un grupo
+"""
+
+import math
+import time
+import random
+import logging
+from typing import Dict, List, Any, Optional
+
+from .ocupacion import IndiceOcupacion
+from .aulas import IndiceAulas
+
+logger = logging.getLogger(__name__)
+
+# Peso de cada costo blando
+PESOS_POR_DEFECTO = {
+    'huecos_profesor': 1.0,
+    'curso_repetido_dia': 3.0,
+    'franja_tarde': 1.0,
+    'cambio_aula': 0.5
+}
+
+# Temperaturas inicial y final del recocido (en unidades de costo)
+TEMPERATURA_INICIAL = 2.0
+TEMPERATURA_FINAL = 0.02
+
+# Presupuesto por defecto: movimientos por sesión, con un tope global
+MOVIMIENTOS_POR_SESION = 200
+MAX_MOVIMIENTOS = 200000
+
+
+def desglose_costos(cursos: List[Dict], asignaciones: List[tuple], dias: List[str],
+                    franjas: List[str], franjas_tarde: int = 1) -> Dict[str, int]:
+    """
+    Cuenta cada costo blando de un horario
+
+    Args:
+        cursos: Cursos a los que apuntan las asignaciones
+        asignaciones: Lista de (indice_curso, casilla, aula)
+        franjas_tarde: Cuántas de las últimas franjas del día se penalizan
+
+    Returns:
+        {'huecos_profesor', 'curso_repetido_dia', 'franja_tarde', 'cambio_aula'}
+    """
+    num_franjas = len(franjas)
+    prof_dia: Dict[tuple, int] = {}
+    curso_dia: Dict[tuple, int] = {}
+    aula_grupo: Dict[tuple, Any] = {}
+    tarde = 0
+    for indice, casilla, aula in asignaciones:
+        curso = cursos[indice]
+        dia, franja = divmod(casilla, num_franjas)
+        if curso['profesor']:
+            clave = (curso['profesor'], dia)
+            prof_dia[clave] = prof_dia.get(clave, 0) | (1 << franja)
+        curso_dia[(indice, dia)] = curso_dia.get((indice, dia), 0) + 1
+        aula_grupo[(curso['grupo'], casilla)] = aula
+        tarde += franja >= num_franjas - franjas_tarde
+
+    cambios = 0
+    for (grupo, casilla), aula in aula_grupo.items():
+        if casilla % num_franjas < num_franjas - 1:
+            siguiente = aula_grupo.get((grupo, casilla + 1))
+            cambios += siguiente is not None and aula is not None and siguiente != aula
+
+    return {
+        'huecos_profesor': sum(_huecos(m) for m in prof_dia.values()),
+        'curso_repetido_dia': sum(n - 1 for n in curso_dia.values() if n > 1),
+        'franja_tarde': tarde,
+        'cambio_aula': cambios
+    }
+
+
+def _huecos(mascara: int) -> int:
+    """Franjas libres entre la primera y la última clase de un día"""
+    if not mascara:
+        return 0
+    bajo = (mascara & -mascara).bit_length() - 1
+    return mascara.bit_length() - bajo - bin(mascara).count('1')
+
+
+class OptimizadorLocal:
+    """
+    Recocido simulado con evaluación incremental
+
+    El estado es el de un ``IndiceOcupacion`` con todas las sesiones, así que
+    cada movimiento se valida con las mismas máscaras que usa el solver
+    (grupo, profesor, disponibilidad y aula). El costo total es suma de
+    componentes por (profesor, día), (curso, día), (grupo, día) y por sesión;
+    un movimiento solo cambia las componentes de los dos días que toca, de
+    modo que su diferencia de costo se calcula en tiempo constante.
+
+    Movimientos:
+        - mover una sesión a otra casilla de su dominio
+        - intercambiar las casillas de dos sesiones del mismo grupo
+        - pasar una sesión al aula de la clase anterior o siguiente del grupo
+    """
+
+    def __init__(self, dias: List[str], franjas: List[str],
+                 pesos: Optional[Dict[str, float]] = None,
+                 rng: Optional[random.Random] = None,
+                 max_movimientos: Optional[int] = None,
+                 limite_segundos: Optional[float] = None,
+                 franjas_tarde: int = 1):
+        """
+        Args:
+            dias, franjas: Rejilla del horario
+            pesos: Peso de cada costo (ver ``PESOS_POR_DEFECTO``)
+            rng: Generador aleatorio (para resultados reproducibles)
+            max_movimientos: Movimientos a intentar; por defecto
+                ``MOVIMIENTOS_POR_SESION`` por sesión hasta ``MAX_MOVIMIENTOS``
+            limite_segundos: Tiempo máximo de optimización; con límite de
+                tiempo el resultado deja de ser reproducible con la misma semilla
+            franjas_tarde: Cuántas de las últimas franjas del día se penalizan
+        """
+        self.dias = dias
+        self.franjas = franjas
+        self.pesos = dict(PESOS_POR_DEFECTO, **(pesos or {}))
+        self.rng = rng or random.Random()
+        self.max_movimientos = max_movimientos
+        self.limite_segundos = limite_segundos
+        self.franjas_tarde = franjas_tarde
+        self.num_franjas = len(franjas)
+        self.mascara_dia = (1 << self.num_franjas) - 1
+
+    def optimizar(self, cursos: List[Dict], asignaciones: List[tuple], aulas: List[str],
+                  aulas_info: Optional[List[Dict]] = None,
+                  disponibilidad: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """
+        Mejora un horario factible
+
+        Args:
+            cursos: Cursos a los que apuntan las asignaciones
+            asignaciones: Lista de (indice_curso, casilla, aula) del solver
+            aulas: Aulas disponibles
+            aulas_info: Capacidad y tipo de cada aula
+            disponibilidad: Máscara de casillas disponibles por profesor
+
+        Returns:
+            Diccionario con 'asignaciones' (mismo formato), 'costo_inicial',
+            'costo_final', 'desglose', 'movimientos' y 'aceptados'
+        """
+        if not asignaciones:
+            return {'asignaciones': [], 'costo_inicial': 0.0, 'costo_final': 0.0,
+                    'desglose': desglose_costos(cursos, [], self.dias, self.franjas, self.franjas_tarde),
+                    'movimientos': 0, 'aceptados': 0}
+
+        self._preparar(cursos, asignaciones, aulas, aulas_info, disponibilidad)
+        n = len(self.curso_de)
+        max_movimientos = self.max_movimientos or min(MOVIMIENTOS_POR_SESION * n, MAX_MOVIMIENTOS)
+        fin = time.monotonic() + self.limite_segundos if self.limite_segundos else None
+
+        costo = costo_inicial = self._costo_total()
+        mejor_costo = costo
+        mejor = (list(self.casilla_de), list(self.aula_de))
+        movimientos = aceptados = 0
+        temperatura = TEMPERATURA_INICIAL
+        enfriamiento = (TEMPERATURA_FINAL / TEMPERATURA_INICIAL) ** (1 / max_movimientos)
+        rng = self.rng
+
+        while movimientos < max_movimientos:
+            movimientos += 1
+            temperatura *= enfriamiento
+            if movimientos & 1023 == 0 and fin is not None and time.monotonic() >= fin:
+                break
+
+            s = rng.randrange(n)
+            tipo = rng.random()
+            if tipo < 0.5:
+                delta = self._mover(s)
+            elif tipo < 0.85:
+                delta = self._intercambiar(s)
+            else:
+                delta = self._cambiar_aula(s)
+            if delta is None:
+                continue
+
+            if delta <= 0 or rng.random() < math.exp(-delta / temperatura):
+                costo += delta
+                aceptados += 1
+                if costo < mejor_costo - 1e-9:
+                    mejor_costo = costo
+                    mejor = (list(self.casilla_de), list(self.aula_de))
+            else:
+                self._revertir()
+
+        self.casilla_de, self.aula_de = mejor
+        resultado = [(self.curso_de[s], self.casilla_de[s], self.aula_de[s]) for s in range(n)]
+        logger.info(
+            f"🔥 Recocido: costo blando {costo_inicial:.1f} → {mejor_costo:.1f} "
+            f"({aceptados}/{movimientos} movimientos aceptados)"
+        )
+        return {
+            'asignaciones': resultado,
+            'costo_inicial': round(costo_inicial, 2),
+            'costo_final': round(mejor_costo, 2),
+            'desglose': desglose_costos(cursos, resultado, self.dias, self.franjas, self.franjas_tarde),
+            'movimientos': movimientos,
+            'aceptados': aceptados
+        }
+
+    # ---------- Estado ----------
+
+    def _preparar(self, cursos, asignaciones, aulas, aulas_info, disponibilidad):
+        self.cursos = cursos
+        self.indice_aulas = IndiceAulas(aulas, aulas_info)
+        self.ocupacion = IndiceOcupacion(self.dias, self.franjas, self.indice_aulas.codigos)
+        for profesor, mascara in (disponibilidad or {}).items():
+            self.ocupacion.restringir_profesor(profesor, mascara)
+
+        self.curso_de = [indice for indice, _, _ in asignaciones]
+        self.casilla_de = [casilla for _, casilla, _ in asignaciones]
+        self.aula_de = [aula for _, _, aula in asignaciones]
+
+        num_casillas = self.ocupacion.num_casillas
+        self.sesiones_grupo: Dict[str, List[int]] = {}
+        self.aula_grupo: Dict[str, List[Optional[str]]] = {}
+        self.curso_dia = [[0] * len(self.dias) for _ in cursos]
+        for s, (indice, casilla, aula) in enumerate(asignaciones):
+            curso = cursos[indice]
+            self.ocupacion.ocupar(casilla, curso['grupo'], curso['profesor'], aula)
+            self.sesiones_grupo.setdefault(curso['grupo'], []).append(s)
+            self.aula_grupo.setdefault(curso['grupo'], [None] * num_casillas)[casilla] = aula
+            self.curso_dia[indice][casilla // self.num_franjas] += 1
+        self._deshacer: List[tuple] = []
+
+    def _quitar(self, s: int):
+        curso = self.cursos[self.curso_de[s]]
+        casilla, aula = self.casilla_de[s], self.aula_de[s]
+        self.ocupacion.liberar(casilla, curso['grupo'], curso['profesor'], aula)
+        self.aula_grupo[curso['grupo']][casilla] = None
+        self.curso_dia[self.curso_de[s]][casilla // self.num_franjas] -= 1
+
+    def _poner(self, s: int, casilla: int, aula: str):
+        curso = self.cursos[self.curso_de[s]]
+        self.ocupacion.ocupar(casilla, curso['grupo'], curso['profesor'], aula)
+        self.aula_grupo[curso['grupo']][casilla] = aula
+        self.curso_dia[self.curso_de[s]][casilla // self.num_franjas] += 1
+        self.casilla_de[s], self.aula_de[s] = casilla, aula
+
+    def _aula_para(self, s: int, casilla: int, solo: Optional[str] = None) -> Optional[str]:
+        """Aula adecuada libre en la casilla (``solo``: limitarse a esa aula)"""
+        curso = self.cursos[self.curso_de[s]]
+        libres = self.ocupacion.aulas_libres(casilla)
+        if solo is not None:
+            libres &= 1 << self.ocupacion._pos_aula[solo]
+        bit = self.indice_aulas.elegir(libres, curso.get('alumnos') or 0, curso.get('tipo_aula'))
+        return None if bit is None else self.ocupacion.aulas[bit]
+
+    def _revertir(self):
+        """Deshace el último movimiento aceptado provisionalmente"""
+        for s, _, _ in self._deshacer:
+            self._quitar(s)
+        for s, casilla, aula in self._deshacer:
+            self._poner(s, casilla, aula)
+
+    # ---------- Costo ----------
+
+    def _componentes(self, sesiones: List[int], dias: set) -> float:
+        """Costo de las componentes de ``dias`` que tocan las sesiones dadas"""
+        pesos = self.pesos
+        costo = 0.0
+        vistos = set()
+        for s in sesiones:
+            indice = self.curso_de[s]
+            curso = self.cursos[indice]
+            for dia in dias:
+                if ('c', indice, dia) not in vistos:
+                    vistos.add(('c', indice, dia))
+                    n = self.curso_dia[indice][dia]
+                    costo += pesos['curso_repetido_dia'] * (n - 1 if n > 1 else 0)
+                profesor = curso['profesor']
+                if profesor and ('p', profesor, dia) not in vistos:
+                    vistos.add(('p', profesor, dia))
+                    costo += pesos['huecos_profesor'] * self._huecos_profesor(profesor, dia)
+                if ('g', curso['grupo'], dia) not in vistos:
+                    vistos.add(('g', curso['grupo'], dia))
+                    costo += pesos['cambio_aula'] * self._cambios_aula(curso['grupo'], dia)
+            costo += pesos['franja_tarde'] * (
+                self.casilla_de[s] % self.num_franjas >= self.num_franjas - self.franjas_tarde
+            )
+        return costo
+
+    def _huecos_profesor(self, profesor: str, dia: int) -> int:
+        mascara = self.ocupacion.profesores.get(profesor, 0) >> (dia * self.num_franjas) & self.mascara_dia
+        return _huecos(mascara)
+
+    def _cambios_aula(self, grupo: str, dia: int) -> int:
+        aulas = self.aula_grupo[grupo]
+        inicio = dia * self.num_franjas
+        cambios = 0
+        for casilla in range(inicio, inicio + self.num_franjas - 1):
+            a, b = aulas[casilla], aulas[casilla + 1]
+            cambios += a is not None and b is not None and a != b
+        return cambios
+
+    def _costo_total(self) -> float:
+        desglose = desglose_costos(self.cursos, list(zip(self.curso_de, self.casilla_de, self.aula_de)),
+                                   self.dias, self.franjas, self.franjas_tarde)
+        return sum(self.pesos[clave] * valor for clave, valor in desglose.items())
+
+    # ---------- Movimientos ----------
+
+    def _aplicar(self, cambios: List[tuple]) -> Optional[float]:
+        """
+        Aplica [(sesion, casilla, aula)] y devuelve la diferencia de costo
+
+        Si alguna sesión no cabe (grupo, profesor o aula ocupados) deja el
+        estado como estaba y devuelve None.
+        """
+        sesiones = [s for s, _, _ in cambios]
+        dias = {self.casilla_de[s] // self.num_franjas for s in sesiones}
+        dias |= {casilla // self.num_franjas for _, casilla, _ in cambios}
+        antes = self._componentes(sesiones, dias)
+
+        previos = [(s, self.casilla_de[s], self.aula_de[s]) for s in sesiones]
+        for s in sesiones:
+            self._quitar(s)
+
+        colocadas = []
+        for s, casilla, aula in cambios:
+            curso = self.cursos[self.curso_de[s]]
+            if self.ocupacion.esta_libre(casilla, curso['grupo'], curso['profesor']):
+                aula = self._aula_para(s, casilla, aula)
+                if aula is not None:
+                    self._poner(s, casilla, aula)
+                    colocadas.append(s)
+                    continue
+            # No cabe: restaurar
+            for t in colocadas:
+                self._quitar(t)
+            for t, casilla_previa, aula_previa in previos:
+                self._poner(t, casilla_previa, aula_previa)
+            return None
+
+        self._deshacer = previos
+        return self._componentes(sesiones, dias) - antes
+
+    def _mover(self, s: int) -> Optional[float]:
+        """Lleva la sesión a una casilla libre al azar de su dominio"""
+        curso = self.cursos[self.curso_de[s]]
+        dominio = self.ocupacion.casillas_disponibles(curso['grupo'], curso['profesor'])
+        if not dominio:
+            return None
+        casillas = list(IndiceOcupacion.iterar_bits(dominio))
+        return self._aplicar([(s, self.rng.choice(casillas), None)])
+
+    def _intercambiar(self, s: int) -> Optional[float]:
+        """Intercambia la casilla con otra sesión del mismo grupo"""
+        grupo = self.cursos[self.curso_de[s]]['grupo']
+        t = self.rng.choice(self.sesiones_grupo[grupo])
+        if self.casilla_de[t] == self.casilla_de[s] or self.curso_de[t] == self.curso_de[s]:
+            return None
+        return self._aplicar([(s, self.casilla_de[t], None), (t, self.casilla_de[s], None)])
+
+    def _cambiar_aula(self, s: int) -> Optional[float]:
+        """Pasa la sesión al aula de la clase contigua del grupo"""
+        grupo = self.cursos[self.curso_de[s]]['grupo']
+        casilla = self.casilla_de[s]
+        franja = casilla % self.num_franjas
+        vecinas = [c for c, ok in ((casilla - 1, franja > 0), (casilla + 1, franja < self.num_franjas - 1)) if ok]
+        aulas = [self.aula_grupo[grupo][c] for c in vecinas]
+        aulas = [a for a in aulas if a is not None and a != self.aula_de[s]]
+        if not aulas:
+            return None
+        return self._aplicar([(s, casilla, self.rng.choice(aulas))])
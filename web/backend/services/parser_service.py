@@ -3,24 +3,41 @@ Servicio de parseo de archivos Excel y JSON
 Procesa archivos de entrada y extrae información de horarios
 """
 
-import pandas as pd
+import numpy as np
 import json
 import re
 import os
-from typing import Dict, List, Any
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
 import logging
 
+from .cache_excel import CacheExcel
+from .aulas import cargar_aulas
+from .disponibilidad import cargar_disponibilidad
+from .parser_service_new import iterar_filas_excel, UMBRAL_STREAMING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
 logger = logging.getLogger(__name__)
 
+# Cambiar al modificar el formato del resultado para invalidar la caché
+VERSION_PARSER = 'legacy-4'
+
+# Filas por bloque al leer libros grandes en modo streaming
+FILAS_POR_BLOQUE = 5000
+
 class ParserService:
     """Servicio para parsear archivos de horarios"""
     
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None, usar_cache: bool = True):
         self.profesores_map = {}
         self.grupos_set = set()
         self.aulas_set = set()
         self.cursos_list = []
         self.data_dir = os.path.join(os.path.dirname(__file__), '../data')
+        self.cache = None
+        if usar_cache:
+            self.cache = CacheExcel(cache_dir or os.path.join(self.data_dir, 'cache'), VERSION_PARSER)
     
     def cargar_csvs_automaticamente(self) -> Dict[str, Any]:
         """
@@ -48,6 +65,8 @@ class ParserService:
                 return None
             
             # Leer CSVs
+            import pandas as pd
+            
             df_cursos = pd.read_csv(cursos_csv, encoding='utf-8')
             df_profesores = pd.read_csv(profesores_csv, encoding='utf-8')
             df_grupos = pd.read_csv(grupos_csv, encoding='utf-8')
@@ -136,26 +155,57 @@ class ParserService:
         """
         Procesa archivo Excel con formato UPV
         
+        Los resultados se guardan en caché por SHA-256 del archivo y de los
+        CSV de ``dependencias``.
+        
         Args:
             filepath: Ruta al archivo Excel
             
         Returns:
             Diccionario con datos procesados
         """
+        if self.cache is None:
+            return self._procesar_excel(filepath)
+        return self.cache.obtener(filepath, self._procesar_excel, self.dependencias())
+    
+    def dependencias(self) -> List[str]:
+        """CSV que ``_procesar_excel`` lee junto con el libro (forman parte de la clave de caché)"""
+        return [os.path.join(self.data_dir, nombre) for nombre in ('aulas.csv', 'Disponibilidad.csv')]
+    
+    def _procesar_excel(self, filepath: str) -> Dict[str, Any]:
+        """Lee y procesa el Excel sin pasar por la caché"""
         logger.info(f"Procesando Excel: {filepath}")
         
         try:
-            # Leer Excel
-            df = pd.read_excel(filepath, sheet_name=0)
+            if os.path.getsize(filepath) > UMBRAL_STREAMING:
+                # Libro grande: procesar por bloques de filas
+                for df in self._iterar_bloques(filepath):
+                    self._procesar_dataframe(df)
+            else:
+                # Leer Excel
+                import pandas as pd
+                
+                df = pd.read_excel(filepath, sheet_name=0)
+                
+                # Limpiar y procesar datos
+                self._procesar_dataframe(df)
             
-            # Limpiar y procesar datos
-            self._procesar_dataframe(df)
+            # Aulas con capacidad y tipo (aulas.csv)
+            aulas_info = cargar_aulas(self.data_dir)
+            self.aulas_set.update(aula['codigo'] for aula in aulas_info)
+            
+            # Disponibilidad de profesores (Disponibilidad.csv)
+            disponibilidad = cargar_disponibilidad(
+                self.data_dir, [p['nombre'] for p in self.profesores_map.values()]
+            )
             
             resultado = {
                 'cursos': self.cursos_list,
                 'profesores': list(self.profesores_map.values()),
                 'grupos': sorted(list(self.grupos_set)),
                 'aulas': sorted(list(self.aulas_set)),
+                'aulas_info': aulas_info,
+                'disponibilidad': disponibilidad,
                 'metadata': {
                     'total_cursos': len(self.cursos_list),
                     'total_profesores': len(self.profesores_map),
@@ -171,15 +221,41 @@ class ParserService:
             logger.error(f"Error procesando Excel: {str(e)}", exc_info=True)
             raise
     
-    def _procesar_dataframe(self, df: pd.DataFrame):
-        """Procesa el DataFrame y extrae información"""
+    def _iterar_bloques(self, filepath: str):
+        """
+        Lee la primera hoja en bloques de ``FILAS_POR_BLOQUE`` filas
+        
+        La primera fila es el encabezado, igual que con ``pd.read_excel``;
+        cada bloque es un DataFrame con esas columnas, de modo que nunca se
+        materializa la hoja completa.
+        """
+        import pandas as pd
+        
+        filas = iterar_filas_excel(filepath)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            return
+        columnas = [f"Unnamed: {i}" if v is None else v for i, v in enumerate(encabezado)]
+        
+        bloque = []
+        for fila in filas:
+            bloque.append(fila[:len(columnas)] + (None,) * (len(columnas) - len(fila)))
+            if len(bloque) == FILAS_POR_BLOQUE:
+                yield pd.DataFrame.from_records(bloque, columns=columnas)
+                bloque = []
+        if bloque:
+            yield pd.DataFrame.from_records(bloque, columns=columnas)
+    
+    def _procesar_dataframe(self, df: 'pd.DataFrame'):
+        """Procesa el DataFrame y extrae información (puede llamarse por bloques)"""
+        import pandas as pd
         
         # Mapeo de columnas de profesores (índices 4 en adelante)
         columnas_profesores = df.columns[4:]
         
         for idx, profesor_col in enumerate(columnas_profesores, start=4):
             profesor_nombre = str(profesor_col).strip()
-            if profesor_nombre and profesor_nombre != 'nan':
+            if profesor_nombre and profesor_nombre != 'nan' and idx not in self.profesores_map:
                 self.profesores_map[idx] = {
                     'id': idx,
                     'nombre': profesor_nombre,
@@ -187,62 +263,57 @@ class ParserService:
                     'cursos': []
                 }
         
-        # Procesar filas de cursos
-        for index, row in df.iterrows():
-            try:
-                nombre_curso = str(row.iloc[0]).strip()
-                
-                # Saltar filas vacías o de encabezado
-                if pd.isna(nombre_curso) or nombre_curso in ['', 'nan', 'grupos']:
-                    continue
-                
-                # Detectar grupo
-                grupos = int(row.iloc[1]) if pd.notna(row.iloc[1]) else 0
-                if grupos == 0:
-                    continue
-                
-                # Horas por semana
-                horas_semana = int(row.iloc[2]) if pd.notna(row.iloc[2]) else 0
-                
-                # Procesar cada grupo
-                for grupo_num in range(1, grupos + 1):
-                    curso_id = f"CURSO_{len(self.cursos_list) + 1}"
-                    
-                    # Buscar profesor asignado
-                    profesor_asignado = None
-                    for col_idx in range(4, len(row)):
-                        horas = row.iloc[col_idx]
-                        if pd.notna(horas) and horas > 0:
-                            if col_idx in self.profesores_map:
-                                profesor_asignado = self.profesores_map[col_idx]['nombre']
-                                self.profesores_map[col_idx]['horas_asignadas'] += horas
-                                self.profesores_map[col_idx]['cursos'].append(curso_id)
-                                break
-                    
-                    # Determinar grupo y turno
-                    grupo_nombre = self._determinar_grupo(nombre_curso, grupos, grupo_num)
-                    self.grupos_set.add(grupo_nombre)
-                    
-                    # Crear curso
-                    curso = {
-                        'id': curso_id,
-                        'nombre': nombre_curso,
-                        'grupo': grupo_nombre,
-                        'horas_semana': horas_semana,
-                        'profesor': profesor_asignado,
-                        'aula': None,  # Se asignará después
-                        'horarios': []  # Se asignará después
-                    }
-                    
-                    self.cursos_list.append(curso)
-                    
-            except Exception as e:
-                logger.warning(f"Error procesando fila {index}: {str(e)}")
-                continue
+        # Columnas de curso como arreglos y bloque de horas como matriz NumPy
+        primera_col = df.iloc[:, 0]
+        nombres = np.char.strip(primera_col.where(primera_col.notna(), 'nan').to_numpy(dtype=object).astype(str))
+        num_grupos = pd.to_numeric(df.iloc[:, 1], errors='coerce').fillna(0).to_numpy().astype(int)
+        horas_semana = pd.to_numeric(df.iloc[:, 2], errors='coerce').fillna(0).to_numpy().astype(int)
+        
+        columnas = list(self.profesores_map.keys())
+        primera = np.full(df.shape[0], -1)
+        if columnas:
+            horas = df.iloc[:, columnas].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+            filas_con_horas, cols = np.nonzero(horas > 0)
+            # Primer profesor con horas > 0 en cada fila
+            filas_unicas, inicio = np.unique(filas_con_horas, return_index=True)
+            primera[filas_unicas] = cols[inicio]
         
-        # Generar aulas (15 aulas como en el ejemplo)
-        for i in range(1, 16):
-            self.aulas_set.add(f"Aula-{i}")
+        # Saltar filas vacías, de encabezado o sin grupos
+        validas = ~np.isin(nombres, ['', 'nan', 'grupos']) & (num_grupos > 0)
+        filas = np.flatnonzero(validas)
+        
+        # Expandir cada fila a sus grupos: fila repetida y número de grupo 1..N
+        repeticiones = num_grupos[filas]
+        filas_exp = np.repeat(filas, repeticiones)
+        grupo_num = np.arange(len(filas_exp)) - np.repeat(np.cumsum(repeticiones) - repeticiones, repeticiones) + 1
+        
+        for fila, num in zip(filas_exp, grupo_num):
+            curso_id = f"CURSO_{len(self.cursos_list) + 1}"
+            
+            # Profesor asignado
+            profesor_asignado = None
+            if primera[fila] >= 0:
+                col_idx = columnas[primera[fila]]
+                profesor_asignado = self.profesores_map[col_idx]['nombre']
+                self.profesores_map[col_idx]['horas_asignadas'] += horas[fila, primera[fila]]
+                self.profesores_map[col_idx]['cursos'].append(curso_id)
+            
+            # Determinar grupo y turno
+            grupo_nombre = self._determinar_grupo(str(nombres[fila]), int(num_grupos[fila]), int(num))
+            self.grupos_set.add(grupo_nombre)
+            
+            # Crear curso
+            curso = {
+                'id': curso_id,
+                'nombre': str(nombres[fila]),
+                'grupo': grupo_nombre,
+                'horas_semana': int(horas_semana[fila]),
+                'profesor': profesor_asignado,
+                'aula': None,  # Se asignará después
+                'horarios': []  # Se asignará después
+            }
+            
+            self.cursos_list.append(curso)
     
     def _determinar_grupo(self, nombre_curso: str, total_grupos: int, grupo_num: int) -> str:
         """Determina el nombre del grupo basado en el nombre del curso"""
@@ -2,50 +2,186 @@
 Servicio de parsing NUEVO - Procesa correctamente el Excel de la UPV
 """
 
-import pandas as pd
+import numpy as np
 import os
 import re
 import logging
-from typing import Dict, List, Any
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Iterator
+
+from .cache_excel import CacheExcel
+from .aulas import cargar_aulas
+from .disponibilidad import cargar_disponibilidad
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+# Cambiar al modificar el formato del resultado para invalidar la caché
+VERSION_PARSER = 'new-5'
+
+# Libros más grandes que esto se leen fila a fila en lugar de con pandas
+UMBRAL_STREAMING = 5 * 1024 * 1024
+
+# Líneas de encabezado dentro de una sección que no son cursos
+ENCABEZADOS_SECCION = ['Inglés I', 'Inglés II', 'Inglés IV', 'Inglés V', 'Inglés VII', 'Inglés VIII',
+                       'Valores del Ser', 'Estancia I', 'Estancia II']
+
+# Encabezado de sección: 'Matutino (ITI 2-1, ITI 2-2)'
+_SECCION = re.compile(r'^\s*(Matutino|Vespertino)\s*\(([^)]*)\)')
+_GRUPO_SECCION = re.compile(r'([A-Za-zÁÉÍÓÚÑáéíóúñ]+)\s*(\d+)-\d+')
+
+
+def grupos_de_seccion(texto: Any) -> Optional[List[str]]:
+    """
+    Grupos de una fila de encabezado de sección o None si no lo es
+    
+    'Vespertino (ITI 1-1)' → ['ITI-1V'];
+    'Matutino (ITI 2-1, ITI 2-2)' → ['ITI-2M1', 'ITI-2M2']
+    """
+    if not isinstance(texto, str):
+        return None
+    m = _SECCION.match(texto)
+    if not m:
+        return None
+    turno = m.group(1)[0]
+    grupos = _GRUPO_SECCION.findall(m.group(2))
+    if not grupos:
+        return None
+    if len(grupos) == 1:
+        return [f"{carrera}-{cuatrimestre}{turno}" for carrera, cuatrimestre in grupos]
+    return [f"{carrera}-{cuatrimestre}{turno}{i}" for i, (carrera, cuatrimestre) in enumerate(grupos, 1)]
+
+
+def iterar_filas_excel(filepath: str, hoja: Optional[str] = None) -> Iterator[tuple]:
+    """
+    Filas de una hoja como tuplas de valores, sin cargar el libro en memoria
+    
+    Usa el modo read-only de openpyxl; el libro se cierra al agotar o
+    descartar el generador.
+    
+    Args:
+        filepath: Ruta al archivo Excel
+        hoja: Nombre de la hoja (por defecto la primera)
+    """
+    from openpyxl import load_workbook
+    
+    libro = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        hoja_excel = libro[hoja] if hoja is not None else libro.worksheets[0]
+        for fila in hoja_excel.iter_rows(min_row=1, values_only=True):
+            yield fila
+    finally:
+        libro.close()
+
+
+def _es_nulo(valor: Any) -> bool:
+    """Celda vacía: None o NaN (equivalente a pd.isna para un escalar)"""
+    return valor is None or (isinstance(valor, float) and valor != valor)
+
+
+def _a_numero(valor: Any) -> float:
+    """Valor numérico de una celda o NaN (equivalente a pd.to_numeric con coerce)"""
+    if isinstance(valor, bool):
+        return float(valor)
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    if isinstance(valor, str):
+        try:
+            return float(valor.strip())
+        except ValueError:
+            return float('nan')
+    return float('nan')
+
+
 class ParserServiceNew:
     """Parser mejorado para procesar Excel de horarios UPV"""
     
-    def __init__(self):
-        self.data_dir = os.path.join(os.path.dirname(__file__), '../data')
+    # Grupos del libro EneAbr18 por fila de la hoja 'Matriz ITI'; solo se
+    # usan si la hoja no tiene encabezados de sección reconocibles
+    GRUPOS_INFO = {
+        4: ['ITI-1V'],
+        13: ['ITI-2M1', 'ITI-2M2'],  # Matutino tiene 2 grupos
+        21: ['ITI-2V'],
+        30: ['ITI-4V'],
+        39: ['ITI-5M1', 'ITI-5M2'],  # Matutino tiene 2 grupos
+        47: ['ITI-5V'],
+        56: ['ITI-7V'],
+        65: ['ITI-8M'],
+        73: ['ITI-8V']
+    }
+    
+    def __init__(self, cache_dir: Optional[str] = None, usar_cache: bool = True,
+                 data_dir: Optional[str] = None):
+        """
+        Args:
+            cache_dir: Carpeta de la caché (por defecto data/cache)
+            usar_cache: Reutilizar resultados de libros ya procesados
+            data_dir: Carpeta con aulas.csv y Disponibilidad.csv (por defecto data/)
+        """
+        self.data_dir = data_dir or os.path.join(os.path.dirname(__file__), '../data')
+        self.cache = None
+        if usar_cache:
+            self.cache = CacheExcel(cache_dir or os.path.join(self.data_dir, 'cache'), VERSION_PARSER)
         
     def procesar_excel(self, filepath: str) -> Dict[str, Any]:
         """
         Procesa el Excel de la UPV correctamente
         
+        Si el mismo archivo (por SHA-256) ya se procesó con esta versión del
+        parser y los mismos CSV de ``dependencias``, devuelve el resultado
+        guardado sin leer el Excel.
+        
         Args:
             filepath: Ruta al archivo Excel
             
         Returns:
             Diccionario con datos procesados
         """
+        if self.cache is None:
+            return self._procesar_excel(filepath)
+        return self.cache.obtener(filepath, self._procesar_excel, self.dependencias())
+    
+    def dependencias(self) -> List[str]:
+        """CSV que ``_procesar_excel`` lee junto con el libro (forman parte de la clave de caché)"""
+        return [os.path.join(self.data_dir, nombre) for nombre in ('aulas.csv', 'Disponibilidad.csv')]
+    
+    def _procesar_excel(self, filepath: str) -> Dict[str, Any]:
+        """Lee y procesa el Excel sin pasar por la caché"""
         logger.info(f"📊 Procesando Excel: {filepath}")
         
         try:
-            # Leer Excel
-            df = pd.read_excel(filepath, sheet_name='Matriz ITI', header=None)
-            
-            # Extraer profesores (fila 1, desde columna 4)
-            profesores = self._extraer_profesores(df)
+            if os.path.getsize(filepath) > UMBRAL_STREAMING:
+                # Libro grande: recorrer la hoja fila a fila sin DataFrame
+                profesores = {}
+                cursos = list(self.iterar_cursos(filepath, profesores))
+                grupos = sorted({curso['grupo'] for curso in cursos})
+            else:
+                # Leer Excel (pandas solo se importa cuando hace falta)
+                import pandas as pd
+                
+                df = pd.read_excel(filepath, sheet_name='Matriz ITI', header=None)
+                
+                # Extraer profesores (fila 1, desde columna 4)
+                profesores = self._extraer_profesores(df)
+                
+                # Extraer cursos y grupos
+                cursos, grupos = self._extraer_cursos_y_grupos(df, profesores)
             
-            # Extraer cursos y grupos
-            cursos, grupos = self._extraer_cursos_y_grupos(df, profesores)
+            # Aulas con capacidad y tipo (aulas.csv)
+            aulas_info = cargar_aulas(self.data_dir)
+            aulas = [aula['codigo'] for aula in aulas_info]
             
-            # Generar aulas
-            aulas = [f"Aula-{i}" for i in range(1, 16)]
+            # Disponibilidad de profesores (Disponibilidad.csv)
+            disponibilidad = cargar_disponibilidad(self.data_dir, [p['nombre'] for p in profesores.values()])
             
             resultado = {
                 'cursos': cursos,
                 'profesores': list(profesores.values()),
                 'grupos': grupos,
                 'aulas': aulas,
+                'aulas_info': aulas_info,
+                'disponibilidad': disponibilidad,
                 'metadata': {
                     'total_cursos': len(cursos),
                     'total_profesores': len(profesores),
@@ -61,116 +197,234 @@ class ParserServiceNew:
             logger.error(f"❌ Error procesando Excel: {str(e)}", exc_info=True)
             raise
     
-    def _extraer_profesores(self, df: pd.DataFrame) -> Dict[int, Dict]:
+    def _extraer_profesores(self, df: 'pd.DataFrame') -> Dict[int, Dict]:
         """Extrae profesores de la fila 1"""
         profesores = {}
         
         # Fila 1, desde columna 4 en adelante
-        for idx in range(4, df.shape[1]):
-            nombre = df.iloc[1, idx]
-            if pd.notna(nombre) and str(nombre).strip() and str(nombre).strip() != 'Resta':
-                nombre = str(nombre).strip()
-                profesores[idx] = {
-                    'id': f"PROF_{len(profesores) + 1}",
-                    'nombre': nombre,
-                    'horas_asignadas': 0,
-                    'cursos': []
-                }
+        fila = df.iloc[1, 4:]
+        nombres = fila[fila.notna()].astype(str).str.strip()
+        nombres = nombres[(nombres != '') & (nombres != 'Resta')]
+        
+        for idx, nombre in zip(nombres.index, nombres.values):
+            profesores[int(idx)] = {
+                'id': f"PROF_{len(profesores) + 1}",
+                'nombre': nombre,
+                'horas_asignadas': 0,
+                'cursos': []
+            }
         
         logger.info(f"📋 {len(profesores)} profesores extraídos")
         return profesores
     
-    def _extraer_cursos_y_grupos(self, df: pd.DataFrame, profesores: Dict) -> tuple:
+    def _matriz_horas(self, df: 'pd.DataFrame', columnas: List[int]) -> tuple:
+        """
+        Extrae el bloque de horas por profesor como una matriz NumPy
+        
+        Args:
+            df: Hoja completa
+            columnas: Índices de las columnas de profesores
+            
+        Returns:
+            (horas, primera) donde ``horas`` es la matriz filas × profesores
+            (NaN en celdas vacías o no numéricas) y ``primera[fila]`` es la
+            posición en ``columnas`` del primer profesor con horas > 0, o -1
+        """
+        import pandas as pd
+        
+        if not columnas:
+            return np.zeros((df.shape[0], 0)), np.full(df.shape[0], -1)
+        
+        horas = df.iloc[:, columnas].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        filas, cols = np.nonzero(horas > 0)
+        
+        # np.nonzero recorre por filas: la primera aparición de cada fila es su menor columna
+        primera = np.full(df.shape[0], -1)
+        filas_con_horas, inicio = np.unique(filas, return_index=True)
+        primera[filas_con_horas] = cols[inicio]
+        return horas, primera
+    
+    def _extraer_cursos_y_grupos(self, df: 'pd.DataFrame', profesores: Dict) -> tuple:
         """Extrae cursos y grupos del Excel"""
+        import pandas as pd
+        
         cursos = []
         grupos_set = set()
         
-        # Grupos detectados en filas específicas
-        grupos_info = {
-            4: ['ITI-1V'],
-            13: ['ITI-2M1', 'ITI-2M2'],  # Matutino tiene 2 grupos
-            21: ['ITI-2V'],
-            30: ['ITI-4V'],
-            39: ['ITI-5M1', 'ITI-5M2'],  # Matutino tiene 2 grupos
-            47: ['ITI-5V'],
-            56: ['ITI-7V'],
-            65: ['ITI-8M'],
-            73: ['ITI-8V']
-        }
+        # Columnas 0-2 (curso, grupos, horas) y bloque de profesores como arreglos
+        nombres = df.iloc[:, 0].to_numpy(dtype=object)
+        num_grupos = pd.to_numeric(df.iloc[:, 1], errors='coerce').fillna(0).to_numpy()
+        horas_semana = pd.to_numeric(df.iloc[:, 2], errors='coerce').fillna(0).to_numpy()
+        
+        columnas = list(profesores.keys())
+        horas, primera = self._matriz_horas(df, columnas)
+        
+        por_nombre: Dict[str, List[Dict]] = {}
+        for prof_info in profesores.values():
+            por_nombre.setdefault(prof_info['nombre'], []).append(prof_info)
         
         # Procesar cada sección de grupos
-        for fila_inicio, lista_grupos in grupos_info.items():
-            # Leer cursos hasta encontrar la siguiente sección o línea vacía
-            fila_actual = fila_inicio + 1
+        for fila_inicio, lista_grupos in self._secciones(nombres).items():
+            filas = self._filas_de_seccion(nombres, num_grupos, fila_inicio)
             
-            while fila_actual < df.shape[0]:
-                nombre_curso = df.iloc[fila_actual, 0]
-                
-                # Si llegamos a otra sección o línea vacía, terminar
-                if pd.isna(nombre_curso) or str(nombre_curso).strip() in ['', 'Totales', 'Horas restantes']:
-                    break
-                
-                # Si encontramos otro grupo, terminar
-                if 'ITI' in str(nombre_curso) and ('Matutino' in str(nombre_curso) or 'Vespertino' in str(nombre_curso)):
-                    break
-                
-                nombre_curso = str(nombre_curso).strip()
-                
-                # Saltar líneas de encabezado
-                if nombre_curso in ['Inglés I', 'Inglés II', 'Inglés IV', 'Inglés V', 'Inglés VII', 'Inglés VIII', 
-                                   'Valores del Ser', 'Estancia I', 'Estancia II']:
-                    fila_actual += 1
-                    continue
-                
-                # Obtener número de grupos y horas
-                num_grupos_curso = df.iloc[fila_actual, 1]
-                horas_semana = df.iloc[fila_actual, 2]
-                
-                if pd.isna(num_grupos_curso) or num_grupos_curso == 0:
-                    fila_actual += 1
-                    continue
+            # Expansión por columnas: cada fila se repite una vez por grupo
+            filas_exp = np.repeat(filas, len(lista_grupos))
+            grupos_exp = lista_grupos * len(filas)
+            
+            for fila, grupo_nombre in zip(filas_exp, grupos_exp):
+                # Profesor asignado: primera celda con horas > 0
+                profesor_asignado = None
+                if primera[fila] >= 0:
+                    prof_info = profesores[columnas[primera[fila]]]
+                    profesor_asignado = prof_info['nombre']
+                    if grupo_nombre == lista_grupos[0]:
+                        prof_info['horas_asignadas'] += float(horas[fila, primera[fila]])
                 
-                num_grupos_curso = int(num_grupos_curso)
-                horas_semana = int(horas_semana) if pd.notna(horas_semana) else 0
+                grupos_set.add(grupo_nombre)
                 
-                # Encontrar profesor asignado (primera celda con horas > 0)
-                profesor_asignado = None
-                for col_idx, prof_info in profesores.items():
-                    horas = df.iloc[fila_actual, col_idx]
-                    if pd.notna(horas) and float(horas) > 0:
-                        profesor_asignado = prof_info['nombre']
-                        prof_info['horas_asignadas'] += float(horas)
-                        break
+                curso_id = f"CURSO_{len(cursos) + 1}"
+                curso = {
+                    'id': curso_id,
+                    'nombre': str(nombres[fila]).strip(),
+                    'grupo': grupo_nombre,
+                    'horas_semana': int(horas_semana[fila]),
+                    'profesor': profesor_asignado,
+                    'aula': None,
+                    'horarios': []
+                }
                 
-                # Crear cursos para cada grupo
-                for grupo_nombre in lista_grupos:
-                    grupos_set.add(grupo_nombre)
-                    
-                    curso_id = f"CURSO_{len(cursos) + 1}"
-                    curso = {
-                        'id': curso_id,
-                        'nombre': nombre_curso,
-                        'grupo': grupo_nombre,
-                        'horas_semana': horas_semana,
-                        'profesor': profesor_asignado,
-                        'aula': None,
-                        'horarios': []
-                    }
-                    
-                    cursos.append(curso)
-                    
-                    # Actualizar cursos del profesor
-                    if profesor_asignado:
-                        for prof_info in profesores.values():
-                            if prof_info['nombre'] == profesor_asignado:
-                                if curso_id not in prof_info['cursos']:
-                                    prof_info['cursos'].append(curso_id)
+                cursos.append(curso)
                 
-                fila_actual += 1
+                # Actualizar cursos del profesor
+                for prof_info in por_nombre.get(profesor_asignado, []):
+                    if curso_id not in prof_info['cursos']:
+                        prof_info['cursos'].append(curso_id)
         
         logger.info(f"📚 {len(cursos)} cursos extraídos en {len(grupos_set)} grupos")
         return cursos, sorted(list(grupos_set))
     
+    def _secciones(self, nombres: np.ndarray) -> Dict[int, List[str]]:
+        """Fila de encabezado → grupos de cada sección de la hoja"""
+        secciones = {}
+        for fila, nombre in enumerate(nombres):
+            grupos = grupos_de_seccion(nombre)
+            if grupos:
+                secciones[fila] = grupos
+        return secciones or self.GRUPOS_INFO
+    
+    def _filas_de_seccion(self, nombres: np.ndarray, num_grupos: np.ndarray, fila_inicio: int) -> np.ndarray:
+        """Filas de curso de una sección, hasta la siguiente sección o línea vacía"""
+        filas = []
+        
+        for fila_actual in range(fila_inicio + 1, len(nombres)):
+            tipo = self._tipo_fila(nombres[fila_actual], num_grupos[fila_actual])
+            if tipo == 'fin':
+                break
+            if tipo == 'curso':
+                filas.append(fila_actual)
+        
+        return np.array(filas, dtype=int)
+    
+    @staticmethod
+    def _tipo_fila(nombre_curso: Any, num_grupos: float) -> str:
+        """Clasifica una fila de sección: 'fin', 'saltar' o 'curso'"""
+        # Si llegamos a otra sección o línea vacía, terminar
+        if _es_nulo(nombre_curso) or str(nombre_curso).strip() in ['', 'Totales', 'Horas restantes']:
+            return 'fin'
+        
+        # Si encontramos otro grupo, terminar
+        if _SECCION.match(str(nombre_curso)):
+            return 'fin'
+        
+        # Saltar líneas de encabezado y cursos sin grupos
+        if str(nombre_curso).strip() in ENCABEZADOS_SECCION or not num_grupos or num_grupos != num_grupos:
+            return 'saltar'
+        
+        return 'curso'
+    
+    def iterar_cursos(self, filepath: str, profesores: Optional[Dict[int, Dict]] = None,
+                      hoja: str = 'Matriz ITI') -> Iterator[Dict]:
+        """
+        Genera los cursos de la hoja leyéndola fila a fila
+        
+        Produce los mismos cursos que ``procesar_excel`` pero con memoria
+        acotada: solo se mantiene la fila actual y el estado de la sección.
+        
+        Args:
+            filepath: Ruta al archivo Excel
+            profesores: Diccionario que se llena con los profesores de la
+                fila 1 y sus horas/cursos a medida que avanza la lectura
+            hoja: Hoja con la matriz de cursos × profesores
+        """
+        if profesores is None:
+            profesores = {}
+        columnas: List[int] = []
+        por_nombre: Dict[str, List[Dict]] = {}
+        seccion: Optional[List[str]] = None
+        num_cursos = 0
+        # Sin encabezados reconocibles se usan las filas de GRUPOS_INFO
+        hay_encabezados = False
+        
+        for num_fila, fila in enumerate(iterar_filas_excel(filepath, hoja)):
+            if num_fila == 1:
+                # Profesores: fila 1, desde columna 4
+                for idx in range(4, len(fila)):
+                    if fila[idx] is None:
+                        continue
+                    nombre = str(fila[idx]).strip()
+                    if nombre and nombre != 'Resta':
+                        profesores[idx] = {
+                            'id': f"PROF_{len(profesores) + 1}",
+                            'nombre': nombre,
+                            'horas_asignadas': 0,
+                            'cursos': []
+                        }
+                        por_nombre.setdefault(nombre, []).append(profesores[idx])
+                columnas = list(profesores.keys())
+                logger.info(f"📋 {len(profesores)} profesores extraídos")
+            
+            if seccion is not None:
+                nombre_curso = fila[0] if fila else None
+                tipo = self._tipo_fila(nombre_curso, _a_numero(fila[1]) if len(fila) > 1 else 0)
+                if tipo == 'fin':
+                    seccion = None
+                elif tipo == 'curso':
+                    horas_semana = _a_numero(fila[2]) if len(fila) > 2 else 0
+                    horas_semana = int(horas_semana) if horas_semana == horas_semana else 0
+                    
+                    # Profesor asignado: primera celda con horas > 0
+                    profesor_asignado = None
+                    for col_idx in columnas:
+                        horas = _a_numero(fila[col_idx]) if col_idx < len(fila) else 0
+                        if horas > 0:
+                            profesor_asignado = profesores[col_idx]['nombre']
+                            profesores[col_idx]['horas_asignadas'] += horas
+                            break
+                    
+                    for grupo_nombre in seccion:
+                        num_cursos += 1
+                        curso_id = f"CURSO_{num_cursos}"
+                        for prof_info in por_nombre.get(profesor_asignado, []):
+                            if curso_id not in prof_info['cursos']:
+                                prof_info['cursos'].append(curso_id)
+                        
+                        yield {
+                            'id': curso_id,
+                            'nombre': str(nombre_curso).strip(),
+                            'grupo': grupo_nombre,
+                            'horas_semana': horas_semana,
+                            'profesor': profesor_asignado,
+                            'aula': None,
+                            'horarios': []
+                        }
+            
+            grupos = grupos_de_seccion(fila[0] if fila else None)
+            if grupos:
+                hay_encabezados = True
+                seccion = grupos
+            elif not hay_encabezados and num_fila in self.GRUPOS_INFO:
+                seccion = self.GRUPOS_INFO[num_fila]
+    
     def cargar_csvs_automaticamente(self) -> Dict[str, Any]:
         """Mantener compatibilidad con CSVs (método legacy)"""
         logger.info("ℹ️  Usando CSVs legacy - Se recomienda subir Excel")
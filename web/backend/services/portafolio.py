@@ -0,0 +1,156 @@
+"""
+Resolución en portafolio
+Lanza varias ejecuciones del solver con semillas distintas en procesos
+separados y se queda con el mejor resultado
+"""
+
+import os
+import time
+import random
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Any, Optional, Callable
+
+from .solver_csp import SolverCSP
+
+logger = logging.getLogger(__name__)
+
+# Señal de parada compartida con los procesos del pool
+_evento_detener = None
+
+
+def _inicializar_proceso(evento):
+    global _evento_detener
+    _evento_detener = evento
+
+
+def _resolver_semilla(cursos: List[Dict], aulas: List[str], dias: List[str],
+                      franjas: List[str], semilla: int, max_nodos: int,
+                      limite_segundos: Optional[float],
+                      aulas_info: Optional[List[Dict]] = None,
+                      disponibilidad: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """Una ejecución del portafolio (se ejecuta en un proceso del pool)"""
+    detener = _evento_detener.is_set if _evento_detener is not None else None
+    solver = SolverCSP(
+        dias, franjas, max_nodos=max_nodos, rng=random.Random(semilla),
+        limite_segundos=limite_segundos, detener=detener
+    )
+    solucion = solver.resolver(cursos, aulas, aulas_info=aulas_info, disponibilidad=disponibilidad)
+    solucion['semilla'] = semilla
+    solucion['violaciones_blandas'] = violaciones_blandas(cursos, solucion['asignaciones'], len(franjas))
+    return solucion
+
+
+def violaciones_blandas(cursos: List[Dict], asignaciones: List[tuple], num_franjas: int) -> int:
+    """Sesiones de un mismo curso repetidas en el mismo día"""
+    vistos = set()
+    violaciones = 0
+    for indice, casilla, _ in asignaciones:
+        clave = (indice, casilla // num_franjas)
+        if clave in vistos:
+            violaciones += 1
+        vistos.add(clave)
+    return violaciones
+
+
+def _mejor(a: Optional[Dict], b: Dict) -> Dict:
+    """Más sesiones colocadas y, a igualdad, menos violaciones blandas"""
+    if a is None:
+        return b
+    clave_a = (len(a['asignaciones']), -a['violaciones_blandas'])
+    clave_b = (len(b['asignaciones']), -b['violaciones_blandas'])
+    return b if clave_b > clave_a else a
+
+
+def resolver_portafolio(cursos: List[Dict], aulas: List[str], dias: List[str],
+                        franjas: List[str], ejecuciones: int, max_nodos: int,
+                        limite_segundos: Optional[float] = None,
+                        semilla_base: Optional[int] = None,
+                        procesos: Optional[int] = None,
+                        detener: Optional[Callable[[], bool]] = None,
+                        progreso: Optional[Callable[[Dict[str, Any]], None]] = None,
+                        aulas_info: Optional[List[Dict]] = None,
+                        disponibilidad: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """
+    Ejecuta ``ejecuciones`` búsquedas independientes y devuelve la mejor
+
+    En cuanto una ejecución encuentra un horario completo, o se agota
+    ``limite_segundos``, o ``detener`` devuelve True, se avisa al resto para
+    que paren y devuelvan su mejor asignación parcial. ``progreso`` recibe
+    un resumen cada vez que termina una ejecución.
+
+    Returns:
+        La solución ganadora del solver, con 'semilla',
+        'violaciones_blandas' y 'ejecuciones_terminadas'
+    """
+    if semilla_base is None:
+        semilla_base = random.randrange(2 ** 31)
+    semillas = [semilla_base + i for i in range(ejecuciones)]
+
+    # Solo se envía a los procesos lo que el solver necesita
+    cursos_min = [
+        {'grupo': c['grupo'], 'profesor': c['profesor'], 'horas_semana': c['horas_semana'],
+         'alumnos': c.get('alumnos'), 'tipo_aula': c.get('tipo_aula')}
+        for c in cursos
+    ]
+
+    if ejecuciones <= 1:
+        mejor = _resolver_semilla(cursos_min, aulas, dias, franjas, semillas[0],
+                                  max_nodos, limite_segundos, aulas_info, disponibilidad)
+        mejor['ejecuciones_terminadas'] = 1
+        return mejor
+
+    procesos = min(procesos or os.cpu_count() or 1, ejecuciones)
+    evento = multiprocessing.Event()
+    fin = time.monotonic() + limite_segundos if limite_segundos else None
+    mejor = None
+    terminadas = 0
+
+    logger.info(f"🧮 Portafolio: {ejecuciones} ejecuciones en {procesos} procesos")
+
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso,
+                             initargs=(evento,)) as pool:
+        futuros = {
+            pool.submit(_resolver_semilla, cursos_min, aulas, dias, franjas,
+                        semilla, max_nodos, limite_segundos, aulas_info, disponibilidad)
+            for semilla in semillas
+        }
+
+        while futuros:
+            restante = None if fin is None or evento.is_set() else max(0.0, fin - time.monotonic())
+            if detener is not None and not evento.is_set():
+                # Consultar la señal externa de parada con regularidad
+                restante = 0.25 if restante is None else min(restante, 0.25)
+            listos, futuros = wait(futuros, timeout=restante, return_when=FIRST_COMPLETED)
+
+            for futuro in listos:
+                if futuro.cancelled():
+                    continue
+                solucion = futuro.result()
+                terminadas += 1
+                mejor = _mejor(mejor, solucion)
+                if progreso is not None:
+                    progreso({
+                        'sesiones_asignadas': len(mejor['asignaciones']),
+                        'mejor_sesiones': len(mejor['asignaciones']),
+                        'total_sesiones': mejor['total_sesiones'],
+                        'ejecuciones_terminadas': terminadas,
+                        'ejecuciones': ejecuciones
+                    })
+
+            completo = mejor is not None and mejor['completo']
+            parar = completo or (fin is not None and time.monotonic() >= fin) or \
+                (detener is not None and detener())
+            if parar and not evento.is_set():
+                # Cancelar las que no empezaron y pedir a las activas que paren
+                evento.set()
+                for futuro in futuros:
+                    futuro.cancel()
+
+    mejor['ejecuciones_terminadas'] = terminadas
+    logger.info(
+        f"🏁 Portafolio: semilla {mejor['semilla']} con "
+        f"{len(mejor['asignaciones'])}/{mejor['total_sesiones']} sesiones"
+    )
+    return mejor
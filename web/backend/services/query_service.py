@@ -9,10 +9,104 @@ import logging
 logger = logging.getLogger(__name__)
 
 class QueryService:
-    """Servicio para consultar información de horarios"""
+    """
+    Servicio para consultar información de horarios
+    
+    Mantiene índices por grupo, profesor, aula, curso y (día, franja) que se
+    construyen una sola vez por horario generado; cada consulta cuesta lo que
+    mide su resultado. Los índices se reconstruyen solos cuando cambia el
+    horario o la lista de profesores en ``datos_horarios``.
+    """
     
     def __init__(self, datos_horarios: Dict):
         self.datos = datos_horarios
+        self._horario_indexado = None
+        self._profesores_indexados = None
+        self.por_grupo: Dict[str, Dict[str, Any]] = {}
+        self.por_profesor: Dict[str, List[Dict]] = {}
+        self.por_aula: Dict[str, List[Dict]] = {}
+        self.por_curso: Dict[str, List[Dict]] = {}
+        self.por_casilla: Dict[tuple, List[Dict]] = {}
+        self.info_profesor: Dict[str, Dict] = {}
+    
+    def invalidar(self):
+        """Descarta los índices; se reconstruyen en la siguiente consulta"""
+        self._horario_indexado = None
+        self._profesores_indexados = None
+    
+    def preparar(self):
+        """Construye los índices ya, en vez de en la primera consulta"""
+        self._indices()
+    
+    def _indices(self):
+        """Reconstruye los índices si el horario o los profesores cambiaron"""
+        horario_generado = self.datos.get('horario_generado') or {}
+        profesores = self.datos.get('profesores', [])
+        
+        if profesores is not self._profesores_indexados:
+            info = {}
+            for prof in profesores:
+                info.setdefault(prof['nombre'], prof)
+            self.info_profesor = info
+            self._profesores_indexados = profesores
+        
+        if horario_generado is not self._horario_indexado:
+            self.indexar(horario_generado)
+    
+    def indexar(self, horario_generado: Dict[str, Dict]):
+        """Construye todos los índices de consulta para un horario"""
+        por_grupo = {}
+        por_profesor: Dict[str, List[Dict]] = {}
+        por_aula: Dict[str, List[Dict]] = {}
+        por_curso: Dict[str, List[Dict]] = {}
+        por_casilla: Dict[tuple, List[Dict]] = {}
+        
+        for grupo, horario_grupo in horario_generado.items():
+            dias_formateados = {}
+            for dia, franjas in horario_grupo.items():
+                dias_formateados[dia] = []
+                for franja, datos in sorted(franjas.items()):
+                    dias_formateados[dia].append({
+                        'franja': franja,
+                        'curso': datos['curso'],
+                        'profesor': datos['profesor'],
+                        'aula': datos['aula']
+                    })
+                
+                for franja, datos in franjas.items():
+                    clase = {
+                        'dia': dia,
+                        'franja': franja,
+                        'curso': datos['curso'],
+                        'grupo': grupo,
+                        'profesor': datos['profesor'],
+                        'aula': datos['aula']
+                    }
+                    por_profesor.setdefault(datos['profesor'], []).append(clase)
+                    por_aula.setdefault(datos['aula'], []).append(clase)
+                    por_curso.setdefault(datos['curso'], []).append(clase)
+                    por_casilla.setdefault((dia, franja), []).append(clase)
+            
+            por_grupo[grupo] = {'grupo': grupo, 'dias': dias_formateados}
+        
+        self.por_grupo = por_grupo
+        self.por_profesor = por_profesor
+        self.por_aula = por_aula
+        self.por_curso = por_curso
+        self.por_casilla = por_casilla
+        self._horario_indexado = horario_generado
+        logger.info(
+            f"🗂️  Índices de consulta: {len(por_grupo)} grupos, {len(por_profesor)} profesores, "
+            f"{len(por_aula)} aulas, {len(por_casilla)} franjas"
+        )
+    
+    @staticmethod
+    def _por_dia(clases: List[Dict]) -> Dict[str, List[Dict]]:
+        """Agrupa una lista de clases por día"""
+        horario_por_dia = {}
+        for clase in clases:
+            horario_por_dia.setdefault(clase['dia'], []).append(clase)
+        return horario_por_dia
         
     def obtener_horario_grupo(self, grupo: str) -> Dict[str, Any]:
         """
@@ -25,30 +119,12 @@ class QueryService:
             Diccionario con horario del grupo
         """
         try:
-            horario_generado = self.datos.get('horario_generado', {})
+            self._indices()
             
-            if grupo not in horario_generado:
+            if grupo not in self.por_grupo:
                 return {'error': f'Grupo {grupo} no encontrado'}
             
-            horario_grupo = horario_generado[grupo]
-            
-            # Formatear para visualización
-            horario_formateado = {
-                'grupo': grupo,
-                'dias': {}
-            }
-            
-            for dia, franjas in horario_grupo.items():
-                horario_formateado['dias'][dia] = []
-                for franja, datos in sorted(franjas.items()):
-                    horario_formateado['dias'][dia].append({
-                        'franja': franja,
-                        'curso': datos['curso'],
-                        'profesor': datos['profesor'],
-                        'aula': datos['aula']
-                    })
-            
-            return horario_formateado
+            return self.por_grupo[grupo]
             
         except Exception as e:
             logger.error(f"Error obteniendo horario de grupo: {str(e)}", exc_info=True)
@@ -65,43 +141,18 @@ class QueryService:
             Diccionario con horario del profesor
         """
         try:
-            horario_generado = self.datos.get('horario_generado', {})
-            
-            # Buscar todas las clases del profesor
-            clases_profesor = []
-            
-            for grupo, horario_grupo in horario_generado.items():
-                for dia, franjas in horario_grupo.items():
-                    for franja, datos in franjas.items():
-                        if datos['profesor'] == nombre_profesor:
-                            clases_profesor.append({
-                                'dia': dia,
-                                'franja': franja,
-                                'curso': datos['curso'],
-                                'grupo': grupo,
-                                'aula': datos['aula']
-                            })
-            
-            # Organizar por día
-            horario_por_dia = {}
-            for clase in clases_profesor:
-                dia = clase['dia']
-                if dia not in horario_por_dia:
-                    horario_por_dia[dia] = []
-                horario_por_dia[dia].append(clase)
+            self._indices()
             
-            # Obtener información del profesor
-            profesor_info = None
-            for prof in self.datos.get('profesores', []):
-                if prof['nombre'] == nombre_profesor:
-                    profesor_info = prof
-                    break
+            clases_profesor = [
+                {k: v for k, v in clase.items() if k != 'profesor'}
+                for clase in self.por_profesor.get(nombre_profesor, [])
+            ]
             
             return {
                 'profesor': nombre_profesor,
-                'info': profesor_info,
+                'info': self.info_profesor.get(nombre_profesor),
                 'clases': clases_profesor,
-                'horario_por_dia': horario_por_dia,
+                'horario_por_dia': self._por_dia(clases_profesor),
                 'total_clases': len(clases_profesor)
             }
             
@@ -109,6 +160,76 @@ class QueryService:
             logger.error(f"Error obteniendo horario de profesor: {str(e)}", exc_info=True)
             return {'error': str(e)}
     
+    def obtener_horario_aula(self, aula: str) -> Dict[str, Any]:
+        """
+        Obtiene las clases asignadas a un aula
+        
+        Args:
+            aula: Nombre del aula (ej: Aula-1)
+            
+        Returns:
+            Diccionario con las clases del aula organizadas por día
+        """
+        try:
+            self._indices()
+            clases = self.por_aula.get(aula, [])
+            return {
+                'aula': aula,
+                'clases': clases,
+                'horario_por_dia': self._por_dia(clases),
+                'total_clases': len(clases)
+            }
+        except Exception as e:
+            logger.error(f"Error obteniendo horario de aula: {str(e)}", exc_info=True)
+            return {'error': str(e)}
+    
+    def obtener_horario_curso(self, nombre_curso: str) -> Dict[str, Any]:
+        """
+        Obtiene las sesiones de un curso en todos sus grupos
+        
+        Args:
+            nombre_curso: Nombre de la materia
+            
+        Returns:
+            Diccionario con las sesiones del curso
+        """
+        try:
+            self._indices()
+            clases = self.por_curso.get(nombre_curso, [])
+            return {
+                'curso': nombre_curso,
+                'clases': clases,
+                'grupos': sorted({clase['grupo'] for clase in clases}),
+                'total_clases': len(clases)
+            }
+        except Exception as e:
+            logger.error(f"Error obteniendo horario de curso: {str(e)}", exc_info=True)
+            return {'error': str(e)}
+    
+    def obtener_clases_franja(self, dia: str, franja: str) -> Dict[str, Any]:
+        """
+        Obtiene todas las clases que se imparten en un día y franja
+        
+        Args:
+            dia: Día de la semana (ej: Lunes)
+            franja: Franja horaria (ej: 7:00-8:30)
+            
+        Returns:
+            Diccionario con las clases simultáneas
+        """
+        try:
+            self._indices()
+            clases = self.por_casilla.get((dia, franja), [])
+            return {
+                'dia': dia,
+                'franja': franja,
+                'clases': clases,
+                'total_clases': len(clases)
+            }
+        except Exception as e:
+            logger.error(f"Error obteniendo clases de franja: {str(e)}", exc_info=True)
+            return {'error': str(e)}
+    
     def obtener_estadisticas(self) -> Dict[str, Any]:
         """Obtiene estadísticas generales del sistema"""
         try:
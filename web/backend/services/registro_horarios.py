@@ -0,0 +1,197 @@
+"""
+Registro de horarios por programa y periodo
+Mantiene varios conjuntos de datos (cada uno con su publicador de
+instantáneas) a la vez, p. ej. todas las carreras y ambos cuatrimestres,
+y desaloja de memoria los menos usados cuando se excede un presupuesto.
+"""
+
+import re
+import sys
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+from .horario_compacto import VistaHorario
+from .instantanea import Instantanea, PublicadorInstantaneas
+
+logger = logging.getLogger(__name__)
+
+# Programa y periodo se usan en nombres de archivo: solo letras, dígitos,
+# punto y guion (el guion bajo separa ambos en las rutas)
+PATRON_CLAVE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9.-]{0,39}$')
+
+Clave = Tuple[str, str]
+
+
+def tamano_aproximado(instantanea: Instantanea) -> int:
+    """
+    Bytes aproximados que ocupa una instantánea en memoria
+
+    Recorre dicts, listas y tuplas contando cada objeto una sola vez; el
+    horario compacto cuenta sus arreglos y catálogos, y las consultas sus
+    índices (sin volver a contar los datos que indexan).
+    """
+    vistos = set()
+
+    def medir(objeto: Any) -> int:
+        if id(objeto) in vistos:
+            return 0
+        vistos.add(id(objeto))
+        total = sys.getsizeof(objeto)
+        if isinstance(objeto, dict):
+            total += sum(medir(k) + medir(v) for k, v in objeto.items())
+        elif isinstance(objeto, (list, tuple, set)):
+            total += sum(medir(v) for v in objeto)
+        return total
+
+    total = 0
+    for clave, valor in instantanea.items():
+        if isinstance(valor, VistaHorario):
+            compacto = valor.compacto
+            total += compacto.nbytes + sum(
+                medir(catalogo.valores) + medir(catalogo._ids)
+                for catalogo in (compacto.grupos, compacto.cursos, compacto.profesores, compacto.aulas)
+            )
+        else:
+            total += medir(valor)
+    total += medir({k: v for k, v in vars(instantanea.consultas).items() if k != 'datos'})
+    return total
+
+
+class RegistroHorarios:
+    """
+    Publicadores de instantáneas por (programa, periodo), con desalojo LRU
+
+    ``crear(programa, periodo)`` construye el publicador de una clave la
+    primera vez que se pide (o después de desalojarla) y es quien decide
+    de dónde restaurar su estado. El desalojo solo quita la referencia en
+    memoria, así que solo se activa con ``persistente=True``: cuando cada
+    estado publicado ya quedó en disco (ver ``AlmacenSQLite``) y ``crear``
+    lo recupera de ahí.
+
+    Nunca se desaloja la clave recién pedida ni una con ``ocupado`` True
+    (p. ej. con una generación en curso, que publicará sobre ese mismo
+    publicador al terminar).
+    """
+
+    def __init__(self, crear: Callable[[str, str], PublicadorInstantaneas],
+                 clave_por_defecto: Clave,
+                 memoria_max: Optional[int] = None,
+                 persistente: bool = False,
+                 ocupado: Optional[Callable[[PublicadorInstantaneas], bool]] = None,
+                 existe: Optional[Callable[[str, str], bool]] = None):
+        """
+        Args:
+            crear: Fábrica del publicador de una clave
+            clave_por_defecto: (programa, periodo) cuando no se indica otro
+            memoria_max: Presupuesto en bytes para todas las claves (None: sin límite)
+            persistente: Si los estados se pueden recuperar tras desalojarlos
+            ocupado: Indica si un publicador no debe desalojarse todavía
+            existe: Indica si una clave tiene estado guardado en disco
+        """
+        self.crear = crear
+        self.clave_por_defecto = clave_por_defecto
+        self.memoria_max = memoria_max
+        self.persistente = persistente
+        self.ocupado = ocupado or (lambda publicador: False)
+        self.existe = existe or (lambda programa, periodo: False)
+        self._publicadores: 'OrderedDict[Clave, PublicadorInstantaneas]' = OrderedDict()
+        # Tamaño medido de cada clave y la instantánea a la que corresponde
+        self._tamanos: Dict[Clave, Tuple[Instantanea, int]] = {}
+        self._lock = threading.RLock()
+        self.desalojos = 0
+        self._avisado = False
+
+    def clave(self, programa: Optional[str] = None, periodo: Optional[str] = None) -> Clave:
+        """
+        Normaliza un selector; lo omitido toma el valor por defecto
+
+        Raises:
+            ValueError: Si programa o periodo no tienen un formato válido
+        """
+        clave = (programa or self.clave_por_defecto[0], periodo or self.clave_por_defecto[1])
+        for valor in clave:
+            if not PATRON_CLAVE.match(valor):
+                raise ValueError(f"Programa o periodo inválido: {valor!r} "
+                                 f"(letras, dígitos, '.' y '-', hasta 40 caracteres)")
+        return clave
+
+    def obtener(self, programa: Optional[str] = None, periodo: Optional[str] = None,
+                crear: bool = True) -> PublicadorInstantaneas:
+        """
+        Publicador de (programa, periodo), cargándolo si no está en memoria
+
+        Args:
+            crear: Si es False, una clave sin estado en memoria ni en disco
+                (salvo la de por defecto) no se crea
+
+        Raises:
+            ValueError: Si programa o periodo no tienen un formato válido
+            KeyError: Si la clave no existe y ``crear`` es False
+        """
+        clave = self.clave(programa, periodo)
+        with self._lock:
+            publicador = self._publicadores.get(clave)
+            if publicador is None:
+                if not crear and clave != self.clave_por_defecto and not self.existe(*clave):
+                    raise KeyError(f"No hay datos cargados para {clave[0]} {clave[1]}")
+                logger.info(f"📚 Cargando horarios de {clave[0]} {clave[1]}")
+                publicador = self.crear(*clave)
+                self._publicadores[clave] = publicador
+            self._publicadores.move_to_end(clave)
+            self._desalojar(clave)
+        return publicador
+
+    def _tamano(self, clave: Clave) -> int:
+        actual = self._publicadores[clave].actual
+        medido = self._tamanos.get(clave)
+        if medido is None or medido[0] is not actual:
+            medido = self._tamanos[clave] = (actual, tamano_aproximado(actual))
+        return medido[1]
+
+    def memoria(self) -> int:
+        """Bytes aproximados de todas las claves en memoria"""
+        with self._lock:
+            return sum(self._tamano(clave) for clave in self._publicadores)
+
+    def _desalojar(self, conservar: Clave):
+        """Quita las claves menos usadas hasta entrar en el presupuesto"""
+        if self.memoria_max is None:
+            return
+        total = sum(self._tamano(clave) for clave in self._publicadores)
+        if total <= self.memoria_max:
+            return
+        if not self.persistente:
+            if not self._avisado:
+                self._avisado = True
+                logger.warning(f"⚠️  Horarios en memoria ({total} bytes) exceden el presupuesto "
+                               f"({self.memoria_max}) pero no hay persistencia para desalojarlos")
+            return
+
+        # Del menos al más recientemente usado
+        for clave in list(self._publicadores):
+            if total <= self.memoria_max:
+                break
+            if clave == conservar or self.ocupado(self._publicadores[clave]):
+                continue
+            total -= self._tamano(clave)
+            del self._publicadores[clave]
+            del self._tamanos[clave]
+            self.desalojos += 1
+            logger.info(f"📦 Horarios de {clave[0]} {clave[1]} desalojados de memoria")
+
+    def resumen(self) -> List[Dict[str, Any]]:
+        """Claves en memoria, de la menos a la más recientemente usada"""
+        with self._lock:
+            resumen = []
+            for clave, publicador in self._publicadores.items():
+                actual = publicador.actual
+                resumen.append({
+                    'programa': clave[0],
+                    'periodo': clave[1],
+                    'datos_cargados': actual['raw_data'] is not None,
+                    'horarios_generados': actual['horario_generado'] is not None,
+                    'bytes': self._tamano(clave)
+                })
+            return resumen
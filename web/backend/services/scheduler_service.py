@@ -4,9 +4,11 @@ Implementa algoritmo de backtracking para resolver conflictos
 """
 
 import random
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Optional
 import logging
 
+from .grafo_conflictos import construir_grafo
+
 logger = logging.getLogger(__name__)
 
 class SchedulerService:
@@ -20,18 +22,24 @@ class SchedulerService:
             '19:00-20:30'
         ]
         
-    def generar_horarios(self, datos: Dict[str, Any]) -> Dict[str, Any]:
+    def generar_horarios(self, datos: Dict[str, Any], semilla: Optional[int] = None) -> Dict[str, Any]:
         """
         Genera horarios usando backtracking
         
         Args:
             datos: Datos de cursos, profesores, grupos y aulas
+            semilla: Semilla del generador aleatorio; con la misma semilla y
+                los mismos datos el resultado es idéntico
             
         Returns:
             Diccionario con horario generado, grafo y validación
         """
         logger.info("Iniciando generación de horarios...")
         
+        if semilla is None:
+            semilla = random.randrange(2 ** 31)
+        self.rng = random.Random(semilla)
+        
         try:
             cursos = datos['cursos']
             aulas = datos['aulas']
@@ -71,7 +79,8 @@ class SchedulerService:
                 'cursos_asignados': len([c for c in cursos if c['horarios']]),
                 'total_cursos': len(cursos),
                 'conflictos_detectados': len(conflictos),
-                'grupos': len(horario)
+                'grupos': len(horario),
+                'semilla': semilla
             }
             
             logger.info(f"Horarios generados: {estadisticas}")
@@ -103,13 +112,13 @@ class SchedulerService:
             intentos += 1
             
             # Seleccionar día y franja aleatoria
-            dia = random.choice(self.dias)
-            franja = random.choice(self.franjas)
+            dia = self.rng.choice(self.dias)
+            franja = self.rng.choice(self.franjas)
             
             # Verificar disponibilidad
             if franja not in horario[grupo][dia]:
                 # Asignar aula
-                aula = random.choice(aulas)
+                aula = self.rng.choice(aulas)
                 
                 horario[grupo][dia][franja] = {
                     'curso': curso['nombre'],
@@ -138,51 +147,7 @@ class SchedulerService:
     
     def _construir_grafo(self, cursos: List[Dict], conflictos: List[Dict]) -> Dict:
         """Construye grafo de conflictos para visualización"""
-        
-        nodos = []
-        enlaces = []
-        
-        # Crear nodos (cursos)
-        for curso in cursos:
-            nodos.append({
-                'id': curso['id'],
-                'nombre': curso['nombre'],
-                'grupo': curso['grupo'],
-                'profesor': curso['profesor'],
-                'horas': curso['horas_semana']
-            })
-        
-        # Crear enlaces (conflictos)
-        for i, curso1 in enumerate(cursos):
-            for j, curso2 in enumerate(cursos[i+1:], start=i+1):
-                # Detectar conflictos entre cursos
-                if self._tienen_conflicto(curso1, curso2):
-                    enlaces.append({
-                        'source': curso1['id'],
-                        'target': curso2['id'],
-                        'tipo': 'profesor' if curso1['profesor'] == curso2['profesor'] else 'horario'
-                    })
-        
-        return {
-            'nodos': nodos,
-            'enlaces': enlaces
-        }
-    
-    def _tienen_conflicto(self, curso1: Dict, curso2: Dict) -> bool:
-        """Verifica si dos cursos tienen conflicto"""
-        
-        # Mismo profesor
-        if curso1['profesor'] == curso2['profesor']:
-            return True
-        
-        # Mismo grupo y horarios solapados
-        if curso1['grupo'] == curso2['grupo']:
-            for h1 in curso1.get('horarios', []):
-                for h2 in curso2.get('horarios', []):
-                    if h1['dia'] == h2['dia'] and h1['franja'] == h2['franja']:
-                        return True
-        
-        return False
+        return construir_grafo(cursos, sin_profesor_conflicta=True)
     
     def _generar_validacion(self, cursos: List[Dict], horario: Dict, 
                            conflictos: List[Dict]) -> Dict:
@@ -3,16 +3,45 @@ Servicio de generación de horarios con BACKTRACKING REAL
 """
 
 import random
-from typing import Dict, List, Any, Tuple, Optional
+from typing import Dict, List, Any, Tuple, Optional, Callable
 import logging
 from copy import deepcopy
 
+from .ocupacion import IndiceOcupacion
+from .solver_csp import SolverCSP, sesiones_por_curso
+from .portafolio import resolver_portafolio
+from .grafo_conflictos import construir_grafo, contar_enlaces
+from .horario_compacto import HorarioCompacto, VistaHorario
+from .aulas import IndiceAulas
+from .disponibilidad import mascaras_disponibilidad
+from .optimizador import OptimizadorLocal, desglose_costos
+from .solvers import MODOS, crear_solver, solvers_disponibles
+
 logger = logging.getLogger(__name__)
 
 class SchedulerServiceNew:
     """Servicio para generar horarios usando BACKTRACKING"""
     
-    def __init__(self):
+    def __init__(self, max_nodos: int = 200000, ejecuciones: int = 1,
+                 limite_segundos: Optional[float] = None, optimizar: bool = True,
+                 movimientos_optimizacion: Optional[int] = None, solver: str = 'csp'):
+        """
+        Args:
+            max_nodos: Nodos máximos de la búsqueda
+            ejecuciones: Búsquedas en paralelo por defecto
+            limite_segundos: Tiempo máximo de búsqueda por defecto
+            optimizar: Mejorar las restricciones blandas con recocido simulado
+                tras la búsqueda
+            movimientos_optimizacion: Movimientos del recocido (por defecto
+                los de ``OptimizadorLocal``)
+            solver: Motor por defecto ('csp', 'cpsat' o 'auto'; ver ``services.solvers``)
+        """
+        self.max_nodos = max_nodos
+        self.ejecuciones = ejecuciones
+        self.limite_segundos = limite_segundos
+        self.optimizar = optimizar
+        self.movimientos_optimizacion = movimientos_optimizacion
+        self.solver = solver
         self.dias = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes']
         self.franjas = [
             '7:00-8:30', '8:30-10:00', '10:00-11:30', '11:30-13:00',
@@ -20,48 +49,127 @@ class SchedulerServiceNew:
             '19:00-20:30'
         ]
         
-    def generar_horarios(self, datos: Dict[str, Any]) -> Dict[str, Any]:
+    def generar_horarios(self, datos: Dict[str, Any], ejecuciones: Optional[int] = None,
+                         limite_segundos: Optional[float] = None,
+                         progreso: Optional[Callable[[Dict[str, Any]], None]] = None,
+                         detener: Optional[Callable[[], bool]] = None,
+                         semilla: Optional[int] = None,
+                         solver: Optional[str] = None) -> Dict[str, Any]:
         """
         Genera horarios usando BACKTRACKING REAL
+        
+        Args:
+            datos: Cursos, grupos y aulas a programar
+            ejecuciones: Búsquedas en paralelo (modo portafolio); por defecto
+                la configurada en el servicio
+            limite_segundos: Tiempo máximo de búsqueda
+            progreso: Callback que recibe el avance de la búsqueda
+            detener: Callback que devuelve True para cancelar la búsqueda
+            semilla: Semilla de la búsqueda (se elige una al azar si no se
+                da); se devuelve en las estadísticas para poder repetirla
+            solver: 'csp' (backtracking), 'cpsat' (backtracking y luego el
+                modelo exacto arrancando de su horario) o 'auto' (el modelo
+                exacto solo si el backtracking no completa el horario)
         """
+        ejecuciones = ejecuciones or self.ejecuciones
+        modo = solver or self.solver
+        if modo not in MODOS:
+            raise ValueError(f"Motor desconocido: {modo} (opciones: {', '.join(MODOS)})")
+        if modo == 'cpsat' and modo not in solvers_disponibles():
+            raise ValueError("El motor cpsat requiere OR-Tools (pip install ortools)")
+        if semilla is None:
+            semilla = random.randrange(2 ** 31)
+        limite_segundos = limite_segundos or self.limite_segundos
         logger.info("🔄 Iniciando generación de horarios con BACKTRACKING")
         
         try:
             cursos = datos['cursos']
             aulas = datos['aulas']
+            aulas_info = datos.get('aulas_info')
+            disponibilidad = mascaras_disponibilidad(datos.get('disponibilidad'), self.dias, self.franjas)
             grupos = datos['grupos']
             
-            # Inicializar estructuras
-            horario = {grupo: {dia: {} for dia in self.dias} for grupo in grupos}
-            asignaciones_profesor = {}  # {profesor: [(dia, franja), ...]}
-            asignaciones_aula = {}  # {aula: [(dia, franja), ...]}
+            # BACKTRACKING (CSP con MRV y forward checking)
+            if ejecuciones > 1:
+                solucion = resolver_portafolio(
+                    cursos, aulas, self.dias, self.franjas, ejecuciones,
+                    self.max_nodos, limite_segundos,
+                    semilla_base=semilla, detener=detener, progreso=progreso,
+                    aulas_info=aulas_info, disponibilidad=disponibilidad
+                )
+            else:
+                solver = SolverCSP(self.dias, self.franjas, max_nodos=self.max_nodos,
+                                   rng=random.Random(semilla),
+                                   limite_segundos=limite_segundos,
+                                   detener=detener, progreso=progreso)
+                solucion = solver.resolver(cursos, aulas, aulas_info=aulas_info,
+                                           disponibilidad=disponibilidad)
+            
+            # Modelo exacto, arrancando del horario del backtracking
+            exacto = None
+            if modo == 'cpsat' or (modo == 'auto' and not solucion['completo']
+                                   and not (detener and detener())):
+                if 'cpsat' in solvers_disponibles():
+                    motor = crear_solver('cpsat', self.dias, self.franjas, rng=random.Random(semilla),
+                                         limite_segundos=limite_segundos, detener=detener,
+                                         progreso=progreso)
+                    exacto = motor.resolver(cursos, aulas, aulas_info=aulas_info,
+                                            disponibilidad=disponibilidad,
+                                            pista=solucion['asignaciones'])
+                    if exacto['completo']:
+                        solucion['asignaciones'] = exacto['asignaciones']
+                        solucion['completo'] = True
+                else:
+                    logger.warning("⚠️  OR-Tools no está instalado: no se puede verificar si existe un horario completo")
             
-            # Ordenar cursos por horas (más horas primero - heurística)
-            cursos_ordenados = sorted(cursos, key=lambda x: x['horas_semana'], reverse=True)
+            # Búsqueda local sobre las restricciones blandas
+            optimizacion = None
+            if self.optimizar and solucion['asignaciones'] and not (detener and detener()):
+                optimizador = OptimizadorLocal(self.dias, self.franjas, rng=random.Random(semilla),
+                                               max_movimientos=self.movimientos_optimizacion)
+                optimizacion = optimizador.optimizar(cursos, solucion['asignaciones'], aulas,
+                                                     aulas_info, disponibilidad)
+                solucion['asignaciones'] = optimizacion['asignaciones']
             
-            # BACKTRACKING
-            exito = self._backtrack(
-                cursos_ordenados, 0, horario, asignaciones_profesor, 
-                asignaciones_aula, aulas
-            )
+            horario = self._aplicar_asignaciones(cursos, solucion['asignaciones'], grupos)
             
-            if not exito:
+            if not solucion['completo']:
                 logger.warning("⚠️  No se pudo asignar todos los cursos con backtracking")
             
             # Construir grafo de conflictos
             grafo = self._construir_grafo(cursos, horario)
             
             # Generar validación
-            validacion = self._generar_validacion(cursos, horario)
+            validacion = self._generar_validacion(cursos, horario, disponibilidad)
             
             # Estadísticas
             cursos_asignados = sum(1 for c in cursos if c.get('horarios'))
             estadisticas = {
                 'cursos_asignados': cursos_asignados,
                 'total_cursos': len(cursos),
-                'conflictos_detectados': len(grafo['enlaces']),
-                'grupos': len(horario)
+                'sesiones_asignadas': len(solucion['asignaciones']),
+                'total_sesiones': solucion['total_sesiones'],
+                'nodos_explorados': solucion['nodos_explorados'],
+                'retrocesos': solucion['retrocesos'],
+                'ejecuciones': ejecuciones,
+                'conflictos_detectados': contar_enlaces(grafo),
+                'grupos': len(horario),
+                'semilla': semilla,
+                'solver': modo
             }
+            if exacto is not None:
+                # 'infactible': demostrado que no existe horario completo
+                estadisticas['estado_exacto'] = exacto['estado']
+                estadisticas['costo_exacto'] = exacto['costo']
+                estadisticas['cota_exacta'] = exacto['cota']
+                estadisticas['gap'] = exacto['gap']
+            if optimizacion is not None:
+                estadisticas['costo_blando_inicial'] = optimizacion['costo_inicial']
+                estadisticas['costo_blando_final'] = optimizacion['costo_final']
+                estadisticas['movimientos_locales'] = optimizacion['movimientos']
+            if 'semilla' in solucion and solucion['semilla'] != semilla:
+                # Portafolio: la ejecución ganadora usó semilla + i
+                estadisticas['semilla_ganadora'] = solucion['semilla']
             
             logger.info(f"✅ Horarios generados: {estadisticas}")
             
@@ -76,196 +184,348 @@ class SchedulerServiceNew:
             logger.error(f"❌ Error generando horarios: {str(e)}", exc_info=True)
             raise
     
-    def _backtrack(self, cursos: List[Dict], indice: int, horario: Dict,
-                   asig_prof: Dict, asig_aula: Dict, aulas: List[str]) -> bool:
+    def generar_incremental(self, datos: Dict[str, Any], cambios: Dict[str, Any],
+                            semilla: Optional[int] = None) -> Dict[str, Any]:
         """
-        Algoritmo de BACKTRACKING para asignar horarios
+        Reprograma solo lo afectado por un cambio en los datos
         
-        Returns:
-            True si se logró asignar todos los cursos, False si no
-        """
-        # Caso base: todos los cursos asignados
-        if indice >= len(cursos):
-            return True
-        
-        curso = cursos[indice]
-        grupo = curso['grupo']
-        profesor = curso['profesor']
-        horas_necesarias = curso['horas_semana']
+        Parte del horario ya generado (los 'horarios' de cada curso) y deja
+        fijas todas las sesiones que no toca el cambio. Primero intenta
+        colocar solo las sesiones afectadas; si no caben, libera también los
+        cursos que comparten grupo o profesor con ellas y vuelve a intentar.
         
-        # Calcular número de franjas necesarias (cada franja = 1.5 horas)
-        num_franjas = max(1, int(horas_necesarias / 1.5))
+        Args:
+            datos: Datos con los cursos del horario previo; se actualizan en sitio
+            cambios: Diccionario con cualquiera de
+                'agregar_cursos': [curso, ...]
+                'eliminar_cursos': [id, ...]
+                'cambiar_profesor': {id: profesor}
+                'retirar_aulas': [aula, ...]
+                'agregar_aulas': [aula, ...]
+            semilla: Semilla de la búsqueda, como en generar_horarios
         
-        # Intentar asignar las franjas necesarias
-        return self._asignar_curso(
-            curso, num_franjas, horario, asig_prof, asig_aula, 
-            aulas, cursos, indice
-        )
-    
-    def _asignar_curso(self, curso: Dict, num_franjas: int, horario: Dict,
-                       asig_prof: Dict, asig_aula: Dict, aulas: List[str],
-                       cursos: List[Dict], indice: int) -> bool:
-        """
-        Intenta asignar un curso a franjas horarias válidas
+        Returns:
+            Mismo formato que generar_horarios
         """
-        grupo = curso['grupo']
-        profesor = curso['profesor']
-        franjas_asignadas = []
+        logger.info(f"🔄 Reprogramación incremental: { {k: len(v) for k, v in cambios.items()} }")
         
-        # Intentar asignar las franjas necesarias
-        intentos = 0
-        max_intentos = 100
+        if semilla is None:
+            semilla = random.randrange(2 ** 31)
+        rng = random.Random(semilla)
         
-        while len(franjas_asignadas) < num_franjas and intentos < max_intentos:
-            intentos += 1
+        try:
+            eliminar = set(cambios.get('eliminar_cursos', []))
+            retiradas = set(cambios.get('retirar_aulas', []))
+            cursos = [c for c in datos['cursos'] if c['id'] not in eliminar]
+            aulas = [a for a in datos['aulas'] if a not in retiradas]
+            aulas += [a for a in cambios.get('agregar_aulas', []) if a not in aulas]
+            aulas_info = datos.get('aulas_info')
+            disponibilidad = mascaras_disponibilidad(datos.get('disponibilidad'), self.dias, self.franjas)
+            por_id = {c['id']: c for c in cursos}
+            afectados = set()
+            
+            for curso_id, profesor in cambios.get('cambiar_profesor', {}).items():
+                if curso_id in por_id:
+                    por_id[curso_id]['profesor'] = profesor
+                    afectados.add(curso_id)
+            
+            siguiente = len(datos['cursos']) + 1
+            for curso in cambios.get('agregar_cursos', []):
+                curso = dict(curso, horarios=[])
+                while not curso.get('id') or curso['id'] in por_id:
+                    curso['id'] = f"CURSO_{siguiente}"
+                    siguiente += 1
+                por_id[curso['id']] = curso
+                cursos.append(curso)
+                afectados.add(curso['id'])
             
-            # Elegir día y franja aleatoria
-            dia = random.choice(self.dias)
-            franja = random.choice(self.franjas)
+            grupos = list(datos['grupos'])
+            for curso in cursos:
+                if curso['grupo'] not in grupos:
+                    grupos.append(curso['grupo'])
             
-            # Verificar si es válido
-            if self._es_asignacion_valida(dia, franja, grupo, profesor, horario, asig_prof, asig_aula):
-                # Elegir aula disponible
-                aula = self._elegir_aula_disponible(dia, franja, aulas, asig_aula)
+            datos['cursos'] = cursos
+            datos['aulas'] = aulas
+            datos['grupos'] = grupos
+            
+            # Intento con solo lo afectado y, si no basta, con su vecindad
+            liberados = set(afectados)
+            for intento in range(2):
+                ocupacion = IndiceOcupacion(self.dias, self.franjas, IndiceAulas(aulas, aulas_info).codigos)
+                # Restringir antes de fijar: una sesión en una casilla en la que su
+                # profesor ya no está disponible se libera y se vuelve a colocar
+                for profesor, mascara in disponibilidad.items():
+                    ocupacion.restringir_profesor(profesor, mascara)
+                fijas, pendientes = self._fijar_sesiones(cursos, liberados, retiradas, ocupacion)
                 
-                if aula:
-                    # ASIGNAR
-                    horario[grupo][dia][franja] = {
-                        'curso': curso['nombre'],
-                        'profesor': profesor,
-                        'aula': aula
-                    }
-                    
-                    # Registrar asignaciones
-                    if profesor:
-                        if profesor not in asig_prof:
-                            asig_prof[profesor] = []
-                        asig_prof[profesor].append((dia, franja))
-                    
-                    if aula not in asig_aula:
-                        asig_aula[aula] = []
-                    asig_aula[aula].append((dia, franja))
-                    
-                    franjas_asignadas.append({
-                        'dia': dia,
-                        'franja': franja,
-                        'aula': aula
-                    })
-        
-        # Guardar horarios en el curso
-        curso['horarios'] = franjas_asignadas
-        
-        # Continuar con el siguiente curso
-        return self._backtrack(cursos, indice + 1, horario, asig_prof, asig_aula, aulas)
+                indices = [i for i, n in enumerate(pendientes) if n]
+                solver = SolverCSP(self.dias, self.franjas, max_nodos=self.max_nodos,
+                                   rng=rng, limite_segundos=self.limite_segundos)
+                solucion = solver.resolver(
+                    [cursos[i] for i in indices], aulas, ocupacion,
+                    sesiones=[pendientes[i] for i in indices],
+                    aulas_info=aulas_info, disponibilidad=disponibilidad
+                )
+                if solucion['completo'] or intento == 1:
+                    break
+                
+                # Vecindad: cursos que comparten grupo o profesor con lo pendiente
+                grupos_pend = {cursos[i]['grupo'] for i in indices}
+                profes_pend = {cursos[i]['profesor'] for i in indices if cursos[i]['profesor']}
+                liberados |= {c['id'] for c in cursos if c['grupo'] in grupos_pend or c['profesor'] in profes_pend}
+            
+            asignaciones = fijas + [(indices[i], casilla, aula) for i, casilla, aula in solucion['asignaciones']]
+            horario = self._aplicar_asignaciones(cursos, asignaciones, grupos)
+            
+            grafo = self._construir_grafo(cursos, horario)
+            validacion = self._generar_validacion(cursos, horario, disponibilidad)
+            
+            estadisticas = {
+                'cursos_asignados': sum(1 for c in cursos if c.get('horarios')),
+                'total_cursos': len(cursos),
+                'sesiones_asignadas': len(asignaciones),
+                'total_sesiones': len(fijas) + solucion['total_sesiones'],
+                'sesiones_conservadas': len(fijas),
+                'sesiones_reubicadas': len(solucion['asignaciones']),
+                'nodos_explorados': solucion['nodos_explorados'],
+                'retrocesos': solucion['retrocesos'],
+                'incremental': True,
+                'conflictos_detectados': contar_enlaces(grafo),
+                'grupos': len(horario),
+                'semilla': semilla
+            }
+            
+            logger.info(f"✅ Horarios reprogramados: {estadisticas}")
+            
+            return {
+                'horario': horario,
+                'grafo': grafo,
+                'validacion': validacion,
+                'estadisticas': estadisticas
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Error en reprogramación incremental: {str(e)}", exc_info=True)
+            raise
     
-    def _es_asignacion_valida(self, dia: str, franja: str, grupo: str, 
-                             profesor: Optional[str], horario: Dict,
-                             asig_prof: Dict, asig_aula: Dict) -> bool:
-        """Verifica si una asignación es válida"""
+    def _fijar_sesiones(self, cursos: List[Dict], liberados: set, retiradas: set,
+                        ocupacion: IndiceOcupacion) -> Tuple[List[tuple], List[int]]:
+        """
+        Ocupa en el índice las sesiones previas que se conservan
         
-        # 1. El grupo no debe tener clase en esa franja
-        if franja in horario[grupo][dia]:
-            return False
+        Las que chocan con lo ya ocupado o con la disponibilidad del profesor
+        (si ``ocupacion`` ya está restringida) quedan pendientes.
         
-        # 2. El profesor no debe tener clase en esa franja
-        if profesor and profesor in asig_prof:
-            if (dia, franja) in asig_prof[profesor]:
-                return False
+        Returns:
+            Asignaciones fijas (indice_curso, casilla, aula) y, por curso, el
+            número de sesiones que quedan por colocar
+        """
+        fijas = []
+        pendientes = []
+        
+        for i, curso in enumerate(cursos):
+            conservadas = 0
+            if curso['id'] not in liberados:
+                for h in curso.get('horarios', []):
+                    if h['aula'] in retiradas or h['dia'] not in self.dias or h['franja'] not in self.franjas:
+                        continue
+                    casilla = ocupacion.casilla(h['dia'], h['franja'])
+                    if not ocupacion.esta_libre(casilla, curso['grupo'], curso['profesor']) or \
+                            not ocupacion.aula_libre(casilla, h['aula']):
+                        continue
+                    ocupacion.ocupar(casilla, curso['grupo'], curso['profesor'], h['aula'])
+                    fijas.append((i, casilla, h['aula']))
+                    conservadas += 1
+            pendientes.append(max(0, sesiones_por_curso(curso) - conservadas))
         
-        return True
+        return fijas, pendientes
     
-    def _elegir_aula_disponible(self, dia: str, franja: str, aulas: List[str],
-                                asig_aula: Dict) -> Optional[str]:
-        """Elige un aula disponible para la franja"""
-        disponibles = []
+    @staticmethod
+    def calcular_cambios(previos: Dict[str, Any], nuevos: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Diferencia entre dos cargas de datos, en el formato de generar_incremental
+        
+        Los cursos se identifican por (nombre, grupo). Un curso cuyas horas
+        cambian se trata como eliminado y vuelto a agregar.
+        """
+        clave = lambda c: (c['nombre'], c['grupo'])
+        anteriores = {clave(c): c for c in previos.get('cursos', [])}
+        actuales = {clave(c): c for c in nuevos.get('cursos', [])}
         
-        for aula in aulas:
-            if aula not in asig_aula or (dia, franja) not in asig_aula[aula]:
-                disponibles.append(aula)
+        cambios = {
+            'agregar_cursos': [],
+            'eliminar_cursos': [],
+            'cambiar_profesor': {},
+            'retirar_aulas': [a for a in previos.get('aulas', []) if a not in nuevos.get('aulas', [])],
+            'agregar_aulas': [a for a in nuevos.get('aulas', []) if a not in previos.get('aulas', [])]
+        }
+        
+        for k, curso in anteriores.items():
+            nuevo = actuales.get(k)
+            if nuevo is None or nuevo['horas_semana'] != curso['horas_semana']:
+                cambios['eliminar_cursos'].append(curso['id'])
+            elif nuevo['profesor'] != curso['profesor']:
+                cambios['cambiar_profesor'][curso['id']] = nuevo['profesor']
         
-        return random.choice(disponibles) if disponibles else None
+        for k, curso in actuales.items():
+            previo = anteriores.get(k)
+            if previo is None or previo['horas_semana'] != curso['horas_semana']:
+                cambios['agregar_cursos'].append(curso)
+
+        return cambios
+
+    def reprogramar_carga(self, previos: Dict[str, Any], nuevos: Dict[str, Any],
+                          semilla: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Reprograma una carga nueva de datos a partir del horario de la anterior
+
+        Los cursos que siguen en la carga nueva (mismo nombre, grupo y horas)
+        toman sus datos de ella pero conservan el id y los horarios previos;
+        lo demás se reprograma con generar_incremental según calcular_cambios.
+
+        Args:
+            previos: Datos con el horario vigente (no se modifican)
+            nuevos: Datos recién cargados; se actualizan en sitio
+            semilla: Semilla de la búsqueda, como en generar_horarios
+
+        Returns:
+            Mismo formato que generar_horarios
+        """
+        cambios = self.calcular_cambios(previos, nuevos)
+        clave = lambda c: (c['nombre'], c['grupo'])
+        actuales = {clave(c): c for c in nuevos.get('cursos', [])}
+
+        cursos = []
+        for curso in previos.get('cursos', []):
+            nuevo = actuales.get(clave(curso))
+            if nuevo is not None and nuevo['horas_semana'] == curso['horas_semana']:
+                curso = dict(nuevo, id=curso['id'], profesor=curso['profesor'],
+                             horarios=list(curso.get('horarios') or []))
+            cursos.append(curso)
+
+        # generar_incremental parte de los cursos y aulas del horario previo
+        nuevos['cursos'] = cursos
+        nuevos['aulas'] = list(previos.get('aulas', []))
+        return self.generar_incremental(nuevos, cambios, semilla=semilla)
     
-    def _construir_grafo(self, cursos: List[Dict], horario: Dict) -> Dict:
-        """Construye grafo de conflictos"""
-        nodos = []
-        enlaces = []
+    def _aplicar_asignaciones(self, cursos: List[Dict], asignaciones: List[tuple],
+                              grupos: List[str]) -> VistaHorario:
+        """
+        Vuelca las asignaciones del solver en el horario y en cada curso
         
-        # Crear nodos
+        Returns:
+            Vista grupo → día → franja sobre un HorarioCompacto
+        """
         for curso in cursos:
-            nodos.append({
-                'id': curso['id'],
-                'nombre': curso['nombre'],
-                'grupo': curso['grupo'],
-                'profesor': curso['profesor'] or 'Sin asignar',
-                'horas': curso['horas_semana']
-            })
+            curso['horarios'] = []
         
-        # Crear enlaces (conflictos)
-        for i, curso1 in enumerate(cursos):
-            for j, curso2 in enumerate(cursos[i+1:], start=i+1):
-                if self._tienen_conflicto(curso1, curso2):
-                    enlaces.append({
-                        'source': curso1['id'],
-                        'target': curso2['id'],
-                        'tipo': 'profesor' if curso1['profesor'] == curso2['profesor'] else 'horario'
-                    })
+        num_franjas = len(self.franjas)
+        for indice, casilla, aula in asignaciones:
+            curso = cursos[indice]
+            dia, franja = self.dias[casilla // num_franjas], self.franjas[casilla % num_franjas]
+            curso['horarios'].append({
+                'dia': dia,
+                'franja': franja,
+                'aula': aula
+            })
         
-        return {
-            'nodos': nodos,
-            'enlaces': enlaces
-        }
+        compacto = HorarioCompacto.desde_asignaciones(self.dias, self.franjas, grupos, cursos, asignaciones)
+        return compacto.vista()
     
-    def _tienen_conflicto(self, curso1: Dict, curso2: Dict) -> bool:
-        """Verifica si dos cursos tienen conflicto"""
-        
-        # Mismo profesor
-        if curso1['profesor'] and curso2['profesor']:
-            if curso1['profesor'] == curso2['profesor']:
-                return True
-        
-        # Mismo grupo y horarios solapados
-        if curso1['grupo'] == curso2['grupo']:
-            for h1 in curso1.get('horarios', []):
-                for h2 in curso2.get('horarios', []):
-                    if h1['dia'] == h2['dia'] and h1['franja'] == h2['franja']:
-                        return True
+    def _construir_grafo(self, cursos: List[Dict], horario: Dict) -> Dict:
+        """
+        Construye grafo de conflictos
         
-        return False
+        Los profesores se guardan como hiperaristas; la API las expande a
+        cliques salvo que el cliente pida el formato compacto.
+        """
+        return construir_grafo(cursos, agrupar_profesores=True)
     
-    def _generar_validacion(self, cursos: List[Dict], horario: Dict) -> Dict:
-        """Genera reporte de validación"""
+    def _generar_validacion(self, cursos: List[Dict], horario: Dict,
+                            disponibilidad: Optional[Dict[str, int]] = None) -> Dict:
+        """
+        Genera reporte de validación
         
-        restricciones_cumplidas = []
-        optimizaciones = []
+        Revisa sobre las sesiones colocadas las restricciones duras (choques
+        de profesor, grupo y aula, y disponibilidad de profesores) y mide los
+        costos blandos que minimiza ``OptimizadorLocal``.
+        """
+        num_franjas = len(self.franjas)
+        pos_dia = {dia: i for i, dia in enumerate(self.dias)}
+        pos_franja = {franja: i for i, franja in enumerate(self.franjas)}
         
-        # Verificar restricciones
-        restricciones_cumplidas.append({
-            'tipo': 'Profesores',
-            'cumplida': True,
-            'descripcion': 'No hay conflictos de profesores en el mismo horario'
-        })
+        asignaciones = []
+        for i, curso in enumerate(cursos):
+            for h in curso.get('horarios', []):
+                asignaciones.append((i, pos_dia[h['dia']] * num_franjas + pos_franja[h['franja']], h['aula']))
         
-        restricciones_cumplidas.append({
-            'tipo': 'Grupos',
-            'cumplida': True,
-            'descripcion': 'No hay conflictos de grupos en el mismo horario'
-        })
+        def choques(clave) -> int:
+            vistos = set()
+            repetidos = 0
+            for asignacion in asignaciones:
+                k = clave(asignacion)
+                if k is None:
+                    continue
+                repetidos += k in vistos
+                vistos.add(k)
+            return repetidos
         
-        restricciones_cumplidas.append({
-            'tipo': 'Aulas',
-            'cumplida': True,
-            'descripcion': 'No hay conflictos de aulas en el mismo horario'
-        })
+        choques_prof = choques(lambda a: (cursos[a[0]]['profesor'], a[1]) if cursos[a[0]]['profesor'] else None)
+        choques_grupo = choques(lambda a: (cursos[a[0]]['grupo'], a[1]))
+        choques_aula = choques(lambda a: (a[2], a[1]) if a[2] is not None else None)
+        fuera_disponibilidad = sum(
+            1 for i, casilla, _ in asignaciones
+            if cursos[i]['profesor'] in (disponibilidad or {})
+            and not disponibilidad[cursos[i]['profesor']] >> casilla & 1
+        )
         
-        # Sugerencias
-        optimizaciones.append({
-            'tipo': 'Distribución',
-            'sugerencia': 'Horarios distribuidos uniformemente'
-        })
+        restricciones_cumplidas = [
+            {
+                'tipo': 'Profesores',
+                'cumplida': choques_prof == 0,
+                'descripcion': 'No hay conflictos de profesores en el mismo horario' if not choques_prof
+                else f'{choques_prof} sesiones con el profesor ocupado'
+            },
+            {
+                'tipo': 'Grupos',
+                'cumplida': choques_grupo == 0,
+                'descripcion': 'No hay conflictos de grupos en el mismo horario' if not choques_grupo
+                else f'{choques_grupo} sesiones con el grupo ocupado'
+            },
+            {
+                'tipo': 'Aulas',
+                'cumplida': choques_aula == 0,
+                'descripcion': 'No hay conflictos de aulas en el mismo horario' if not choques_aula
+                else f'{choques_aula} sesiones en aulas ocupadas'
+            },
+            {
+                'tipo': 'Disponibilidad',
+                'cumplida': fuera_disponibilidad == 0,
+                'descripcion': 'Todas las clases respetan la disponibilidad de los profesores'
+                if not fuera_disponibilidad
+                else f'{fuera_disponibilidad} sesiones fuera de la disponibilidad del profesor'
+            }
+        ]
+        
+        # Costos blandos
+        costos = desglose_costos(cursos, asignaciones, self.dias, self.franjas)
+        mensajes = {
+            'huecos_profesor': ('Huecos', '{} franjas libres entre clases de un mismo profesor'),
+            'curso_repetido_dia': ('Distribución', '{} sesiones repetidas de una materia en el mismo día'),
+            'franja_tarde': ('Horario tardío', '{} sesiones en la última franja del día'),
+            'cambio_aula': ('Aulas', '{} cambios de aula entre clases seguidas de un grupo')
+        }
+        optimizaciones = [
+            {'tipo': tipo, 'sugerencia': texto.format(costos[clave])}
+            for clave, (tipo, texto) in mensajes.items() if costos[clave]
+        ]
+        if not optimizaciones:
+            optimizaciones.append({'tipo': 'Distribución', 'sugerencia': 'Sin costos blandos pendientes'})
         
         return {
             'restricciones_cumplidas': restricciones_cumplidas,
             'optimizaciones': optimizaciones,
+            'costos_blandos': costos,
             'total_restricciones': len(restricciones_cumplidas),
             'restricciones_ok': len([r for r in restricciones_cumplidas if r['cumplida']])
         }
@@ -0,0 +1,317 @@
+"""
+Motor exacto para la asignación de horarios
+Modelo booleano sesiones × casillas × aulas resuelto con CP-SAT (OR-Tools).
+A diferencia de ``SolverCSP`` puede demostrar que no existe un horario
+completo y acota qué tan lejos del óptimo está el que encuentra.
+
+OR-Tools es opcional: se importa solo al resolver (``pip install ortools``).
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+from .ocupacion import IndiceOcupacion
+from .aulas import IndiceAulas, TIPO_POR_DEFECTO
+from .solver_csp import sesiones_por_curso
+from .optimizador import PESOS_POR_DEFECTO
+
+logger = logging.getLogger(__name__)
+
+# Tiempo máximo si no se indica otro (CP-SAT siempre necesita un límite)
+SEGUNDOS_POR_DEFECTO = 30.0
+
+# Los pesos del objetivo se escalan a enteros
+ESCALA_OBJETIVO = 10
+
+# Cada cuánto se consulta la señal externa de parada
+INTERVALO_DETENER = 0.2
+
+ESTADOS = {
+    'OPTIMAL': 'optimo',
+    'FEASIBLE': 'factible',
+    'INFEASIBLE': 'infactible',
+    'UNKNOWN': 'desconocido',
+    'MODEL_INVALID': 'modelo_invalido'
+}
+
+
+def ortools_disponible() -> bool:
+    """True si OR-Tools está instalado"""
+    try:
+        import ortools  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def clases_aulas(codigos: List[str], aulas_info: Optional[List[Dict]] = None) -> Dict[Tuple, int]:
+    """
+    Agrupa las aulas intercambiables
+
+    Dos aulas con la misma capacidad y el mismo tipo sirven exactamente a
+    los mismos cursos, así que el modelo solo decide cuántas sesiones van a
+    cada clase en cada casilla y las aulas concretas se reparten después.
+
+    Returns:
+        {(capacidad, tipo): máscara de bits de las aulas de esa clase}
+        con los bits en el orden de ``codigos``
+    """
+    info = {a['codigo']: a for a in aulas_info or []}
+    clases: Dict[Tuple, int] = {}
+    for bit, codigo in enumerate(codigos):
+        registro = info.get(codigo, {})
+        capacidad = registro.get('capacidad')
+        clave = (float('inf') if capacidad is None else capacidad, registro.get('tipo', TIPO_POR_DEFECTO))
+        clases[clave] = clases.get(clave, 0) | (1 << bit)
+    return clases
+
+
+class SolverCPSAT:
+    """
+    Resuelve la asignación sesión → (casilla, aula) como un modelo CP-SAT
+
+    Hay una variable booleana por (curso, casilla, clase de aula) donde el
+    grupo y el profesor del curso están libres y la clase sirve al curso
+    (capacidad suficiente y, si el curso lo pide, el tipo de aula). Las
+    restricciones duras son las mismas que en ``SolverCSP``:
+
+        - cada curso tiene exactamente sus sesiones, a lo más una por casilla
+        - un grupo y un profesor tienen a lo más una sesión por casilla
+        - en cada casilla no se usan más aulas de una clase que las libres
+
+    El objetivo minimiza las materias repetidas en un día y las clases en
+    la última franja con los pesos de ``PESOS_POR_DEFECTO``; los huecos y
+    cambios de aula se dejan a ``OptimizadorLocal``. Misma interfaz que
+    ``SolverCSP`` (ver ``services.solvers``), más una ``pista`` opcional
+    con un horario previo para arrancar la búsqueda.
+    """
+
+    def __init__(self, dias: List[str], franjas: List[str],
+                 rng: Optional[random.Random] = None,
+                 limite_segundos: Optional[float] = None,
+                 detener: Optional[Callable[[], bool]] = None,
+                 progreso: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 hilos: Optional[int] = None, franjas_tarde: int = 1, **_):
+        """
+        Args:
+            dias, franjas: Rejilla del horario
+            rng: Fuente de la semilla de CP-SAT
+            limite_segundos: Tiempo máximo (``SEGUNDOS_POR_DEFECTO`` si no se da)
+            detener: Callback que devuelve True para cancelar la búsqueda
+            progreso: Callback que recibe cada solución mejorada
+            hilos: Trabajadores de CP-SAT (por defecto uno por núcleo); con
+                uno solo el resultado es reproducible para una semilla
+            franjas_tarde: Cuántas de las últimas franjas se penalizan
+        """
+        self.dias = dias
+        self.franjas = franjas
+        self.rng = rng or random.Random()
+        self.limite_segundos = limite_segundos or SEGUNDOS_POR_DEFECTO
+        self.detener = detener
+        self.progreso = progreso
+        self.hilos = hilos or os.cpu_count() or 1
+        self.franjas_tarde = franjas_tarde
+
+    def resolver(self, cursos: List[Dict], aulas: List[str],
+                 ocupacion: Optional[IndiceOcupacion] = None,
+                 sesiones: Optional[List[int]] = None,
+                 aulas_info: Optional[List[Dict]] = None,
+                 disponibilidad: Optional[Dict[str, int]] = None,
+                 pista: Optional[List[tuple]] = None) -> Dict[str, Any]:
+        """
+        Busca un horario completo de costo mínimo
+
+        Args:
+            cursos, aulas, ocupacion, sesiones, aulas_info, disponibilidad:
+                Como en ``SolverCSP.resolver``
+            pista: Asignaciones (indice_curso, casilla, aula) de un horario
+                previo, p. ej. el de ``SolverCSP``; se usan como punto de partida
+
+        Returns:
+            Las claves de ``SolverCSP.resolver`` ('busqueda_agotada' es
+            True solo si el estado es 'infactible') más 'estado'
+            ('optimo', 'factible', 'infactible' o 'desconocido'), 'costo',
+            'cota' y 'gap' (distancia relativa al óptimo; 0 si es óptimo)
+        """
+        from ortools.sat.python import cp_model
+
+        inicio = time.monotonic()
+        if ocupacion is None:
+            ocupacion = IndiceOcupacion(self.dias, self.franjas, IndiceAulas(aulas, aulas_info).codigos)
+        for profesor, mascara in (disponibilidad or {}).items():
+            ocupacion.restringir_profesor(profesor, mascara)
+
+        num_franjas = len(self.franjas)
+        clases = list(clases_aulas(ocupacion.aulas, aulas_info).items())
+        necesidades = [sesiones[i] if sesiones is not None else sesiones_por_curso(c)
+                       for i, c in enumerate(cursos)]
+        total = sum(necesidades)
+
+        modelo = cp_model.CpModel()
+        # variables[(curso, casilla, clase)]
+        variables: Dict[Tuple[int, int, int], Any] = {}
+        por_grupo: Dict[Tuple[str, int], list] = {}
+        por_profesor: Dict[Tuple[str, int], list] = {}
+        por_clase: Dict[Tuple[int, int], list] = {}
+        pesos = {clave: round(peso * ESCALA_OBJETIVO) for clave, peso in PESOS_POR_DEFECTO.items()}
+        objetivo = []
+
+        for i, curso in enumerate(cursos):
+            if not necesidades[i]:
+                continue
+            grupo, profesor = curso['grupo'], curso['profesor']
+            alumnos = curso.get('alumnos') or 0
+            tipo = curso.get('tipo_aula')
+            sirven = [k for k, ((capacidad, tipo_clase), _) in enumerate(clases)
+                      if capacidad >= alumnos and (tipo is None or tipo_clase == tipo)]
+
+            del_curso = []
+            por_dia: Dict[int, list] = {}
+            for casilla in ocupacion.iterar_bits(ocupacion.casillas_libres(grupo, profesor)):
+                en_casilla = []
+                for k in sirven:
+                    if not ocupacion.aulas_libres(casilla) & clases[k][1]:
+                        continue
+                    x = modelo.NewBoolVar(f"x_{i}_{casilla}_{k}")
+                    variables[(i, casilla, k)] = x
+                    en_casilla.append(x)
+                    por_clase.setdefault((casilla, k), []).append(x)
+                if not en_casilla:
+                    continue
+                if len(en_casilla) > 1:
+                    modelo.AddAtMostOne(en_casilla)
+                por_grupo.setdefault((grupo, casilla), []).extend(en_casilla)
+                if profesor:
+                    por_profesor.setdefault((profesor, casilla), []).extend(en_casilla)
+                por_dia.setdefault(casilla // num_franjas, []).extend(en_casilla)
+                del_curso.extend(en_casilla)
+                if casilla % num_franjas >= num_franjas - self.franjas_tarde:
+                    objetivo.extend((x, pesos['franja_tarde']) for x in en_casilla)
+
+            modelo.Add(sum(del_curso) == necesidades[i])
+
+            # Sesiones de más en un mismo día
+            if necesidades[i] > 1:
+                for dia, xs in por_dia.items():
+                    if len(xs) > 1:
+                        extra = modelo.NewIntVar(0, len(xs) - 1, f"rep_{i}_{dia}")
+                        modelo.Add(extra >= sum(xs) - 1)
+                        objetivo.append((extra, pesos['curso_repetido_dia']))
+
+        for xs in list(por_grupo.values()) + list(por_profesor.values()):
+            if len(xs) > 1:
+                modelo.AddAtMostOne(xs)
+        for (casilla, k), xs in por_clase.items():
+            libres = IndiceOcupacion.contar_bits(ocupacion.aulas_libres(casilla) & clases[k][1])
+            if len(xs) > libres:
+                modelo.Add(sum(xs) <= libres)
+
+        if objetivo:
+            modelo.Minimize(sum(peso * var for var, peso in objetivo))
+
+        # Arranque desde el horario previo
+        if pista:
+            clase_de_aula = {}
+            for k, (_, mascara) in enumerate(clases):
+                for bit in ocupacion.iterar_bits(mascara):
+                    clase_de_aula[ocupacion.aulas[bit]] = k
+            elegidas = {(i, casilla, clase_de_aula.get(aula)) for i, casilla, aula in pista}
+            for clave, x in variables.items():
+                modelo.AddHint(x, clave in elegidas)
+
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = self.limite_segundos
+        solver.parameters.num_workers = self.hilos
+        solver.parameters.random_seed = self.rng.randrange(2 ** 31)
+
+        callback = _callback_avance(self, total, len(cursos), inicio) if self.progreso is not None else None
+        vigilante = _vigilar(solver, self.detener) if self.detener is not None else None
+        try:
+            estado = solver.Solve(modelo, callback)
+        finally:
+            if vigilante is not None:
+                vigilante.set()
+
+        nombre = ESTADOS.get(solver.StatusName(estado), 'desconocido')
+        resuelto = nombre in ('optimo', 'factible')
+
+        asignaciones = []
+        if resuelto:
+            # Repartir las aulas concretas de cada clase
+            usadas = [0] * ocupacion.num_casillas
+            for (i, casilla, k), x in variables.items():
+                if solver.BooleanValue(x):
+                    libres = ocupacion.aulas_libres(casilla) & clases[k][1] & ~usadas[casilla]
+                    bit = (libres & -libres).bit_length() - 1
+                    usadas[casilla] |= 1 << bit
+                    asignaciones.append((i, casilla, ocupacion.aulas[bit]))
+            asignaciones.sort()
+            for i, casilla, aula in asignaciones:
+                ocupacion.ocupar(casilla, cursos[i]['grupo'], cursos[i]['profesor'], aula)
+        elif pista:
+            asignaciones = list(pista)
+
+        costo = solver.ObjectiveValue() / ESCALA_OBJETIVO if resuelto and objetivo else 0.0
+        cota = solver.BestObjectiveBound() / ESCALA_OBJETIVO if resuelto and objetivo else 0.0
+        gap = None
+        if resuelto:
+            gap = 0.0 if nombre == 'optimo' else round((costo - cota) / max(abs(costo), 1e-9), 4)
+
+        logger.info(
+            f"🧮 CP-SAT ({nombre}): {len(asignaciones)}/{total} sesiones, "
+            f"{len(variables)} variables, costo {costo} (cota {cota}), "
+            f"{time.monotonic() - inicio:.2f} s"
+        )
+
+        return {
+            'asignaciones': asignaciones,
+            'total_sesiones': total,
+            'completo': resuelto,
+            'busqueda_agotada': nombre == 'infactible',
+            'nodos_explorados': solver.NumBranches(),
+            'retrocesos': solver.NumConflicts(),
+            'estado': nombre,
+            'costo': costo,
+            'cota': cota,
+            'gap': gap
+        }
+
+
+def _vigilar(solver, detener: Callable[[], bool]) -> threading.Event:
+    """Hilo que detiene ``solver`` cuando ``detener()`` devuelve True"""
+    terminado = threading.Event()
+
+    def vigilar():
+        while not terminado.wait(INTERVALO_DETENER):
+            if detener():
+                solver.StopSearch()
+                return
+
+    threading.Thread(target=vigilar, daemon=True).start()
+    return terminado
+
+
+def _callback_avance(motor: SolverCPSAT, total: int, total_cursos: int, inicio: float):
+    """Callback de CP-SAT que reporta cada solución con el formato de ``SolverCSP``"""
+    from ortools.sat.python import cp_model
+
+    class Avance(cp_model.CpSolverSolutionCallback):
+        def on_solution_callback(self):
+            motor.progreso({
+                'sesiones_asignadas': total,
+                'mejor_sesiones': total,
+                'total_sesiones': total,
+                'cursos_completos': total_cursos,
+                'total_cursos': total_cursos,
+                'nodos_explorados': self.NumBranches(),
+                'retrocesos': self.NumConflicts(),
+                'costo': self.ObjectiveValue() / ESCALA_OBJETIVO,
+                'cota': self.BestObjectiveBound() / ESCALA_OBJETIVO,
+                'segundos': round(time.monotonic() - inicio, 2)
+            })
+
+    return Avance()
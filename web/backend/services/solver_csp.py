@@ -0,0 +1,416 @@
+"""
+Motor CSP para la asignación de horarios
+Backtracking iterativo con MRV, forward checking y deshacer asignaciones
+"""
+
+import heapq
+import random
+import time
+import logging
+from typing import Dict, List, Any, Optional, Callable
+
+from .ocupacion import IndiceOcupacion
+from .aulas import IndiceAulas
+
+logger = logging.getLogger(__name__)
+
+# Cada franja dura 1.5 horas
+HORAS_POR_FRANJA = 1.5
+
+# Valores especiales de casilla para una sesión
+SIN_ASIGNAR = -1
+OMITIDA = -2
+
+
+def sesiones_por_curso(curso: Dict) -> int:
+    """Número de franjas semanales que necesita un curso"""
+    return max(1, int(curso['horas_semana'] / HORAS_POR_FRANJA))
+
+
+class SolverCSP:
+    """
+    Resuelve la asignación sesión → (casilla, aula) como un CSP
+
+    Cada sesión de un curso es una variable cuyo dominio son las casillas
+    donde su grupo y su profesor están libres (y el profesor disponible) y
+    queda alguna aula. El aula
+    de cada sesión se elige best-fit por capacidad y tipo (``IndiceAulas``). Los
+    dominios se derivan del ``IndiceOcupacion``, así que asignar y deshacer
+    solo tocan bitmasks. La búsqueda es iterativa (pila explícita), elige
+    siempre el curso con menos casillas disponibles (MRV) y, tras cada
+    asignación, comprueba que los cursos, grupos y profesores afectados
+    sigan teniendo casillas suficientes para sus sesiones pendientes.
+    """
+
+    def __init__(self, dias: List[str], franjas: List[str],
+                 max_nodos: int = 200000, rng: Optional[random.Random] = None,
+                 limite_segundos: Optional[float] = None,
+                 detener: Optional[Callable[[], bool]] = None,
+                 progreso: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.dias = dias
+        self.franjas = franjas
+        self.max_nodos = max_nodos
+        self.rng = rng or random.Random()
+        self.limite_segundos = limite_segundos
+        self.detener = detener
+        self.progreso = progreso
+        self._parado = False
+        self._fin: Optional[float] = None
+
+    def resolver(self, cursos: List[Dict], aulas: List[str],
+                 ocupacion: Optional[IndiceOcupacion] = None,
+                 sesiones: Optional[List[int]] = None,
+                 aulas_info: Optional[List[Dict]] = None,
+                 disponibilidad: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """
+        Busca una asignación completa para las sesiones de ``cursos``
+
+        Args:
+            cursos: Cursos a asignar (se usan 'grupo', 'profesor',
+                'horas_semana' y, si existen, 'alumnos' y 'tipo_aula')
+            aulas: Aulas disponibles
+            ocupacion: Índice ya poblado con asignaciones fijas (opcional)
+            sesiones: Sesiones a colocar por curso; por defecto las que
+                marcan sus horas semanales
+            aulas_info: Capacidad y tipo de cada aula (ver ``cargar_aulas``)
+            disponibilidad: Máscara de casillas disponibles por profesor
+                (ver ``mascaras_disponibilidad``); se podan antes de buscar
+
+        Returns:
+            Diccionario con 'asignaciones' [(indice_curso, casilla, aula)],
+            'total_sesiones', 'completo', 'busqueda_agotada' (se recorrieron
+            todas las casillas sin completar el horario; no demuestra que no
+            exista: el aula de cada sesión se elige de forma voraz, sin
+            ramificar, y las sesiones omitibles no se exploran),
+            'nodos_explorados' y 'retrocesos'
+        """
+        if ocupacion is None:
+            # Aulas en orden de capacidad: el best-fit es el bit libre más bajo
+            self.indice_aulas = IndiceAulas(aulas, aulas_info)
+            ocupacion = IndiceOcupacion(self.dias, self.franjas, self.indice_aulas.codigos)
+        else:
+            self.indice_aulas = IndiceAulas(ocupacion.aulas, aulas_info, ordenar=False)
+        for profesor, mascara in (disponibilidad or {}).items():
+            ocupacion.restringir_profesor(profesor, mascara)
+
+        self.ocupacion = ocupacion
+        self.cursos = cursos
+        self._parado = False
+        self._fin = time.monotonic() + self.limite_segundos if self.limite_segundos else None
+        contar = ocupacion.contar_bits
+
+        # Expandir cursos en sesiones
+        sesion_curso: List[int] = []
+        libres_curso: List[List[int]] = []
+        for i, curso in enumerate(cursos):
+            libres_curso.append([])
+            num_sesiones = sesiones[i] if sesiones is not None else sesiones_por_curso(curso)
+            for _ in range(num_sesiones):
+                libres_curso[i].append(len(sesion_curso))
+                sesion_curso.append(i)
+
+        total = len(sesion_curso)
+        casilla_de: List[int] = [SIN_ASIGNAR] * total
+        aula_de: List[Optional[str]] = [None] * total
+
+        # Sesiones pendientes por curso, grupo y profesor
+        self._pend_curso = [len(s) for s in libres_curso]
+        self._pend_grupo: Dict[str, int] = {}
+        self._pend_prof: Dict[str, int] = {}
+        self._cursos_grupo: Dict[str, List[int]] = {}
+        self._cursos_prof: Dict[str, List[int]] = {}
+        for i, curso in enumerate(cursos):
+            grupo, profesor = curso['grupo'], curso['profesor']
+            self._pend_grupo[grupo] = self._pend_grupo.get(grupo, 0) + self._pend_curso[i]
+            self._cursos_grupo.setdefault(grupo, []).append(i)
+            if profesor:
+                self._pend_prof[profesor] = self._pend_prof.get(profesor, 0) + self._pend_curso[i]
+                self._cursos_prof.setdefault(profesor, []).append(i)
+
+        pendientes = set(i for i, n in enumerate(self._pend_curso) if n)
+
+        # Cursos que participan en una restricción ya infactible por conteo
+        # (p. ej. un profesor con más sesiones que casillas, o más sesiones
+        # que pares aula-casilla libres): pueden omitir
+        # sesiones como último recurso en vez de agotar la búsqueda.
+        capacidad_aulas = sum(contar(ocupacion.aulas_libres(k)) for k in range(ocupacion.num_casillas))
+        sin_aulas_suficientes = capacidad_aulas < total
+        omitibles = set(
+            i for i in pendientes
+            if sin_aulas_suficientes
+            or self._holgura('curso', i) < 0
+            or self._holgura('grupo', cursos[i]['grupo']) < 0
+            or (cursos[i]['profesor'] and self._holgura('profesor', cursos[i]['profesor']) < 0)
+        )
+
+        # Tamaño de dominio por curso en un montículo con invalidación
+        # perezosa: MRV cuesta O(log n) en vez de recorrer todos los cursos
+        tam_dominio = [contar(self._dominio(i)) for i in range(len(cursos))]
+        monticulo = [(tam_dominio[i], i) for i in pendientes]
+        heapq.heapify(monticulo)
+
+        def refrescar(c: int, casilla: int, llena_antes: bool):
+            curso = cursos[c]
+            if llena_antes != bool(ocupacion.casillas_llenas >> casilla & 1):
+                afectados = pendientes
+            else:
+                afectados = list(self._cursos_grupo.get(curso['grupo'], []))
+                if curso['profesor']:
+                    afectados += self._cursos_prof.get(curso['profesor'], [])
+            for i in afectados:
+                if i in pendientes:
+                    tam = contar(self._dominio(i))
+                    if tam != tam_dominio[i] or i == c:
+                        tam_dominio[i] = tam
+                        heapq.heappush(monticulo, (tam, i))
+
+        def asignar(s: int, casilla: int, aula: Optional[str]):
+            c = sesion_curso[s]
+            curso = cursos[c]
+            casilla_de[s] = casilla
+            aula_de[s] = aula
+            libres_curso[c].remove(s)
+            self._descontar(c, -1)
+            if not self._pend_curso[c]:
+                pendientes.discard(c)
+            if casilla != OMITIDA:
+                llena_antes = bool(ocupacion.casillas_llenas >> casilla & 1)
+                ocupacion.ocupar(casilla, curso['grupo'], curso['profesor'], aula)
+                refrescar(c, casilla, llena_antes)
+
+        def deshacer(s: int):
+            c = sesion_curso[s]
+            curso = cursos[c]
+            casilla, aula = casilla_de[s], aula_de[s]
+            casilla_de[s] = SIN_ASIGNAR
+            aula_de[s] = None
+            libres_curso[c].append(s)
+            self._descontar(c, 1)
+            pendientes.add(c)
+            if casilla != OMITIDA:
+                llena_antes = bool(ocupacion.casillas_llenas >> casilla & 1)
+                ocupacion.liberar(casilla, curso['grupo'], curso['profesor'], aula)
+                refrescar(c, casilla, llena_antes)
+            else:
+                tam_dominio[c] = contar(self._dominio(c))
+                heapq.heappush(monticulo, (tam_dominio[c], c))
+
+        def elegir_curso() -> int:
+            while True:
+                tam, c = monticulo[0]
+                if c in pendientes and tam == tam_dominio[c]:
+                    return c
+                heapq.heappop(monticulo)
+
+        nodos = 0
+        retrocesos = 0
+        pila: List[list] = []  # [sesion, valores por probar]
+        mejor: List[tuple] = []
+        completo = False
+        agotado = False
+        siguiente_informe = 0
+
+        while True:
+            if self.progreso is not None and nodos >= siguiente_informe:
+                siguiente_informe = nodos + 1000
+                self.progreso({
+                    'sesiones_asignadas': len(pila),
+                    'mejor_sesiones': max(len(pila), len(mejor)),
+                    'total_sesiones': total,
+                    'cursos_completos': len(cursos) - len(pendientes),
+                    'total_cursos': len(cursos),
+                    'nodos_explorados': nodos,
+                    'retrocesos': retrocesos
+                })
+            if not pendientes:
+                completo = True
+                break
+            if self._sin_presupuesto(nodos):
+                break
+
+            # MRV: curso con menos casillas disponibles
+            c = elegir_curso()
+            valores = list(ocupacion.iterar_bits(self._dominio(c)))
+            self.rng.shuffle(valores)
+            if c in omitibles:
+                valores.insert(0, OMITIDA)
+            pila.append([libres_curso[c][-1], valores])
+
+            # Probar valores; si se agotan, retroceder al marco anterior
+            while pila:
+                s, valores = pila[-1]
+                if casilla_de[s] != SIN_ASIGNAR:
+                    deshacer(s)
+
+                colocado = False
+                while valores and not self._sin_presupuesto(nodos):
+                    casilla = valores.pop()
+                    nodos += 1
+                    if casilla == OMITIDA:
+                        asignar(s, OMITIDA, None)
+                        colocado = True
+                        break
+                    if not self._forward_check(sesion_curso[s], casilla):
+                        continue
+                    aula = self._elegir_aula(casilla, cursos[sesion_curso[s]])
+                    if aula is None:
+                        continue
+                    asignar(s, casilla, aula)
+                    colocado = True
+                    break
+
+                if colocado or self._sin_presupuesto(nodos):
+                    break
+                if len(pila) - 1 > len(mejor):
+                    # Antes de retroceder, guardar la asignación más profunda
+                    mejor = [(s, casilla_de[s], aula_de[s]) for s, _ in pila[:-1]]
+                pila.pop()
+                retrocesos += 1
+
+            if not pila:
+                # Casillas agotadas con la elección voraz de aulas; otra
+                # elección de aulas podría completar el horario
+                agotado = True
+                break
+
+        actuales = sum(1 for s, _ in pila if casilla_de[s] != SIN_ASIGNAR)
+        if not completo and len(mejor) > actuales:
+            # Restaurar la mejor asignación parcial
+            for s, _ in reversed(pila):
+                if casilla_de[s] != SIN_ASIGNAR:
+                    deshacer(s)
+            for s, casilla, aula in mejor:
+                asignar(s, casilla, aula)
+
+        # Completar de forma voraz lo que quedó sin casilla u omitido
+        for s in range(total):
+            if casilla_de[s] == OMITIDA:
+                deshacer(s)
+        for c in sorted(pendientes, key=lambda i: contar(self._dominio(i))):
+            for s in list(libres_curso[c]):
+                for casilla in ocupacion.iterar_bits(self._dominio(c)):
+                    aula = self._elegir_aula(casilla, cursos[c])
+                    if aula is not None:
+                        asignar(s, casilla, aula)
+                        break
+
+        asignaciones = [
+            (sesion_curso[s], casilla_de[s], aula_de[s])
+            for s in range(total) if casilla_de[s] >= 0
+        ]
+        completo = completo and len(asignaciones) == total
+
+        if self.progreso is not None:
+            self.progreso({
+                'sesiones_asignadas': len(asignaciones),
+                'mejor_sesiones': len(asignaciones),
+                'total_sesiones': total,
+                'cursos_completos': len(cursos) - len(pendientes),
+                'total_cursos': len(cursos),
+                'nodos_explorados': nodos,
+                'retrocesos': retrocesos
+            })
+
+        logger.info(
+            f"🔎 CSP: {len(asignaciones)}/{total} sesiones, "
+            f"{nodos} nodos, {retrocesos} retrocesos"
+        )
+
+        return {
+            'asignaciones': asignaciones,
+            'total_sesiones': total,
+            'completo': completo,
+            'busqueda_agotada': agotado,
+            'nodos_explorados': nodos,
+            'retrocesos': retrocesos
+        }
+
+    def _sin_presupuesto(self, nodos: int) -> bool:
+        """Nodos, tiempo o señal externa de parada agotados"""
+        if self._parado or nodos >= self.max_nodos:
+            return True
+        # El reloj y la señal externa se consultan cada 256 nodos
+        if nodos & 255 == 0 and nodos:
+            if (self._fin is not None and time.monotonic() >= self._fin) or \
+                    (self.detener is not None and self.detener()):
+                self._parado = True
+        return self._parado
+
+    # ---------- Dominios y propagación ----------
+
+    def _dominio(self, c: int) -> int:
+        curso = self.cursos[c]
+        return self.ocupacion.casillas_disponibles(curso['grupo'], curso['profesor'])
+
+    def _dominio_grupo(self, grupo: str) -> int:
+        ocupacion = self.ocupacion
+        return ocupacion.todas_casillas & ~(ocupacion.ocupacion_grupo(grupo) | ocupacion.casillas_llenas)
+
+    def _dominio_profesor(self, profesor: str) -> int:
+        ocupacion = self.ocupacion
+        return ocupacion.todas_casillas & ~(ocupacion.ocupacion_profesor(profesor) | ocupacion.casillas_llenas)
+
+    def _descontar(self, c: int, delta: int):
+        curso = self.cursos[c]
+        self._pend_curso[c] += delta
+        self._pend_grupo[curso['grupo']] += delta
+        if curso['profesor']:
+            self._pend_prof[curso['profesor']] += delta
+
+    def _holgura(self, tipo: str, clave) -> int:
+        """Casillas disponibles menos sesiones pendientes de una restricción"""
+        contar = IndiceOcupacion.contar_bits
+        if tipo == 'curso':
+            return contar(self._dominio(clave)) - self._pend_curso[clave]
+        if tipo == 'grupo':
+            return contar(self._dominio_grupo(clave)) - self._pend_grupo[clave]
+        return contar(self._dominio_profesor(clave)) - self._pend_prof[clave]
+
+    def _forward_check(self, c: int, casilla: int) -> bool:
+        """
+        Comprueba que ocupar ``casilla`` con una sesión de ``c`` no vacíe dominios
+
+        El curso, grupo y profesor de la propia sesión pierden una casilla y
+        una sesión pendiente a la vez, así que su holgura no cambia. Las demás
+        restricciones que tenían la casilla en su dominio pierden una unidad
+        de holgura; la asignación se rechaza si alguna estaba en cero. Las que
+        ya eran infactibles desde el inicio no se propagan, para que la
+        búsqueda siga colocando el resto.
+        """
+        ocupacion = self.ocupacion
+        curso = self.cursos[c]
+        grupo, profesor = curso['grupo'], curso['profesor']
+        bit = 1 << casilla
+        llena = IndiceOcupacion.contar_bits(ocupacion.aulas_libres(casilla)) == 1
+
+        if llena:
+            # La casilla se queda sin aulas: afecta a todos los pendientes
+            restricciones = [('curso', i) for i in range(len(self.cursos)) if self._pend_curso[i]]
+            restricciones += [('grupo', g) for g, n in self._pend_grupo.items() if n and g != grupo]
+            restricciones += [('profesor', p) for p, n in self._pend_prof.items() if n and p != profesor]
+        else:
+            restricciones = [('curso', i) for i in self._cursos_grupo.get(grupo, [])]
+            if profesor:
+                restricciones += [('curso', i) for i in self._cursos_prof.get(profesor, [])]
+
+        for tipo, clave in restricciones:
+            if tipo == 'curso' and (clave == c or not self._pend_curso[clave]):
+                continue
+            if tipo == 'curso':
+                dominio = self._dominio(clave)
+            elif tipo == 'grupo':
+                dominio = self._dominio_grupo(clave)
+            else:
+                dominio = self._dominio_profesor(clave)
+            if dominio & bit and self._holgura(tipo, clave) == 0:
+                return False
+        return True
+
+    def _elegir_aula(self, casilla: int, curso: Dict) -> Optional[str]:
+        """Aula libre más pequeña en la casilla que sirve al curso"""
+        bit = self.indice_aulas.elegir(
+            self.ocupacion.aulas_libres(casilla),
+            curso.get('alumnos') or 0,
+            curso.get('tipo_aula')
+        )
+        return None if bit is None else self.ocupacion.aulas[bit]
@@ -0,0 +1,52 @@
+"""
+Motores de resolución intercambiables
+Todos reciben la rejilla (días, franjas) y opciones en el constructor y
+exponen ``resolver(cursos, aulas, ocupacion=None, sesiones=None,
+aulas_info=None, disponibilidad=None)``, que devuelve 'asignaciones'
+[(indice_curso, casilla, aula)], 'total_sesiones', 'completo',
+'busqueda_agotada', 'nodos_explorados' y 'retrocesos'.
+
+'busqueda_agotada' solo indica que el motor recorrió todo su espacio de
+búsqueda; el CSP elige aulas de forma voraz, así que no prueba nada. Solo
+el 'estado' 'infactible' de CP-SAT demuestra que no existe horario completo.
+
+    'csp'    SolverCSP: backtracking aleatorizado, rápido, sin garantías
+    'cpsat'  SolverCPSAT: modelo exacto con OR-Tools; demuestra
+             infactibilidad y reporta el gap al óptimo (dependencia opcional)
+"""
+
+import importlib
+from typing import Dict, List, Tuple
+
+# nombre → (módulo, clase); los módulos se importan al pedir el motor
+SOLVERS: Dict[str, Tuple[str, str]] = {
+    'csp': ('.solver_csp', 'SolverCSP'),
+    'cpsat': ('.solver_cpsat', 'SolverCPSAT')
+}
+
+# Modos de SchedulerServiceNew además de los motores: 'auto' usa el CSP y
+# recurre a CP-SAT solo si no logra un horario completo
+MODOS = list(SOLVERS) + ['auto']
+
+
+def solvers_disponibles() -> List[str]:
+    """Motores que se pueden usar con las dependencias instaladas"""
+    from .solver_cpsat import ortools_disponible
+
+    return [nombre for nombre in SOLVERS if nombre != 'cpsat' or ortools_disponible()]
+
+
+def crear_solver(nombre: str, dias: List[str], franjas: List[str], **opciones):
+    """
+    Instancia el motor ``nombre`` con las opciones dadas
+
+    Raises:
+        ValueError: Si el motor no existe o sus dependencias no están instaladas
+    """
+    if nombre not in SOLVERS:
+        raise ValueError(f"Motor desconocido: {nombre} (opciones: {', '.join(SOLVERS)})")
+    if nombre not in solvers_disponibles():
+        raise ValueError(f"El motor {nombre} requiere OR-Tools (pip install ortools)")
+
+    modulo, clase = SOLVERS[nombre]
+    return getattr(importlib.import_module(modulo, __package__), clase)(dias, franjas, **opciones)
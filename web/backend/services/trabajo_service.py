@@ -0,0 +1,276 @@
+"""
+Servicio de trabajos en segundo plano
+Ejecuta la generación de horarios fuera del hilo de la petición y expone
+su avance, cancelación y resultado
+"""
+
+import os
+import re
+import json
+import uuid
+import time
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Tuple
+
+from .horario_compacto import a_json
+
+logger = logging.getLogger(__name__)
+
+# Estados de un trabajo
+PENDIENTE = 'pendiente'
+EJECUTANDO = 'ejecutando'
+TERMINADO = 'terminado'
+CANCELADO = 'cancelado'
+ERROR = 'error'
+
+# Ids que genera ``enviar`` (también se usan como nombre de archivo)
+PATRON_ID = re.compile(r'^[0-9a-f]{12}$')
+
+# Segundos mínimos entre escrituras del avance en el directorio compartido
+INTERVALO_COMPARTIR = 0.5
+
+
+def _proceso_vivo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class TrabajoService:
+    """
+    Cola de trabajos de generación con seguimiento de progreso
+
+    Los trabajos se ejecutan en el proceso que los recibe. Con ``directorio``
+    (varios procesos sobre HORARIOS_DIR_COMPARTIDO) cada trabajo escribe
+    además su estado en ``<id>.json`` dentro de él, con las claves
+    ``claves_compartidas`` del resultado, para que cualquier proceso pueda
+    responder su estado, su resultado y cancelarlo (con un archivo
+    ``<id>.cancelar`` que el proceso dueño consulta desde ``detener``).
+    Un trabajo pendiente o en ejecución cuyo proceso ya no existe se informa
+    como error.
+    """
+
+    def __init__(self, max_trabajos: int = 1, max_historial: int = 50,
+                 directorio: Optional[str] = None,
+                 claves_compartidas: Tuple[str, ...] = ('estadisticas', 'validacion')):
+        self._pool = ThreadPoolExecutor(max_workers=max_trabajos, thread_name_prefix='trabajo')
+        self._trabajos: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_historial = max_historial
+        self.directorio = directorio
+        self.claves_compartidas = claves_compartidas
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    def enviar(self, funcion: Callable[[Callable, Callable], Dict[str, Any]],
+               al_terminar: Optional[Callable[[Dict[str, Any]], None]] = None,
+               descripcion: str = '') -> str:
+        """
+        Encola un trabajo y devuelve su id inmediatamente
+
+        Args:
+            funcion: Recibe (progreso, detener) y devuelve el resultado
+            al_terminar: Se llama con el resultado si el trabajo termina
+                sin cancelarse ni fallar
+            descripcion: Texto informativo del trabajo
+
+        Returns:
+            Id del trabajo
+        """
+        trabajo_id = uuid.uuid4().hex[:12]
+        trabajo = {
+            'id': trabajo_id,
+            'descripcion': descripcion,
+            'estado': PENDIENTE,
+            'progreso': {},
+            'creado': datetime.now().isoformat(),
+            'inicio': None,
+            'fin': None,
+            'error': None,
+            'resultado': None,
+            '_cancelar': threading.Event(),
+            '_compartido': 0.0
+        }
+
+        with self._lock:
+            self._trabajos[trabajo_id] = trabajo
+            self._purgar()
+        # Visible para los demás procesos antes de devolver el id
+        self._compartir(trabajo)
+
+        self._pool.submit(self._ejecutar, trabajo, funcion, al_terminar)
+        logger.info(f"📥 Trabajo {trabajo_id} encolado: {descripcion}")
+        return trabajo_id
+
+    def _ejecutar(self, trabajo: Dict, funcion: Callable, al_terminar: Optional[Callable]):
+        cancelar = trabajo['_cancelar']
+        if self._cancelado(trabajo):
+            trabajo['estado'] = CANCELADO
+            self._compartir(trabajo)
+            return
+
+        trabajo['estado'] = EJECUTANDO
+        trabajo['inicio'] = time.monotonic()
+        self._compartir(trabajo)
+
+        def progreso(datos: Dict[str, Any]):
+            trabajo['progreso'] = datos
+            if time.monotonic() - trabajo['_compartido'] >= INTERVALO_COMPARTIR:
+                self._compartir(trabajo)
+
+        try:
+            resultado = funcion(progreso, lambda: self._cancelado(trabajo))
+            trabajo['resultado'] = resultado
+            if cancelar.is_set():
+                trabajo['estado'] = CANCELADO
+            else:
+                if al_terminar is not None:
+                    al_terminar(resultado)
+                trabajo['estado'] = TERMINADO
+        except Exception as e:
+            logger.error(f"❌ Trabajo {trabajo['id']} falló: {str(e)}", exc_info=True)
+            trabajo['error'] = str(e)
+            trabajo['estado'] = ERROR
+        finally:
+            trabajo['fin'] = time.monotonic()
+            self._compartir(trabajo)
+            logger.info(f"🏁 Trabajo {trabajo['id']}: {trabajo['estado']}")
+
+    def _purgar(self):
+        """Descarta los trabajos terminados más antiguos"""
+        while len(self._trabajos) > self.max_historial:
+            for trabajo_id, trabajo in self._trabajos.items():
+                if trabajo['estado'] not in (PENDIENTE, EJECUTANDO):
+                    del self._trabajos[trabajo_id]
+                    self._borrar_compartido(trabajo_id)
+                    break
+            else:
+                break
+
+    # ---------- Estado compartido entre procesos ----------
+
+    def _ruta(self, trabajo_id: str, extension: str = '.json') -> str:
+        return os.path.join(self.directorio, f"{trabajo_id}{extension}")
+
+    def _cancelado(self, trabajo: Dict) -> bool:
+        """Si se pidió cancelar el trabajo, desde este proceso o desde otro"""
+        cancelar = trabajo['_cancelar']
+        if not cancelar.is_set() and self.directorio and os.path.exists(self._ruta(trabajo['id'], '.cancelar')):
+            cancelar.set()
+        return cancelar.is_set()
+
+    def _compartir(self, trabajo: Dict):
+        """Escribe el estado del trabajo en el directorio compartido"""
+        if not self.directorio:
+            return
+        with self._lock:
+            trabajo['_compartido'] = time.monotonic()
+            datos = self._describir(trabajo)
+            datos['pid'] = os.getpid()
+            resultado = trabajo['resultado']
+            if isinstance(resultado, dict):
+                datos['resultado'] = {clave: resultado.get(clave) for clave in self.claves_compartidas}
+            else:
+                datos['resultado'] = None
+            ruta = self._ruta(trabajo['id'])
+            temporal = f"{ruta}.{os.getpid()}.tmp"
+            try:
+                with open(temporal, 'w', encoding='utf-8') as f:
+                    json.dump(datos, f, ensure_ascii=False, default=a_json)
+                os.replace(temporal, ruta)
+            except OSError as e:
+                logger.warning(f"⚠️  No se pudo compartir el estado del trabajo {trabajo['id']}: {str(e)}")
+
+    def _borrar_compartido(self, trabajo_id: str):
+        if not self.directorio:
+            return
+        for extension in ('.json', '.cancelar'):
+            try:
+                os.remove(self._ruta(trabajo_id, extension))
+            except FileNotFoundError:
+                pass
+
+    def _leer_compartido(self, trabajo_id: str) -> Optional[Dict[str, Any]]:
+        """Estado que escribió otro proceso, o None si no hay"""
+        if not self.directorio or not PATRON_ID.match(trabajo_id):
+            return None
+        try:
+            with open(self._ruta(trabajo_id), encoding='utf-8') as f:
+                datos = json.load(f)
+        except FileNotFoundError:
+            return None
+        if datos['estado'] in (PENDIENTE, EJECUTANDO) and not _proceso_vivo(datos['pid']):
+            datos['estado'] = ERROR
+            datos['error'] = 'El proceso que ejecutaba el trabajo terminó'
+        return datos
+
+    # ---------- Consultas ----------
+
+    def _describir(self, trabajo: Dict) -> Dict[str, Any]:
+
+        if trabajo['inicio'] is None:
+            transcurrido = 0.0
+        else:
+            transcurrido = (trabajo['fin'] or time.monotonic()) - trabajo['inicio']
+
+        return {
+            'id': trabajo['id'],
+            'descripcion': trabajo['descripcion'],
+            'estado': trabajo['estado'],
+            'progreso': trabajo['progreso'],
+            'creado': trabajo['creado'],
+            'segundos_transcurridos': round(transcurrido, 3),
+            'error': trabajo['error']
+        }
+
+    def estado(self, trabajo_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Estado y progreso de un trabajo, o None si no existe
+
+        Los trabajos de otro proceso reflejan su última escritura en el
+        directorio compartido.
+        """
+        trabajo = self._trabajos.get(trabajo_id)
+        if trabajo is not None:
+            return self._describir(trabajo)
+        datos = self._leer_compartido(trabajo_id)
+        if datos is None:
+            return None
+        datos.pop('pid')
+        datos.pop('resultado')
+        return datos
+
+    def resultado(self, trabajo_id: str) -> Optional[Dict[str, Any]]:
+        """Resultado de un trabajo (de otro proceso, solo ``claves_compartidas``)"""
+        trabajo = self._trabajos.get(trabajo_id)
+        if trabajo is not None:
+            return trabajo['resultado']
+        datos = self._leer_compartido(trabajo_id)
+        return datos['resultado'] if datos else None
+
+    def cancelar(self, trabajo_id: str) -> bool:
+        """Pide la cancelación de un trabajo pendiente o en ejecución"""
+        trabajo = self._trabajos.get(trabajo_id)
+        if trabajo is None:
+            datos = self._leer_compartido(trabajo_id)
+            if datos is None or datos['estado'] not in (PENDIENTE, EJECUTANDO):
+                return False
+            # El proceso dueño lo ve en su próxima consulta de ``detener``
+            with open(self._ruta(trabajo_id, '.cancelar'), 'w'):
+                pass
+            return True
+        if trabajo['estado'] not in (PENDIENTE, EJECUTANDO):
+            return False
+        trabajo['_cancelar'].set()
+        if trabajo['estado'] == PENDIENTE:
+            trabajo['estado'] = CANCELADO
+            self._compartir(trabajo)
+        return True
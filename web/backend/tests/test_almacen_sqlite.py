@@ -0,0 +1,25 @@
+"""
+El estado persistido vuelve con los mismos tipos; lo que no es JSON falla
+en vez de guardarse como texto
+"""
+
+import pytest
+
+from services.almacen_sqlite import AlmacenSQLite
+from services.instantanea import Instantanea
+
+
+def test_estado_ida_y_vuelta(tmp_path):
+    almacen = AlmacenSQLite(str(tmp_path / 'horarios.db'))
+    raw_data = {'cursos': [{'id': 'C1', 'horas_semana': 4, 'alumnos': None}], 'aulas': ['A1']}
+    almacen.guardar_estado(Instantanea({'raw_data': raw_data, 'validacion': {'valido': True}}))
+
+    guardado = AlmacenSQLite(str(tmp_path / 'horarios.db')).cargar()
+    assert guardado['raw_data'] == raw_data
+    assert guardado['validacion'] == {'valido': True}
+
+
+def test_valor_no_json_falla(tmp_path):
+    almacen = AlmacenSQLite(str(tmp_path / 'horarios.db'))
+    with pytest.raises(TypeError):
+        almacen.guardar_estado(Instantanea({'raw_data': {'aulas': {'A1', 'A2'}}}))
@@ -0,0 +1,112 @@
+"""
+Rutas de la aplicación sobre el estado publicado
+"""
+
+import io
+import os
+import json
+import time
+
+import pytest
+
+from services.instantanea import PublicadorInstantaneas
+
+EJEMPLO = os.path.join(os.path.dirname(__file__), '../../../ejemplo_horarios.json')
+
+
+@pytest.fixture(scope='module')
+def aplicacion(tmp_path_factory):
+    """Módulo ``app`` sin persistencia, con la carga inicial y su generación terminadas"""
+    os.environ['HORARIOS_DB'] = ''
+    os.environ.pop('HORARIOS_DIR_COMPARTIDO', None)
+    import app as modulo
+    modulo.app.config['UPLOAD_FOLDER'] = str(tmp_path_factory.mktemp('uploads'))
+    assert modulo.arranque['listo'].wait(300)
+    esperar_generacion(modulo, modulo.registro.obtener())
+    return modulo
+
+
+def esperar_generacion(modulo, estado, limite=300.0):
+    fin = time.monotonic() + limite
+    while modulo.generacion_en_curso(estado):
+        assert time.monotonic() < fin, 'la generación no terminó'
+        time.sleep(0.1)
+
+
+def subir(cliente, datos):
+    archivo = (io.BytesIO(json.dumps(datos).encode('utf-8')), 'datos.json')
+    return cliente.post('/api/upload', data={'file': archivo}, content_type='multipart/form-data')
+
+
+def horario_consistente(instantanea):
+    """Cada sesión del horario publicado es de un curso de los datos publicados"""
+    horario = instantanea['horario_generado']
+    if horario is None:
+        return instantanea['grafo_conflictos'] is None and instantanea['validacion'] is None
+    cursos = {(c['nombre'], c['grupo']) for c in instantanea['cursos']}
+    for grupo, dias in horario.items():
+        for franjas in dias.values():
+            for sesion in franjas.values():
+                if (sesion['curso'], grupo) not in cursos:
+                    return False
+    return True
+
+
+def test_subir_archivo_no_mezcla_el_horario_anterior(aplicacion):
+    with open(EJEMPLO, encoding='utf-8') as f:
+        datos = json.load(f)
+    estado = aplicacion.registro.obtener()
+    respuesta = subir(aplicacion.app.test_client(), datos)
+
+    assert respuesta.status_code == 200
+    actual = estado.actual
+    assert len(actual['cursos']) == len(datos['cursos'])
+    assert horario_consistente(actual)
+
+
+def test_subir_archivo_con_horario_reprograma_solo_los_cambios(aplicacion):
+    estado = aplicacion.registro.obtener()
+    previo = estado.actual
+    assert previo['horario_generado'] is not None
+
+    datos = json.loads(json.dumps(previo['raw_data']))
+    eliminado = datos['cursos'].pop(0)
+    for curso in datos['cursos']:
+        curso['horarios'] = []
+    respuesta = subir(aplicacion.app.test_client(), datos)
+
+    assert respuesta.status_code == 200
+    estadisticas = respuesta.get_json()['estadisticas']
+    assert estadisticas['incremental']
+    assert estadisticas['sesiones_conservadas'] > 0
+    actual = estado.actual
+    assert {c['id'] for c in actual['cursos']} == {c['id'] for c in previo['cursos']} - {eliminado['id']}
+    assert horario_consistente(actual)
+
+
+class AlmacenFijo:
+    """Almacén con un estado guardado fijo"""
+    ruta = 'memoria'
+
+    def __init__(self, guardado):
+        self.guardado = guardado
+
+    def cargar(self):
+        return self.guardado
+
+
+def test_carga_inicial_no_sobrescribe_un_archivo_subido(aplicacion):
+    """Con el arranque diferido se puede subir un archivo antes de que termine la carga inicial"""
+    with open(EJEMPLO, encoding='utf-8') as f:
+        subido = json.load(f)
+    estado = PublicadorInstantaneas()
+    estado.publicar_datos(subido)
+
+    aplicacion.cargar_datos_iniciales(estado)
+    assert estado.actual['raw_data'] is subido
+    assert estado.actual['trabajo_generacion'] is None
+
+    guardado = {'raw_data': {'cursos': []}, 'horario_generado': None,
+                'grafo_conflictos': None, 'validacion': None}
+    assert aplicacion.restaurar_estado(estado, AlmacenFijo(guardado))
+    assert estado.actual['raw_data'] is subido
@@ -0,0 +1,57 @@
+"""
+La caché del parser debe invalidarse cuando cambian los CSV que se leen
+junto con el libro, no solo el libro
+"""
+
+import os
+import shutil
+
+import pytest
+
+from services.parser_service_new import ParserServiceNew
+
+DIR_DATOS = os.path.join(os.path.dirname(__file__), '../data')
+EXCEL = os.path.join(os.path.dirname(__file__), '../../../Horarios EneAbr18 (1).xlsx')
+
+pytestmark = pytest.mark.skipif(not os.path.exists(EXCEL), reason='Libro de ejemplo no disponible')
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for nombre in ('aulas.csv', 'Disponibilidad.csv'):
+        shutil.copy(os.path.join(DIR_DATOS, nombre), tmp_path / nombre)
+    return tmp_path
+
+
+def parser(data_dir):
+    return ParserServiceNew(cache_dir=str(data_dir / 'cache'), data_dir=str(data_dir))
+
+
+def test_editar_aulas_invalida_cache(data_dir):
+    antes = parser(data_dir).procesar_excel(EXCEL)
+    assert len(os.listdir(data_dir / 'cache')) == 1
+
+    with open(data_dir / 'aulas.csv', 'a', encoding='utf-8') as f:
+        f.write('99,Aula-99,Aula 99,40,Teoría\n')
+
+    despues = parser(data_dir).procesar_excel(EXCEL)
+    assert len(despues['aulas']) == len(antes['aulas']) + 1
+    assert 'Aula-99' in despues['aulas']
+    assert len(os.listdir(data_dir / 'cache')) == 2
+
+
+def test_sin_cambios_usa_cache(data_dir):
+    primero = parser(data_dir).procesar_excel(EXCEL)
+    segundo = parser(data_dir).procesar_excel(EXCEL)
+    assert segundo == primero
+    assert len(os.listdir(data_dir / 'cache')) == 1
+
+
+def test_editar_disponibilidad_invalida_cache(data_dir):
+    parser(data_dir).procesar_excel(EXCEL)
+
+    with open(data_dir / 'Disponibilidad.csv', 'a', encoding='utf-8') as f:
+        f.write('\n')
+
+    parser(data_dir).procesar_excel(EXCEL)
+    assert len(os.listdir(data_dir / 'cache')) == 2
@@ -0,0 +1,34 @@
+"""
+La reprogramación incremental debe respetar la disponibilidad vigente de
+los profesores también en las sesiones que conserva
+"""
+
+import os
+
+import pytest
+
+from services.parser_service_new import ParserServiceNew
+from services.scheduler_service_new import SchedulerServiceNew
+
+EXCEL = os.path.join(os.path.dirname(__file__), '../../../Horarios EneAbr18 (1).xlsx')
+
+pytestmark = pytest.mark.skipif(not os.path.exists(EXCEL), reason='Libro de ejemplo no disponible')
+
+
+def test_sesiones_fuera_de_disponibilidad_se_reubican():
+    datos = ParserServiceNew(usar_cache=False).procesar_excel(EXCEL)
+    scheduler = SchedulerServiceNew(optimizar=False)
+    scheduler.generar_horarios(datos, semilla=7)
+
+    # Un profesor deja de estar disponible el día de una de sus sesiones
+    curso = next(c for c in datos['cursos'] if c['profesor'] and c.get('horarios'))
+    profesor, dia = curso['profesor'], curso['horarios'][0]['dia']
+    datos['disponibilidad'] = dict(datos.get('disponibilidad') or {})
+    datos['disponibilidad'][profesor] = {d: [(0, 24 * 60)] for d in scheduler.dias if d != dia}
+
+    resultado = scheduler.generar_incremental(datos, {'agregar_aulas': []}, semilla=7)
+
+    sesiones = [h for c in datos['cursos'] if c['profesor'] == profesor for h in c.get('horarios', [])]
+    assert sesiones
+    assert all(h['dia'] != dia for h in sesiones)
+    assert resultado['estadisticas']['sesiones_reubicadas'] > 0
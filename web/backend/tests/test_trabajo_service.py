@@ -0,0 +1,70 @@
+import os
+import json
+import time
+import threading
+import subprocess
+import sys
+
+from services.trabajo_service import (
+    TrabajoService, EJECUTANDO, TERMINADO, CANCELADO, ERROR
+)
+
+
+def esperar(condicion, limite=5.0):
+    fin = time.monotonic() + limite
+    while not condicion():
+        assert time.monotonic() < fin, 'tiempo de espera agotado'
+        time.sleep(0.01)
+
+
+def test_otro_proceso_ve_estado_y_resultado(tmp_path):
+    """Un trabajo de un proceso se consulta desde otro que comparte el directorio"""
+    dueno = TrabajoService(directorio=str(tmp_path))
+    otro = TrabajoService(directorio=str(tmp_path))
+    seguir = threading.Event()
+
+    def funcion(progreso, detener):
+        progreso({'fase': 'buscando'})
+        seguir.wait(5)
+        return {'estadisticas': {'grupos': 3}, 'validacion': {'valido': True}, 'horario': object()}
+
+    trabajo_id = dueno.enviar(funcion)
+    assert otro.estado(trabajo_id) is not None
+    esperar(lambda: otro.estado(trabajo_id)['estado'] == EJECUTANDO)
+    assert otro.resultado(trabajo_id) is None
+
+    seguir.set()
+    esperar(lambda: otro.estado(trabajo_id)['estado'] == TERMINADO)
+    assert otro.resultado(trabajo_id) == {'estadisticas': {'grupos': 3}, 'validacion': {'valido': True}}
+    assert otro.estado('desconocido') is None
+    assert otro.estado('../' + trabajo_id) is None
+
+
+def test_otro_proceso_cancela(tmp_path):
+    dueno = TrabajoService(directorio=str(tmp_path))
+    otro = TrabajoService(directorio=str(tmp_path))
+
+    def funcion(progreso, detener):
+        esperar(detener)
+        return {'estadisticas': {}, 'validacion': {}}
+
+    trabajo_id = dueno.enviar(funcion)
+    esperar(lambda: otro.estado(trabajo_id)['estado'] == EJECUTANDO)
+    assert otro.cancelar(trabajo_id)
+    esperar(lambda: dueno.estado(trabajo_id)['estado'] == CANCELADO)
+    assert otro.estado(trabajo_id)['estado'] == CANCELADO
+    assert not otro.cancelar(trabajo_id)
+
+
+def test_proceso_terminado_se_informa_como_error(tmp_path):
+    """Un trabajo en curso de un proceso que ya no existe no queda en curso para siempre"""
+    hijo = subprocess.Popen([sys.executable, '-c', 'pass'])
+    hijo.wait()
+    trabajo_id = 'abcdef012345'
+    with open(os.path.join(tmp_path, f'{trabajo_id}.json'), 'w', encoding='utf-8') as f:
+        json.dump({'id': trabajo_id, 'estado': EJECUTANDO, 'error': None,
+                   'pid': hijo.pid, 'resultado': None}, f)
+
+    estado = TrabajoService(directorio=str(tmp_path)).estado(trabajo_id)
+    assert estado['estado'] == ERROR
+    assert 'pid' not in estado
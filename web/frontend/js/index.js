@@ -163,7 +163,8 @@ async function generarHorarios() {
         btnGenerar.disabled = true;
         generationStatus.style.display = 'block';
         
-        const resultado = await apiPost('/api/generar-horarios');
+        const trabajo = await apiPost('/api/generar-horarios');
+        const resultado = await esperarTrabajo(trabajo.trabajo_id);
         
         generationStatus.style.display = 'none';
         btnGenerar.disabled = false;
@@ -181,6 +182,24 @@ async function generarHorarios() {
     }
 }
 
+/**
+ * Consulta el trabajo de generación hasta que termine y devuelve su resultado
+ */
+async function esperarTrabajo(trabajoId) {
+    while (true) {
+        const estado = await apiGet(`/api/trabajos/${trabajoId}`);
+        
+        if (estado.estado === 'terminado' || estado.estado === 'cancelado') {
+            return await apiGet(`/api/trabajos/${trabajoId}/resultado`);
+        }
+        if (estado.estado === 'error') {
+            return { success: false, error: estado.error };
+        }
+        
+        await new Promise(resolve => setTimeout(resolve, 500));
+    }
+}
+
 /**
  * Muestra el resultado de la generación
  */